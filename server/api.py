@@ -0,0 +1,173 @@
+# Imports
+from flask import Blueprint, request, session, jsonify
+from datetime import datetime, date, timedelta
+import base64
+
+# Files
+from db import get_db_connection
+from utils import parse_date_range
+from motion import BUCKETS, motion_series
+
+api_bp = Blueprint("api", __name__)
+
+POTTY_TYPES = ('pee', 'poop', 'both', 'other')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_MOTION_POINTS = 2000
+
+
+# Opaque cursor pointing at the last (logged_at, id) of a page
+def encode_cursor(logged_at, log_id):
+    raw = f"{logged_at.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    logged_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(logged_at), int(log_id)
+
+
+# Potty logs as JSON, newest first. Pages by keyset on (logged_at, id) so deep
+# pages cost the same as the first one.
+# Query args: start, end (YYYY-MM-DD), potty_type (repeatable), cursor, limit
+@api_bp.route('/api/potty-logs', methods=['GET'])
+def list_potty_logs():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'message': "Unauthorized"}), 401
+
+    if not session.get('can_read'):
+        return jsonify({'message': "You do not have read access! Please contact the admin to have permissions changed!"}), 401
+
+    # Validate query args before touching the DB
+    try:
+        start_at, end_at = parse_date_range(request.args)
+
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError("'limit' must be positive")
+        limit = min(limit, MAX_PAGE_SIZE)
+
+        potty_types = []
+        for value in request.args.getlist('potty_type'):
+            potty_types.extend(t for t in value.split(',') if t)
+        if any(t not in POTTY_TYPES for t in potty_types):
+            raise ValueError(f"'potty_type' must be one of: {', '.join(POTTY_TYPES)}")
+
+        cursor_param = request.args.get('cursor')
+        after = decode_cursor(cursor_param) if cursor_param else None
+
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': f"Invalid query: {e}"}), 400
+
+    conditions = ["user_id = %s"]
+    params = [user_id]
+
+    if start_at:
+        conditions.append("logged_at >= %s")
+        params.append(start_at)
+    if end_at:
+        conditions.append("logged_at < %s")
+        params.append(end_at)
+    if potty_types:
+        conditions.append(f"potty_type IN ({', '.join(['%s'] * len(potty_types))})")
+        params.extend(potty_types)
+    if after:
+        conditions.append("(logged_at < %s OR (logged_at = %s AND id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        # One extra row tells us whether there is another page
+        cursor.execute(
+            f"""
+            SELECT id, logged_at, potty_type, notes FROM potty_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY logged_at DESC, id DESC
+            LIMIT %s
+            """,
+            (*params, limit + 1)
+        )
+        rows = cursor.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        return jsonify({
+            'logs': [
+                {
+                    'id': row['id'],
+                    'logged_at': row['logged_at'].isoformat(),
+                    'potty_type': row['potty_type'],
+                    'notes': row['notes']
+                }
+                for row in rows
+            ],
+            'next_cursor': encode_cursor(rows[-1]['logged_at'], rows[-1]['id']) if has_more else None
+        }), 200
+
+    except Exception as e:
+        print(e)
+        return jsonify({'message': "Something went wrong. Please contact the admin if issues persist."}), 500
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# Time spent in each motion state per minute, hour or day, for charts.
+# Query args: bucket (default hour), start, end (YYYY-MM-DD, default the last
+# 7 days, or today for minutes), device
+@api_bp.route('/api/motion', methods=['GET'])
+def motion_history():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'message': "Unauthorized"}), 401
+
+    if not session.get('can_read'):
+        return jsonify({'message': "You do not have read access! Please contact the admin to have permissions changed!"}), 401
+
+    try:
+        bucket = request.args.get('bucket', 'hour')
+        if bucket not in BUCKETS:
+            raise ValueError(f"'bucket' must be one of: {', '.join(BUCKETS)}")
+
+        start_at, end_at = parse_date_range(request.args)
+        end_at = end_at or datetime.combine(date.today(), datetime.min.time()) + timedelta(days=1)
+        start_at = start_at or end_at - timedelta(days=1 if bucket == 'minute' else 7)
+        if start_at >= end_at:
+            raise ValueError("'start' must not be after 'end'")
+
+        if (end_at - start_at) / BUCKETS[bucket] > MAX_MOTION_POINTS:
+            raise ValueError(f"window is more than {MAX_MOTION_POINTS} {bucket}s")
+
+    except ValueError as e:
+        return jsonify({'message': f"Invalid query: {e}"}), 400
+
+    conn = None
+
+    try:
+        conn = get_db_connection()
+        points = motion_series(conn, user_id, start_at, end_at, bucket, request.args.get('device'))
+
+        return jsonify({
+            'bucket': bucket,
+            'start': start_at.isoformat(),
+            'end': end_at.isoformat(),
+            'points': points
+        }), 200
+
+    except Exception as e:
+        print(e)
+        return jsonify({'message': "Something went wrong. Please contact the admin if issues persist."}), 500
+
+    finally:
+        if conn:
+            conn.close()
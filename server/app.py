@@ -4,19 +4,34 @@ from pubnub.models.consumer.v3.channel import Channel
 from flask_bcrypt import Bcrypt
 from datetime import timedelta
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, date
+import atexit
 import os
 
 # Files
 from db import get_db_connection
-from pb import create_pubnub, pubnub_bp
+from pb import create_pubnub, pubnub_bp, TokenCache
 from auth import auth_bp
 from routes import routes_bp
+from api import api_bp
+from export import export_bp
+from events import events_bp
+from stats import get_daily_count
+from cache import create_dashboard_cache
+from utils import day_range, check_read_access
+from users import parse_user_query, fetch_user_page
+from publish_queue import PublishQueue
+from broker import Broker, start_motion_bridge
 
 # Variables
 app = Flask(__name__)
 app.bcrypt = Bcrypt(app)
 app.pubnub = create_pubnub()
+app.dashboard_cache = create_dashboard_cache()
+app.token_cache = TokenCache()
+app.publish_queue = PublishQueue(app.pubnub)
+atexit.register(app.publish_queue.shutdown)
+app.broker = Broker()
 
 DOTENV_PATH = os.getenv('DOTENV_PATH')
 if DOTENV_PATH:
@@ -24,10 +39,17 @@ if DOTENV_PATH:
 else:
     load_dotenv()  
 
+# Pass Pi motion messages to browsers on /events, the fallback when PubNub isn't available
+if os.getenv('SSE_MOTION_BRIDGE') == '1':
+    start_motion_bridge(app.pubnub, app.broker)
+
 # Registering blueprints
 app.register_blueprint(pubnub_bp)
 app.register_blueprint(auth_bp)
 app.register_blueprint(routes_bp)
+app.register_blueprint(api_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(events_bp)
 
 # Session cookie setup
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
@@ -112,14 +134,11 @@ def admin_dashboard():
                 message="You do not have the right permissions to access this page!"
             ), 401
 
-        # Only users that have registered a device already and are not admins        
-        cursor.execute("""
-            SELECT id, username, can_write, can_read FROM users
-            WHERE is_admin = FALSE OR is_admin = 0
-        """)
-        users = cursor.fetchall()
+        # One page of non-admin users, optionally searched and filtered
+        query = parse_user_query(request.args)
+        users, has_next = fetch_user_page(cursor, query)
         
-        return render_template('admin-dashboard.html', users=users), 200
+        return render_template('admin-dashboard.html', users=users, query=query, has_next=has_next), 200
         
     except Exception as e:
         print(e)
@@ -131,10 +150,10 @@ def admin_dashboard():
         ), 500
     
     finally:
-        if conn:
-            conn.close()
         if cursor:
             cursor.close()
+        if conn:
+            conn.close()
 
 
 # Dashboard page. Only for logged-in users
@@ -147,31 +166,32 @@ def dashboard():
     conn = None
     cursor = None
     
-    # Get most recent potty log and count for today
+    # Get most recent potty log and count for today, from the cache if possible
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute(
-            "SELECT * FROM potty_logs WHERE user_id = %s ORDER BY logged_at DESC LIMIT 1",
-            (user_id,)
-        )
-        last_potty = cursor.fetchone()
-        last_potty_time = last_potty['logged_at'].strftime("%b %d, %Y - %H:%M") if last_potty else None
-        
-        cursor.execute(
-            "SELECT COUNT(*) FROM potty_logs WHERE user_id = %s AND DATE(logged_at) = CURDATE()",
-            (user_id,)
-        )
-        activity_count = cursor.fetchone()['COUNT(*)']
+        summary = app.dashboard_cache.get(user_id)
+        if summary is None:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            
+            cursor.execute(
+                "SELECT logged_at FROM potty_logs WHERE user_id = %s ORDER BY logged_at DESC LIMIT 1",
+                (user_id,)
+            )
+            last_potty = cursor.fetchone()
+            
+            summary = {
+                'last_potty_time': last_potty['logged_at'].strftime("%b %d, %Y - %H:%M") if last_potty else None,
+                'activity_count': get_daily_count(cursor, user_id, date.today())
+            }
+            app.dashboard_cache.set(user_id, summary)
         
         user = {
             'username': session.get('username'),
             'dog_name': session.get('dog_name'),
             'can_read': session.get('can_read'),
             'can_write': session.get('can_write'),
-            'activity_count': activity_count,
-            'last_potty_time': last_potty_time
+            'activity_count': summary['activity_count'],
+            'last_potty_time': summary['last_potty_time']
         }
         
         return render_template('dashboard.html', userData=user, pubnub_sub_key = os.getenv("SUBSCRIBE_KEY")), 200
@@ -195,18 +215,11 @@ def dashboard():
 # Activity page for potty activity
 @app.route('/potty-activity', methods=['GET'])
 def potty_activity():
-    user_id = session.get('user_id')
-    if not user_id:
-        return redirect(url_for('auth.login'))
+    denied = check_read_access()
+    if denied:
+        return denied
     
-    can_read = session.get('can_read')
-    if not can_read:
-        return render_template(
-            'protected.html', 
-            status_code="401",
-            error="Unauthorised!",
-            message="You do not have read access! Please contact the admin to have permissions changed!"
-        ), 401
+    user_id = session.get('user_id')
 
     conn = None
     cursor = None
@@ -219,22 +232,14 @@ def potty_activity():
         date = datetime.strptime(date_param, "%Y-%m-%d").date() if date_param else None
         
         # Get filtered date or default current date
-        if date:
-            cursor.execute(
-                """
-                SELECT logged_at, potty_type, notes FROM potty_logs 
-                WHERE user_id = %s AND DATE(logged_at) = %s
-                """,
-                (user_id, date)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT logged_at, potty_type, notes FROM potty_logs 
-                WHERE user_id = %s AND DATE(logged_at) = CURDATE()
-                """,
-                (user_id,)
-            )
+        day_start, day_end = day_range(date)
+        cursor.execute(
+            """
+            SELECT logged_at, potty_type, notes FROM potty_logs 
+            WHERE user_id = %s AND logged_at >= %s AND logged_at < %s
+            """,
+            (user_id, day_start, day_end)
+        )
         logs = cursor.fetchall()
         
         user = {
@@ -210,10 +210,10 @@ def admin_login():
         ), 500
     
     finally:
-        if conn:
-            conn.close()
         if cursor:
             cursor.close()
+        if conn:
+            conn.close()
 
 
 # Logging out logic
@@ -0,0 +1,134 @@
+# Compare potty_logs read throughput of each DB driver.
+# Run from the server folder:
+#   python -m benchmarks.bench_drivers --rows 50000 --drivers sqlite mysql mysql-pure
+# MySQL drivers use the DB_* settings from .env and clean up after themselves.
+
+# Imports
+from datetime import datetime, timedelta
+import argparse
+import tempfile
+import random
+import time
+import uuid
+import os
+
+# Files
+from drivers import DRIVERS
+from utils import day_range
+import db
+
+POTTY_TYPES = ['pee', 'poop', 'both', 'other']
+
+
+def open_connection(driver, tmp_dir):
+    return DRIVERS[driver](
+        host=db.DB_HOST,
+        user=db.DB_USER,
+        password=db.DB_PASSWORD,
+        database=db.DB_NAME,
+        path=os.path.join(tmp_dir, 'bench.sqlite3')
+    )
+
+
+# Bench user with `rows` logs spread over the last `days` days
+def seed(conn, rows, days):
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO users (username, email) VALUES (%s, %s)",
+        ('bench', f'bench-{uuid.uuid4().hex}@pottydog.local')
+    )
+    user_id = cursor.lastrowid
+
+    now = datetime.now().replace(microsecond=0)
+    logs = [
+        (user_id, now - timedelta(seconds=random.randrange(days * 86400)), random.choice(POTTY_TYPES), 'N/A')
+        for _ in range(rows)
+    ]
+    for i in range(0, rows, 1000):
+        cursor.executemany(
+            "INSERT INTO potty_logs (user_id, logged_at, potty_type, notes) VALUES (%s, %s, %s, %s)",
+            logs[i:i + 1000]
+        )
+    conn.commit()
+    cursor.close()
+    return user_id
+
+
+def time_query(conn, query, params, repeat):
+    rows = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(query, params)
+        rows += len(cursor.fetchall())
+        cursor.close()
+    return rows, time.perf_counter() - start
+
+
+def bench(driver, rows, days, repeat, tmp_dir):
+    conn = open_connection(driver, tmp_dir)
+    user_id = seed(conn, rows, days)
+    results = {}
+
+    try:
+        # Full history, the worst case for row decoding
+        n, elapsed = time_query(
+            conn,
+            "SELECT logged_at, potty_type, notes FROM potty_logs WHERE user_id = %s",
+            (user_id,),
+            repeat
+        )
+        results['history rows/s'] = n / elapsed
+
+        # One day of logs, as on the potty activity page
+        day_start, day_end = day_range(datetime.now().date() - timedelta(days=1))
+        n, elapsed = time_query(
+            conn,
+            "SELECT logged_at, potty_type, notes FROM potty_logs WHERE user_id = %s AND logged_at >= %s AND logged_at < %s",
+            (user_id, day_start, day_end),
+            repeat
+        )
+        results['day queries/s'] = repeat / elapsed
+
+        # Dashboard last log
+        n, elapsed = time_query(
+            conn,
+            "SELECT * FROM potty_logs WHERE user_id = %s ORDER BY logged_at DESC LIMIT 1",
+            (user_id,),
+            repeat
+        )
+        results['last log queries/s'] = repeat / elapsed
+
+    finally:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM potty_logs WHERE user_id = %s", (user_id,))
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark potty_logs reads per DB driver")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--drivers', nargs='+', default=list(DRIVERS), choices=list(DRIVERS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for driver in args.drivers:
+            try:
+                results = bench(driver, args.rows, args.days, args.repeat, tmp_dir)
+            except Exception as e:
+                print(f"{driver:<12} skipped: {e}")
+                continue
+
+            summary = ', '.join(f"{name}: {value:,.0f}" for name, value in results.items())
+            print(f"{driver:<12} {summary}")
+
+
+if __name__ == '__main__':
+    main()
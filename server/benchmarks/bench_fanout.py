@@ -0,0 +1,89 @@
+# Load test the /events fan-out: many SSE clients, each on its own thread as
+# under a threaded server, reading stream_events() from one in-process broker.
+# Run from the server folder:
+#   python -m benchmarks.bench_fanout --clients 100 1000 5000 --topics 10 --messages 200
+
+# Imports
+import statistics
+import threading
+import argparse
+import json
+import time
+
+# Files
+from broker import Broker
+from events import stream_events
+
+
+# Read one client's stream until the stop message, recording delivery latency
+def consume(broker, subscription, latencies, ready):
+    ready.release()
+    for chunk in stream_events(broker, subscription, heartbeat=1):
+        if not chunk.startswith('event:'):
+            continue
+        message = json.loads(chunk.split('data: ', 1)[1])
+        if message.get('stop'):
+            break
+        latencies.append(time.perf_counter() - message['sent'])
+
+
+def bench(clients, topics, messages, interval, queue):
+    broker = Broker(max_queue=queue, max_clients=clients)
+    names = [f'pottydog.device.bench-{i}' for i in range(topics)]
+    latencies = []
+    ready = threading.Semaphore(0)
+
+    threads = []
+    for i in range(clients):
+        subscription = broker.subscribe([names[i % topics]])
+        thread = threading.Thread(target=consume, args=(broker, subscription, latencies, ready), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for _ in range(clients):
+        ready.acquire()
+
+    start = time.perf_counter()
+    publish_time = 0.0
+    for n in range(messages):
+        for name in names:
+            before = time.perf_counter()
+            broker.publish(name, {'motion': 'detected', 'n': n, 'sent': before})
+            publish_time += time.perf_counter() - before
+        if interval:
+            time.sleep(interval)
+
+    for name in names:
+        broker.publish(name, {'stop': True})
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = broker.stats()
+    latencies.sort()
+    return {
+        'deliveries/s': len(latencies) / elapsed,
+        'publish us': publish_time / (messages * topics) * 1e6,
+        'p50 ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p99 ms': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0,
+        'dropped %': stats['dropped'] / max(stats['delivered'], 1) * 100
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE fan-out through the in-process broker")
+    parser.add_argument('--clients', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--topics', type=int, default=10)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.001, help="Seconds between publish rounds")
+    parser.add_argument('--queue', type=int, default=16, help="Per-client queue size")
+    args = parser.parse_args()
+
+    threading.stack_size(256 * 1024) # Thousands of client threads
+    for clients in args.clients:
+        results = bench(clients, min(args.topics, clients), args.messages, args.interval, args.queue)
+        summary = ', '.join(f"{name}: {value:,.2f}" for name, value in results.items())
+        print(f"{clients:>6} clients  {summary}")
+
+
+if __name__ == '__main__':
+    main()
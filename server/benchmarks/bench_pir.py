@@ -0,0 +1,144 @@
+# Replay PIR traces through the Pi's whole pipeline (SensorGroup's PIRSensor,
+# MotionDetector and StatePublisher, then publish_messages) on a simulated clock, with the simulated GPIO
+# and a fake PubNub, to benchmark hardware-side changes on any Linux box.
+# Traces come from hardware.trace.TraceRecorder (PIR_TRACE_PATH on the Pi) or
+# are text files as read by hardware.replay. Run from the server folder:
+#   python -m benchmarks.bench_pir door.pirt --modes edge poll
+#   python -m benchmarks.bench_pir --synthetic 24 --sensors 1 4 8
+
+# Imports
+import statistics
+import tempfile
+import argparse
+import random
+import time
+import os
+
+# Files
+from hardware.gpio import SimulatedGPIO
+from hardware.replay import load_trace, SAMPLE_INTERVAL
+from hardware.outbox import Outbox
+from hardware.sensors import SensorGroup
+from hardware import sensor_publisher
+from benchmarks.fake_pubnub import FakePubNub
+
+PIN = 17
+
+
+# Dog visits to the door: a few seconds to a couple of minutes of 2-4s PIR
+# pulses, with quiet gaps of minutes to hours between them
+def synthetic_trace(hours, seed=1):
+    rng = random.Random(seed)
+    now = 1740819600.0
+    end = now + hours * 3600
+    samples = [(now, False)]
+    while True:
+        now += rng.expovariate(1 / 1200)
+        if now >= end:
+            break
+        visit_end = now + rng.uniform(3, 120)
+        while now < visit_end:
+            samples.append((now, True))
+            now += rng.uniform(2, 4)
+            samples.append((now, False))
+            now += rng.uniform(0.5, 3)
+    samples.append((end, False))
+    return samples
+
+
+def bench(samples, mode, interval, outbox_path, sensors=1):
+    start, end = samples[0][0], samples[-1][0]
+    clock = [start]
+
+    pubnub = FakePubNub()
+    sensor_publisher.pubnub = pubnub
+    sensor_publisher.outbox = Outbox(outbox_path)
+    sensor_publisher.DEVICE_CHANNEL = sensor_publisher.device_channel('bench-pi')
+
+    # Every sensor replays the trace, each shifted by a different amount so they don't move together
+    pins = [PIN + n for n in range(sensors)]
+    edges = sorted(
+        (start + (at - start + n * 997) % (end - start or 1), pin, level)
+        for n, pin in enumerate(pins) for at, level in samples
+    )
+    gpio = SimulatedGPIO(clock=lambda: clock[0])
+    group = SensorGroup(
+        [(f'bench-{pin}' if sensors > 1 else None, pin) for pin in pins],
+        sensor_publisher.publish_messages,
+        edge_detect=mode == 'edge',
+        gpio=gpio,
+        clock=lambda: clock[0]
+    )
+
+    onsets = {} # pin -> first rising edge not yet reported as motion
+    latencies = []
+    alerts = 0
+
+    # One pass of main.py's loop
+    def step(now):
+        nonlocal alerts
+        clock[0] = now
+        alerts += len(group.step(now))
+        for sensor in group.sensors:
+            if sensor.pir.pin in onsets and sensor.publisher.state in ('detected', 'potty'):
+                latencies.append(now - onsets.pop(sensor.pir.pin))
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    next_tick = start
+    i = 0
+    while next_tick <= end:
+        # Edges before the next tick. In edge mode each one wakes the loop early
+        while i < len(edges) and edges[i][0] < next_tick:
+            at, pin, level = edges[i]
+            i += 1
+            clock[0] = at
+            if gpio.set_input(pin, level) and level and pin not in onsets:
+                sensor = group.sensors[pin - PIN]
+                if sensor.publisher.state in (None, 'inactive'):
+                    onsets[pin] = at
+            if group.edge_detect:
+                step(at)
+        step(next_tick)
+        next_tick += interval
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    sensor_publisher.outbox.close()
+    hours = (end - start) / 3600
+    return {
+        'publishes': len(pubnub.published),
+        'events': sum(sensor.publisher.sent + sensor.publisher.heartbeats for sensor in group.sensors),
+        'alerts': alerts,
+        'latency p50 ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'latency max ms': max(latencies) * 1000 if latencies else 0,
+        'cpu ms/sim hour': cpu * 1000 / hours if hours else 0,
+        'speedup': (end - start) / wall if wall else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Pi's PIR pipeline against recorded traces")
+    parser.add_argument('traces', nargs='*')
+    parser.add_argument('--synthetic', type=float, help="Also run a generated trace this many hours long")
+    parser.add_argument('--modes', nargs='+', default=['edge', 'poll'], choices=['edge', 'poll'])
+    parser.add_argument('--interval', type=float, default=SAMPLE_INTERVAL)
+    parser.add_argument('--sensors', type=int, nargs='+', default=[1], help="PIRs in one loop, each replaying the trace")
+    args = parser.parse_args()
+
+    traces = [(path, load_trace(path)) for path in args.traces]
+    if args.synthetic or not traces:
+        traces.append((f"synthetic {args.synthetic or 24:g}h", synthetic_trace(args.synthetic or 24)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, samples in traces:
+            for sensors in args.sensors:
+                for mode in args.modes:
+                    outbox_path = os.path.join(tmp_dir, f'outbox-{sensors}-{mode}.sqlite3')
+                    results = bench(samples, mode, args.interval, outbox_path, sensors)
+                    summary = ', '.join(f"{key}: {value:,.2f}" for key, value in results.items())
+                    print(f"{name} [{sensors} sensor(s), {mode}]  {summary}")
+
+
+if __name__ == '__main__':
+    main()
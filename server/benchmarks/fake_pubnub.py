@@ -0,0 +1,49 @@
+from pubnub.exceptions import PubNubException
+import threading
+
+
+# Stand-in for PubNub's publish() builder. Records messages instead of sending them
+class FakePublish:
+    def __init__(self, pubnub):
+        self._pubnub = pubnub
+        self._channel = None
+        self._message = None
+
+    def channel(self, channel):
+        self._channel = channel
+        return self
+
+    def message(self, message):
+        self._message = message
+        return self
+
+    def sync(self):
+        return self._pubnub._deliver(self._channel, self._message)
+
+
+# Local fake PubNub for benchmarks and tests. fail_next makes the next
+# publishes raise, and publishes to a channel in fail_channels always do
+class FakePubNub:
+    def __init__(self, delay=None):
+        self.published = []
+        self.fail_next = 0
+        self.fail_channels = set()
+        self.attempts = 0
+        self.delay = delay # threading.Event to hold publishes until set
+        self._lock = threading.Lock()
+
+    def publish(self):
+        return FakePublish(self)
+
+    def _deliver(self, channel, message):
+        if self.delay:
+            self.delay.wait()
+
+        with self._lock:
+            self.attempts += 1
+            if channel in self.fail_channels:
+                raise PubNubException(errormsg="Fake publish failure")
+            if self.fail_next:
+                self.fail_next -= 1
+                raise PubNubException(errormsg="Fake publish failure")
+            self.published.append((channel, message))
@@ -0,0 +1,174 @@
+# In-process pub/sub for live dashboard updates, served to browsers over
+# server-sent events by events.py. Topics are PubNub channel names, so a device
+# channel's motion messages go to every browser watching that device. Each
+# client has its own bounded queue: a slow client loses its oldest messages
+# instead of holding up the others or growing without limit.
+
+# Imports
+from pubnub.callbacks import SubscribeCallback
+from collections import deque
+import threading
+import os
+
+# Files
+from channels import DEVICE_CHANNELS, DeviceOwners, device_channel, device_from_channel, event_device, unpack_messages
+from db import get_db_connection
+
+SSE_CLIENT_QUEUE = int(os.getenv('SSE_CLIENT_QUEUE', 16))
+SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', 5000))
+
+
+class BrokerFullError(Exception):
+    pass
+
+
+# One connected client's queue of messages
+class Subscription:
+    def __init__(self, topics, max_queue):
+        self.topics = tuple(topics)
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    # Queue a message. False if the oldest one had to be dropped to fit it
+    def put(self, message):
+        with self._cond:
+            dropped = len(self._queue) >= self.max_queue
+            if dropped:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(message)
+            self._cond.notify()
+        return not dropped
+
+    # Next message, or None after timeout seconds or once closed
+    def get(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self.closed, timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class Broker:
+    def __init__(self, max_queue=SSE_CLIENT_QUEUE, max_clients=SSE_MAX_CLIENTS):
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self._topics = {} # topic -> tuple of subscriptions, replaced on change so publish never copies
+        self._clients = 0
+        self._lock = threading.Lock()
+
+        # Stats
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def subscribe(self, topics):
+        with self._lock:
+            if self._clients >= self.max_clients:
+                self.rejected += 1
+                raise BrokerFullError(f"{self._clients} clients already connected")
+
+            subscription = Subscription(topics, self.max_queue)
+            for topic in subscription.topics:
+                self._topics[topic] = self._topics.get(topic, ()) + (subscription,)
+            self._clients += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription.closed:
+                return
+            for topic in subscription.topics:
+                remaining = tuple(s for s in self._topics.get(topic, ()) if s is not subscription)
+                if remaining:
+                    self._topics[topic] = remaining
+                else:
+                    self._topics.pop(topic, None)
+            self._clients -= 1
+        subscription.close()
+
+    # Fan a message out to every client on the topic. Returns how many got it
+    def publish(self, topic, message):
+        subscriptions = self._topics.get(topic, ())
+        dropped = 0
+        for subscription in subscriptions:
+            if not subscription.put(message):
+                dropped += 1
+
+        with self._lock:
+            self.published += 1
+            self.delivered += len(subscriptions)
+            self.dropped += dropped
+        return len(subscriptions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': self._clients,
+                'topics': len(self._topics),
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'rejected': self.rejected
+            }
+
+
+# Passes motion messages from every device channel on to the broker, under the
+# channel of the device each one is about. Events a Pi sends for another device
+# only go through if both are registered to the same user
+class MotionBridge(SubscribeCallback):
+    def __init__(self, broker, connect=get_db_connection, owners=None):
+        self.broker = broker
+        self.connect = connect
+        self.owners = owners or DeviceOwners()
+
+    def status(self, pubnub, status):
+        if status.is_error():
+            print(f"PubNub subscribe error: {status.error_data}")
+
+    def message(self, pubnub, message):
+        channel_device_id = device_from_channel(message.channel)
+        if not channel_device_id:
+            return
+        events = [event for event in unpack_messages(message.message) if isinstance(event, dict)]
+        others = {event_device(channel_device_id, event) for event in events} - {channel_device_id}
+        allowed = {channel_device_id}
+        if others and self._load_owners(others | {channel_device_id}):
+            allowed |= {device_id for device_id in others if self.owners.can_send(channel_device_id, device_id)}
+
+        for event in events:
+            device_id = event_device(channel_device_id, event)
+            if device_id in allowed:
+                self.broker.publish(device_channel(device_id), event)
+
+    def _load_owners(self, device_ids):
+        if not self.owners.stale(device_ids):
+            return True
+        conn = None
+        try:
+            conn = self.connect()
+            cursor = conn.cursor(dictionary=True)
+            self.owners.load(cursor, device_ids)
+            cursor.close()
+            return True
+        except Exception as e:
+            print(f"Error looking up device owners: {e}")
+            return False
+        finally:
+            if conn:
+                conn.close()
+
+    def presence(self, pubnub, presence):
+        pass
+
+
+def start_motion_bridge(pubnub, broker):
+    pubnub.add_listener(MotionBridge(broker))
+    pubnub.subscribe().channels([DEVICE_CHANNELS]).execute()
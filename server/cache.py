@@ -0,0 +1,115 @@
+# Imports
+from collections import OrderedDict
+from datetime import date
+import threading
+import time
+import os
+
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 60)) # Seconds
+DASHBOARD_CACHE_SIZE = int(os.getenv('DASHBOARD_CACHE_SIZE', 1024)) # Entries, in-process backend only
+CACHE_REDIS_HOST = os.getenv('CACHE_REDIS_HOST') # Set to share the cache between worker processes
+
+
+# In-process LRU cache with per-entry TTL.
+# Same get/set/delete API as cachelib caches so a shared one can be swapped in
+class MemoryCache:
+    def __init__(self, max_entries=DASHBOARD_CACHE_SIZE, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = self.clock() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Per-user dashboard summary (last_potty_time, activity_count) for today
+class DashboardCache:
+    def __init__(self, backend, ttl=DASHBOARD_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # Day is part of the key so yesterday's count is never served after midnight
+    @staticmethod
+    def key(user_id, day=None):
+        return f"dashboard:{user_id}:{(day or date.today()).isoformat()}"
+
+    def get(self, user_id):
+        summary = self.backend.get(self.key(user_id))
+        with self._lock:
+            if summary is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return summary
+
+    def set(self, user_id, summary):
+        self.backend.set(self.key(user_id), summary, timeout=self.ttl)
+
+    # Called after writing a potty log so the next dashboard load re-reads it
+    def invalidate(self, user_id):
+        self.backend.delete(self.key(user_id))
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'invalidations': self.invalidations
+            }
+        if isinstance(self.backend, MemoryCache):
+            stats['entries'] = len(self.backend)
+        return stats
+
+
+# Redis when CACHE_REDIS_HOST is set. Without the redis package installed
+# that falls back to the in-process cache rather than stopping the app
+def create_dashboard_cache():
+    backend = None
+    if CACHE_REDIS_HOST:
+        try:
+            from cachelib.redis import RedisCache
+            backend = RedisCache(
+                host=CACHE_REDIS_HOST,
+                port=int(os.getenv('CACHE_REDIS_PORT', 6379)),
+                key_prefix='pottydog:'
+            )
+        except (ImportError, RuntimeError) as e: # cachelib raises RuntimeError when redis is missing
+            print(f"Redis dashboard cache unavailable, using the in-process cache: {e}")
+    return DashboardCache(backend or MemoryCache())
@@ -0,0 +1,198 @@
+# PubNub channel naming. Each household gets its own channels instead of every
+# browser sharing one broadcast channel:
+#   pottydog.user.<user_id>       notices for one user (e.g. update_token)
+#   pottydog.device.<device_id>   motion events from one Raspberry Pi. A Pi with
+#                                 several sensors sends all of their events on its
+#                                 own channel, each naming its sensor's device_id
+#   pottydog-user-<user_id>       channel group with the user's device channels
+# Browsers subscribe to their user channel and channel group, so they only get
+# their own household's traffic. To register a Pi and print its publish token:
+#   python channels.py register <user_id> <device_id> [name]
+#   python channels.py sync [user_id]    re-add device channels to the groups
+#   python channels.py token <device_id>...   one token for several device channels
+
+# Imports
+from pubnub.models.consumer.v3.channel import Channel
+import threading
+import time
+import sys
+import os
+
+# Files
+from db import get_db_connection
+
+DEVICE_TOKEN_TTL = int(os.getenv('DEVICE_TOKEN_TTL', 43200)) # Minutes, PubNub's max of 30 days
+GROUP_ADD_LIMIT = 200 # Channels per add_channel_to_channel_group call
+DEVICE_CHANNELS = 'pottydog.device.*' # Wildcard subscribe to every Pi
+DEVICE_OWNER_TTL = float(os.getenv('MOTION_DEVICE_TTL', 300)) # Seconds a device's owner is cached
+
+
+def user_channel(user_id):
+    return f'pottydog.user.{user_id}'
+
+
+def device_channel(device_id):
+    return f'pottydog.device.{device_id}'
+
+
+# Device id from a device channel name, or None for any other channel
+def device_from_channel(channel):
+    prefix = device_channel('')
+    if channel and channel.startswith(prefix) and len(channel) > len(prefix):
+        return channel[len(prefix):]
+    return None
+
+
+# One message, or a batch of them sent in order: by the Pi's outbox after a
+# network drop, or by publish_queue when several wait for the same channel
+def unpack_messages(message):
+    if isinstance(message, dict) and message.get('type') == 'batch':
+        return [event for event in message.get('events') or [] if isinstance(event, dict)]
+    return [message]
+
+
+# Device an event from a device channel is about: the device_id it names (one
+# of the Pi's sensors), else the channel's own device
+def event_device(channel_device_id, event):
+    device_id = event.get('device_id') if isinstance(event, dict) else None
+    return device_id if isinstance(device_id, str) and device_id else channel_device_id
+
+
+# Owners of registered devices, looked up in batches and kept for ttl seconds so
+# a device registered to another household moves with it. Unregistered devices
+# are looked up again next time
+class DeviceOwners:
+    def __init__(self, ttl=DEVICE_OWNER_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._owners = {} # device_id -> (user_id, looked up at)
+        self._lock = threading.Lock()
+
+    # Devices to look up: not seen yet, or looked up more than ttl seconds ago
+    def stale(self, device_ids):
+        now = self.clock()
+        with self._lock:
+            return [
+                device_id for device_id in device_ids
+                if device_id not in self._owners or now - self._owners[device_id][1] > self.ttl
+            ]
+
+    def load(self, cursor, device_ids):
+        missing = self.stale(device_ids)
+        if not missing:
+            return
+        now = self.clock()
+
+        cursor.execute(
+            f"SELECT device_id, user_id FROM devices WHERE device_id IN ({', '.join(['%s'] * len(missing))})",
+            missing
+        )
+        rows = cursor.fetchall()
+        with self._lock:
+            for device_id in missing:
+                self._owners.pop(device_id, None) # Gone unless it is still registered
+            for row in rows:
+                self._owners[row['device_id']] = (row['user_id'], now)
+
+    # user_id from the last load(), or None if the device isn't registered
+    def get(self, device_id):
+        owner = self._owners.get(device_id)
+        return owner[0] if owner else None
+
+    # Whether the device on channel_device_id's channel may send events for
+    # device_id: its own, or another device registered to the same user
+    def can_send(self, channel_device_id, device_id):
+        owner = self.get(device_id)
+        return owner is not None and (device_id == channel_device_id or owner == self.get(channel_device_id))
+
+
+# Channel group names can't contain '.'
+def user_group(user_id):
+    return f'pottydog-user-{user_id}'
+
+
+def get_device_ids(cursor, user_id):
+    cursor.execute("SELECT device_id FROM devices WHERE user_id = %s ORDER BY id", (user_id,))
+    return [row['device_id'] for row in cursor.fetchall()]
+
+
+# Add a user's device channels to their channel group
+def sync_user_group(pubnub, user_id, device_ids):
+    channels = [device_channel(device_id) for device_id in device_ids]
+    for i in range(0, len(channels), GROUP_ADD_LIMIT):
+        pubnub.add_channel_to_channel_group() \
+            .channels(channels[i:i + GROUP_ADD_LIMIT]) \
+            .channel_group(user_group(user_id)) \
+            .sync()
+
+
+# Token for a Pi to publish motion events to its own channel only. Its other
+# sensors' events go on that channel too. A list of device ids gives write
+# access to each of them
+def generate_device_token(pubnub, device_ids, ttl=DEVICE_TOKEN_TTL):
+    if isinstance(device_ids, str):
+        device_ids = [device_ids]
+    envelope = pubnub.grant_token() \
+        .ttl(ttl) \
+        .authorized_uuid('raspberry-pi') \
+        .channels([Channel.id(device_channel(device_id)).write() for device_id in device_ids]) \
+        .sync()
+    return envelope.result.token
+
+
+def register_device(conn, pubnub, user_id, device_id, name=None):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "INSERT INTO devices (user_id, device_id, name) VALUES (%s, %s, %s)",
+            (user_id, device_id, name)
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+    sync_user_group(pubnub, user_id, [device_id])
+
+
+def main(args):
+    if not args or args[0] not in ('register', 'sync', 'token') or (args[0] == 'register' and len(args) < 3) \
+            or (args[0] == 'token' and len(args) < 2):
+        print("Usage: python channels.py register <user_id> <device_id> [name]")
+        print("       python channels.py sync [user_id]")
+        print("       python channels.py token <device_id>...")
+        return
+
+    from pb import create_pubnub # pb imports this module
+    pubnub = create_pubnub()
+    if args[0] == 'token':
+        print(f"PUBLISH_TOKEN={generate_device_token(pubnub, args[1:])}")
+        return
+    conn = get_db_connection()
+    try:
+        if args[0] == 'register':
+            user_id, device_id = int(args[1]), args[2]
+            register_device(conn, pubnub, user_id, device_id, args[3] if len(args) > 3 else None)
+            print(f"Registered {device_id} to user {user_id}")
+            print(f"PUBLISH_TOKEN={generate_device_token(pubnub, device_id)}")
+            return
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if len(args) > 1:
+                user_ids = [int(args[1])]
+            else:
+                cursor.execute("SELECT DISTINCT user_id FROM devices")
+                user_ids = [row['user_id'] for row in cursor.fetchall()]
+
+            for user_id in user_ids:
+                device_ids = get_device_ids(cursor, user_id)
+                sync_user_group(pubnub, user_id, device_ids)
+                print(f"User {user_id}: {len(device_ids)} device channel(s)")
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
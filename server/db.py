@@ -1,26 +1,255 @@
 # Imports
 from dotenv import load_dotenv
-import mysql.connector
+import threading
+import time
 import os
 
+# Files
+from drivers import DRIVERS, DIALECTS
+
 DOTENV_PATH = os.getenv('DOTENV_PATH')
 if DOTENV_PATH:
-    load_dotenv(DOTENV_PATH)  
+    load_dotenv(DOTENV_PATH)
 else:
-    load_dotenv()  
-    
+    load_dotenv()
+
 # DB credentials
 DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASSWORD = os.getenv('DB_PASSWORD')
 DB_HOST = os.getenv('DB_HOST')
 
-# DB helper function
-def get_db_connection():
-    return mysql.connector.connect(
+# Driver: 'mysql' (C extension), 'mysql-pure' or 'sqlite'
+DB_DRIVER = os.getenv('DB_DRIVER', 'mysql-pure')
+DB_SQLITE_PATH = os.getenv('DB_SQLITE_PATH', 'pottydog.sqlite3')
+
+if DB_DRIVER not in DRIVERS:
+    raise ValueError(f"Unknown DB_DRIVER '{DB_DRIVER}'. Choose one of: {', '.join(DRIVERS)}")
+
+# Pool settings
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10)) # Seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)) # Seconds before a connection is recycled
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+# Open a brand new connection to the DB with the configured driver
+def connect(driver=None):
+    return DRIVERS[driver or DB_DRIVER](
         host=DB_HOST,
         user=DB_USER,
         password=DB_PASSWORD,
         database=DB_NAME,
-        use_pure=True # Does not work without it.
-    )
\ No newline at end of file
+        path=DB_SQLITE_PATH
+    )
+
+
+# SQL flavour of the configured driver, for the few queries that differ
+def get_dialect():
+    return DIALECTS[DB_DRIVER]
+
+
+# Wraps a connection so close() hands it back to the pool instead of closing it
+class PooledConnection:
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise AttributeError(f"Connection already returned to pool: {name}")
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw, self._created_at)
+
+
+# Bounded pool of DB connections shared by all requests in this process
+class ConnectionPool:
+    def __init__(self, connect, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, max_lifetime=DB_POOL_MAX_LIFETIME):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+
+        self._cond = threading.Condition()
+        self._idle = [] # (raw, created_at), most recently used last
+        self._open = 0 # Idle + in use + being opened
+
+        # Stats
+        self.in_use = 0
+        self.waiters = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+
+    def get_connection(self):
+        while True:
+            raw, created_at = self._checkout()
+
+            # Free slot reserved, open a new connection outside the lock
+            if raw is None:
+                try:
+                    raw = self.connect()
+                except Exception:
+                    self._forget()
+                    raise
+                created_at = time.monotonic()
+                with self._cond:
+                    self.created += 1
+                break
+
+            if self._expired(created_at):
+                with self._cond:
+                    self.recycled += 1
+                self._close_raw(raw)
+                continue
+
+            if not self._is_alive(raw):
+                with self._cond:
+                    self.discarded += 1
+                self._close_raw(raw)
+                continue
+
+            break
+
+        with self._cond:
+            self.in_use += 1
+            self.checkouts += 1
+        return PooledConnection(self, raw, created_at)
+
+    # Take an idle connection or reserve a slot, waiting up to the timeout
+    def _checkout(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(f"No DB connection available after {self.timeout}s")
+
+                waited = True
+                self.waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiters -= 1
+
+            if waited:
+                wait_time = time.monotonic() - start
+                self.waits += 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+
+            if self._idle:
+                return self._idle.pop()
+
+            self._open += 1
+            return None, None
+
+    def _release(self, raw, created_at):
+        with self._cond:
+            self.in_use -= 1
+
+        # Never hand out a connection with someone else's uncommitted work
+        try:
+            if getattr(raw, 'in_transaction', True):
+                raw.rollback()
+        except Exception:
+            with self._cond:
+                self.discarded += 1
+            self._close_raw(raw)
+            return
+
+        if self._expired(created_at):
+            with self._cond:
+                self.recycled += 1
+            self._close_raw(raw)
+            return
+
+        with self._cond:
+            self._idle.append((raw, created_at))
+            self._cond.notify()
+
+    def _expired(self, created_at):
+        return self.max_lifetime and time.monotonic() - created_at > self.max_lifetime
+
+    def _is_alive(self, raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        self._forget()
+
+    # Give up a slot so a waiter can open a new connection
+    def _forget(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            self._close_raw(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self.in_use,
+                'waiters': self.waiters,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'avg_wait_ms': round(self.total_wait_time / self.waits * 1000, 2) if self.waits else 0.0,
+                'max_wait_ms': round(self.max_wait_time * 1000, 2),
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'recycled': self.recycled,
+                'discarded': self.discarded
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Pool is created on first use so each worker process gets its own
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(connect)
+    return _pool
+
+
+# DB helper function. close() on the result returns it to the pool
+def get_db_connection():
+    return get_pool().get_connection()
+
+
+def get_pool_stats():
+    return get_pool().stats()
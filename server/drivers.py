@@ -0,0 +1,152 @@
+# Imports
+from datetime import date, datetime
+import mysql.connector
+import sqlite3
+import re
+
+# Files
+from migrate import migrate
+
+# Queries are written with MySQL's %s placeholders. %% is a literal percent
+_PLACEHOLDER = re.compile(r'%%|%s')
+
+
+# MySQL with the C extension. Much faster at decoding rows than the pure driver
+def connect_mysql_c(host, user, password, database, **kwargs):
+    if not mysql.connector.HAVE_CEXT:
+        print("MySQL C extension not available, falling back to pure driver")
+        return connect_mysql_pure(host, user, password, database)
+
+    return mysql.connector.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database,
+        use_pure=False
+    )
+
+
+# MySQL with the pure-Python protocol parser
+def connect_mysql_pure(host, user, password, database, **kwargs):
+    return mysql.connector.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database,
+        use_pure=True
+    )
+
+
+# Embedded SQLite database file. Brings the schema up to date on first use
+def connect_sqlite(path, **kwargs):
+    raw = sqlite3.connect(
+        path,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False # Pooled connections move between request threads
+    )
+    raw.execute("PRAGMA foreign_keys = ON")
+    raw.execute("PRAGMA journal_mode = WAL")
+    raw.create_function('CURDATE', 0, lambda: date.today().isoformat())
+    raw.create_function('NOW', 0, lambda: datetime.now().isoformat(' ', 'seconds'))
+
+    conn = SQLiteConnection(raw)
+    migrate(conn, 'sqlite')
+    return conn
+
+
+DRIVERS = {
+    'mysql': connect_mysql_c,
+    'mysql-pure': connect_mysql_pure,
+    'sqlite': connect_sqlite
+}
+
+DIALECTS = {
+    'mysql': 'mysql',
+    'mysql-pure': 'mysql',
+    'sqlite': 'sqlite'
+}
+
+
+# Store and read back DATETIME/DATE columns the same way mysql.connector does
+def _parse_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', _parse_datetime)
+sqlite3.register_converter('TIMESTAMP', _parse_datetime)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+
+
+# Gives sqlite3 the parts of the mysql.connector connection API the app uses
+class SQLiteConnection:
+    def __init__(self, raw):
+        self._raw = raw
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def cursor(self, dictionary=False, buffered=None):
+        return SQLiteCursor(self._raw.cursor(), dictionary)
+
+    def ping(self, reconnect=False, **kwargs):
+        self._raw.execute("SELECT 1")
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteCursor:
+    def __init__(self, raw, dictionary):
+        self._raw = raw
+        self._dictionary = dictionary
+
+    @staticmethod
+    def _translate(query):
+        return _PLACEHOLDER.sub(lambda m: '%' if m.group() == '%%' else '?', query)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {col[0]: value for col, value in zip(self._raw.description, row)}
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    def execute(self, query, params=()):
+        self._raw.execute(self._translate(query), params or ())
+
+    def executemany(self, query, seq_params):
+        self._raw.executemany(self._translate(query), seq_params)
+
+    def fetchone(self):
+        return self._row(self._raw.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._raw.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._raw.fetchall()]
+
+    def __iter__(self):
+        for row in self._raw:
+            yield self._row(row)
+
+    def close(self):
+        self._raw.close()
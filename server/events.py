@@ -0,0 +1,85 @@
+# Imports
+from flask import Blueprint, Response, current_app, session, render_template
+import json
+import os
+
+# Files
+from db import get_db_connection
+from broker import BrokerFullError
+from channels import device_channel, get_device_ids
+from utils import check_read_access
+
+events_bp = Blueprint("events", __name__)
+
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', 15)) # Seconds between keep-alive comments
+SSE_RETRY_MS = 3000 # How long browsers wait before reconnecting
+
+
+# Server-sent events for one client until it disconnects. The heartbeat keeps
+# proxies from closing the connection and finds clients that have gone away
+def stream_events(broker, subscription, heartbeat=SSE_HEARTBEAT):
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while not subscription.closed:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"event: motion\ndata: {json.dumps(message, default=str)}\n\n"
+
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# Live motion status for the logged-in user's devices. Used by the dashboard when
+# PubNub isn't available. Each open stream holds a worker thread, so serving
+# thousands of them needs a gevent/eventlet worker
+@events_bp.route('/events', methods=['GET'])
+def events():
+    denied = check_read_access()
+    if denied:
+        return denied
+
+    user_id = session.get('user_id')
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        device_ids = get_device_ids(cursor, user_id)
+
+    except Exception as e:
+        print(e)
+        return render_template(
+            'protected.html',
+            status_code="500",
+            error="Server error!",
+            message="Something went wrong. Please contact the admin if issues persist."
+        ), 500
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+    broker = current_app.broker
+    try:
+        subscription = broker.subscribe([device_channel(device_id) for device_id in device_ids])
+    except BrokerFullError as e:
+        print(e)
+        return render_template(
+            'protected.html',
+            status_code="503",
+            error="Too many connections!",
+            message="Live updates are busy right now. Please try again later."
+        ), 503
+
+    response = Response(
+        stream_events(broker, subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(lambda: broker.unsubscribe(subscription)) # Even if streaming never started
+    return response
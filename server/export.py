@@ -0,0 +1,254 @@
+# Imports
+from flask import Blueprint, Response, render_template, request, session, redirect, url_for
+from datetime import date
+import json
+import zlib
+import csv
+import io
+import os
+
+# Files
+from db import get_db_connection
+from utils import parse_date_range, check_read_access
+
+export_bp = Blueprint("export", __name__)
+
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 500))
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+# Turn one chunk of rows into CSV or NDJSON text
+def encode_rows(rows, columns, fmt):
+    if fmt == 'ndjson':
+        return ''.join(
+            json.dumps({col: row[col] for col in columns}, default=str) + '\n'
+            for row in rows
+        )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row[col] for col in columns] for row in rows)
+    return buffer.getvalue()
+
+
+# Gives an export's connection back to the pool, once. Closing an unbuffered
+# cursor with rows left unread raises, which must not keep the connection out
+def release_connection(conn, cursor):
+    released = []
+
+    def release():
+        if released:
+            return
+        released.append(True)
+        try:
+            cursor.close()
+        except Exception as e:
+            print(e)
+        finally:
+            conn.close()
+
+    return release
+
+
+# Read the cursor in fixed-size chunks so the full result set never sits in memory.
+# Calls release when the download ends or is cut off
+def stream_rows(cursor, columns, fmt, release):
+    try:
+        if fmt == 'csv':
+            yield ','.join(columns) + '\r\n'
+
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            yield encode_rows(rows, columns, fmt)
+
+    finally:
+        release()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31) # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# Run the query on an unbuffered cursor and stream its rows as a download
+def export_response(query, params, columns, fmt, compress, filename):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute(query, params)
+    except Exception:
+        conn.close()
+        raise
+
+    release = release_connection(conn, cursor)
+    body = stream_rows(cursor, columns, fmt, release)
+    filename = f"{filename}.{fmt}"
+    mimetype = FORMATS[fmt]
+
+    if compress:
+        body = gzip_stream(body)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    response = Response(
+        body,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+    response.call_on_close(release) # Even if streaming never started, e.g. a HEAD request
+    return response
+
+
+# Common query args: format, gzip, start, end
+def parse_export_args(args):
+    fmt = args.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+    start_at, end_at = parse_date_range(args)
+    compress = args.get('gzip') in ('1', 'true')
+    return fmt, compress, start_at, end_at
+
+
+def bad_request(e):
+    return render_template(
+        'protected.html',
+        status_code="400",
+        error="Invalid export!",
+        message=str(e)
+    ), 400
+
+
+def server_error():
+    return render_template(
+        'protected.html',
+        status_code="500",
+        error="Server error!",
+        message="Something went wrong. Please contact the admin if issues persist."
+    ), 500
+
+
+# Export the logged-in user's potty logs
+@export_bp.route('/potty-activity/export', methods=['GET'])
+def export_potty_logs():
+    denied = check_read_access()
+    if denied:
+        return denied
+
+    user_id = session.get('user_id')
+
+    try:
+        fmt, compress, start_at, end_at = parse_export_args(request.args)
+    except ValueError as e:
+        return bad_request(e)
+
+    conditions = ["user_id = %s"]
+    params = [user_id]
+    if start_at:
+        conditions.append("logged_at >= %s")
+        params.append(start_at)
+    if end_at:
+        conditions.append("logged_at < %s")
+        params.append(end_at)
+
+    try:
+        return export_response(
+            f"""
+            SELECT logged_at, potty_type, notes FROM potty_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY logged_at
+            """,
+            tuple(params),
+            ['logged_at', 'potty_type', 'notes'],
+            fmt,
+            compress,
+            f"potty-logs-{date.today().isoformat()}"
+        )
+
+    except Exception as e:
+        print(e)
+        return server_error()
+
+
+# Export every user's potty logs. Admins only
+@export_bp.route('/admin-dashboard/export', methods=['GET'])
+def export_all_potty_logs():
+    user_id = session.get('user_id')
+    if not session.get('is_admin') or not user_id:
+        return redirect(url_for('auth.admin_login'))
+
+    try:
+        fmt, compress, start_at, end_at = parse_export_args(request.args)
+    except ValueError as e:
+        return bad_request(e)
+
+    conn = None
+    cursor = None
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        # Double check that user did not just add is_admin manually
+        cursor.execute(
+            'SELECT is_admin FROM users WHERE id = %s',
+            (user_id,)
+        )
+        user = cursor.fetchone()
+
+        if not user or not bool(user['is_admin']):
+            return render_template(
+                'protected.html',
+                status_code='401',
+                error="Access denied!",
+                message="You do not have the right permissions to access this page!"
+            ), 401
+
+    except Exception as e:
+        print(e)
+        return server_error()
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+    conditions = []
+    params = []
+    if start_at:
+        conditions.append("p.logged_at >= %s")
+        params.append(start_at)
+    if end_at:
+        conditions.append("p.logged_at < %s")
+        params.append(end_at)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    try:
+        return export_response(
+            f"""
+            SELECT p.id, p.user_id, u.username, p.logged_at, p.potty_type, p.notes
+            FROM potty_logs p
+            JOIN users u ON u.id = p.user_id
+            {where}
+            ORDER BY p.id
+            """,
+            tuple(params),
+            ['id', 'user_id', 'username', 'logged_at', 'potty_type', 'notes'],
+            fmt,
+            compress,
+            f"all-potty-logs-{date.today().isoformat()}"
+        )
+
+    except Exception as e:
+        print(e)
+        return server_error()
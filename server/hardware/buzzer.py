@@ -1,28 +1,99 @@
-import RPi.GPIO as GPIO
+from .gpio import GPIO
+import threading
 import time
 
+# Patterns are lists of (frequency in Hz, seconds). A frequency of None is a rest
+STARTUP_PATTERN = [(1000, 0.2), (None, 0.1), (2000, 0.2), (None, 0.1), (3000, 0.2), (None, 0.1)]
+POTTY_PATTERN = [(4000, 3.0)]
+
+# Higher priority patterns cut off lower ones, never the other way round
+PRIORITY_STARTUP = 0
+PRIORITY_POTTY = 10
+
 class PiezoBuzzer():
-    def __init__(self):
+    def __init__(self, gpio=GPIO):
         # Buzzer setup 
         self.BUZZER_PIN = 13
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.BUZZER_PIN, GPIO.OUT)
-        self.buzzer_pwm = GPIO.PWM(self.BUZZER_PIN, 4000) # 4000Hz 
+        gpio.setmode(gpio.BCM)
+        gpio.setup(self.BUZZER_PIN, gpio.OUT)
+        self.buzzer_pwm = gpio.PWM(self.BUZZER_PIN, 4000) # 4000Hz 
+
+        # Patterns play on a background thread so callers never wait for them
+        self._cond = threading.Condition()
+        self._pattern = None
+        self._priority = None
+        self._generation = 0 # Bumped on every play() and cancel(), so the worker knows to stop
+        self._stopping = False
+        self._worker = threading.Thread(target=self._run, name="buzzer", daemon=True)
+        self._worker.start()
+
+    # Start playing a pattern, replacing whatever is playing unless that has a
+    # higher priority. Returns False if it was ignored
+    def play(self, pattern, priority=0):
+        with self._cond:
+            if self._pattern is not None and self._priority > priority:
+                return False
+            self._pattern = list(pattern)
+            self._priority = priority
+            self._generation += 1
+            self._cond.notify_all()
+        return True
+
+    def cancel(self):
+        with self._cond:
+            self._pattern = None
+            self._generation += 1
+            self._cond.notify_all()
+
+    def is_playing(self):
+        return self._pattern is not None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pattern is None and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                pattern = self._pattern
+                generation = self._generation
+
+            for freq, duration in pattern:
+                if freq:
+                    self.buzzer_pwm.ChangeFrequency(freq)
+                    self.buzzer_pwm.start(50)
+
+                # Waits out the step, but wakes straight away if cancelled or replaced
+                with self._cond:
+                    end = time.monotonic() + duration
+                    while self._generation == generation and not self._stopping:
+                        remaining = end - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    interrupted = self._generation != generation or self._stopping
+
+                if freq:
+                    self.buzzer_pwm.stop()
+                if interrupted:
+                    break
+
+            with self._cond:
+                if self._generation == generation:
+                    self._pattern = None
 
-    
     # Device successful startup alert
     def tigger_startup_buzzer(self):
-        for freq in [1000, 2000, 3000]:
-            self.buzzer_pwm.ChangeFrequency(freq)
-            self.buzzer_pwm.start(50)
-            time.sleep(0.2)
-            self.buzzer_pwm.stop()
-            time.sleep(0.1)
+        self.play(STARTUP_PATTERN, PRIORITY_STARTUP)
 
 
     # Potty alert
     def trigger_buzzer(self):
-        self.buzzer_pwm.ChangeFrequency(4000)
-        self.buzzer_pwm.start(50)
-        time.sleep(3)
-        self.buzzer_pwm.stop()
\ No newline at end of file
+        self.play(POTTY_PATTERN, PRIORITY_POTTY)
+
+    def cleanup(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._worker.join(timeout=1)
+        self.buzzer_pwm.stop()
@@ -0,0 +1,68 @@
+import time
+
+INACTIVE_TIME_THRESHOLD = 30.0
+WAIT_TIME_THRESHOLD = 10.0 # If motion detected this long, wants to go out
+POTTY_RESPONSE_TIME = 10.0 # Seconds for owner to respond before back to normal tracking
+
+# Potty detection as a state machine, with no GPIO or wall clock in it, so it can
+# be driven by recorded traces (see replay.py) as well as the PIR.
+#   inactive  no motion for inactive_threshold seconds
+#   detected  motion around the door
+#   potty     motion kept up for wait_threshold seconds. Stays potty for
+#             response_time seconds, then back to detected
+# hysteresis is the longest gap in motion that still counts as the dog staying
+# by the door. Longer gaps restart the wait. By default only going inactive does
+class MotionDetector:
+    def __init__(
+        self,
+        inactive_threshold=INACTIVE_TIME_THRESHOLD,
+        wait_threshold=WAIT_TIME_THRESHOLD,
+        response_time=POTTY_RESPONSE_TIME,
+        hysteresis=None,
+        clock=time.time
+    ):
+        self.inactive_threshold = inactive_threshold
+        self.wait_threshold = wait_threshold
+        self.response_time = response_time
+        self.hysteresis = inactive_threshold if hysteresis is None else hysteresis
+        self.clock = clock
+
+        self.prev_time = clock() # Last time motion was seen
+        self.start_detect_time = None # When the dog started waiting by the door
+        self.potty_alert_time = None
+        self.state = None
+        self.alerts = 0
+
+    # Feed one PIR sample. Returns (state, alert): the state to report, or None
+    # when there is nothing to report, and whether to sound the potty alert
+    def update(self, motion, now=None):
+        now = self.clock() if now is None else now
+
+        if not motion:
+            if now - self.prev_time > self.hysteresis:
+                self.start_detect_time = None
+
+            # No motion detected for some time
+            if now - self.prev_time > self.inactive_threshold:
+                self.state = "inactive"
+                return self.state, False
+            return None, False
+
+        # Gap since the last motion was too long to count as the same wait
+        if now - self.prev_time > self.hysteresis:
+            self.start_detect_time = None
+        self.prev_time = now
+
+        alert = False
+        potty = self.potty_alert_time is not None and now - self.potty_alert_time < self.response_time
+        if self.start_detect_time is None:
+            self.start_detect_time = now
+        elif not potty and now - self.start_detect_time > self.wait_threshold: # Dog waiting by door
+            alert = potty = True
+            self.potty_alert_time = now
+            self.start_detect_time = now
+            self.alerts += 1
+
+        # Keep showing the potty alert while the owner has time to respond
+        self.state = "potty" if potty else "detected"
+        return self.state, alert
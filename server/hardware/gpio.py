@@ -0,0 +1,192 @@
+import threading
+import platform
+import time
+import os
+
+# GPIO backend for the hardware package. On the Pi this is RPi.GPIO. Anywhere
+# else, or with GPIO_BACKEND=sim, it is SimulatedGPIO below, so the device loop
+# can be run, benchmarked and tested on a normal Linux box.
+#   GPIO_BACKEND=auto  RPi.GPIO if it can be imported, else simulated (default off ARM)
+#   GPIO_BACKEND=rpi   RPi.GPIO, failing if it isn't there (default on ARM, so a
+#                      Pi with a broken RPi.GPIO stops instead of quietly simulating)
+#   GPIO_BACKEND=sim   simulated
+ON_ARM = platform.machine().startswith(("arm", "aarch64"))
+GPIO_BACKEND = os.getenv("GPIO_BACKEND", "rpi" if ON_ARM else "auto")
+
+
+# Records what is played on a simulated PWM pin in gpio.pwm_log as
+# (time, pin, action, value) tuples
+class SimulatedPWM:
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = 0
+        self.running = False
+
+    def _log(self, action, value=None):
+        with self.gpio._lock:
+            self.gpio.pwm_log.append((self.gpio.clock(), self.pin, action, value))
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.running = True
+        self._log("start", duty_cycle)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+        self._log("frequency", frequency)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self._log("duty_cycle", duty_cycle)
+
+    def stop(self):
+        self.running = False
+        self._log("stop")
+
+
+# Same calls and constants as RPi.GPIO. Input levels are set by the caller with
+# set_input(), or scripted as a waveform of (seconds, level) steps that
+# advance() or play() applies. Edge callbacks run on the thread that changed
+# the level, after the same bounce filtering as RPi.GPIO
+class SimulatedGPIO:
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.mode = None
+        self.directions = {}
+        self.levels = {}
+        self.pwm_log = []
+        self._edges = {} # pin -> (edge, callback, bouncetime in seconds, last edge time)
+        self._waveforms = {} # pin -> list of (time, level) still to apply
+        self._lock = threading.RLock()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        with self._lock:
+            self.directions[pin] = direction
+            if initial is not None:
+                self.levels[pin] = initial
+            else:
+                self.levels.setdefault(pin, self.HIGH if pull_up_down == self.PUD_UP else self.LOW)
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def output(self, pin, level):
+        self.levels[pin] = self.HIGH if level else self.LOW
+
+    def PWM(self, pin, frequency):
+        return SimulatedPWM(self, pin, frequency)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if pin in self._edges:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            self._edges[pin] = [edge, callback, (bouncetime or 0) / 1000, None]
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self._edges.pop(pin, None)
+
+    def cleanup(self, pin=None):
+        with self._lock:
+            pins = list(self.directions) if pin is None else [pin]
+            for pin in pins:
+                self._edges.pop(pin, None)
+                self._waveforms.pop(pin, None)
+                self.directions.pop(pin, None)
+
+    # Drive an input pin. Returns True if its level changed. now is when it
+    # changed, for bounce filtering, and defaults to the clock
+    def set_input(self, pin, level, now=None):
+        level = self.HIGH if level else self.LOW
+        with self._lock:
+            if self.levels.get(pin, self.LOW) == level:
+                return False
+            self.levels[pin] = level
+            callback = self._edge_callback(pin, level, self.clock() if now is None else now)
+        if callback:
+            callback(pin)
+        return True
+
+    def _edge_callback(self, pin, level, now):
+        detect = self._edges.get(pin)
+        if detect is None:
+            return None
+        edge, callback, bouncetime, last = detect
+        if edge != self.BOTH and edge != (self.RISING if level else self.FALLING):
+            return None
+        if last is not None and now - last < bouncetime:
+            return None
+        detect[3] = now
+        return callback
+
+    # Script a pin's levels as (seconds from start, level) steps. start defaults to now
+    def load_waveform(self, pin, waveform, start=None):
+        start = self.clock() if start is None else start
+        with self._lock:
+            self._waveforms[pin] = sorted((start + offset, level) for offset, level in waveform)
+
+    # Apply every scripted step due by now
+    def advance(self, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            due = []
+            for pin, steps in self._waveforms.items():
+                while steps and steps[0][0] <= now:
+                    at, level = steps.pop(0)
+                    due.append((at, pin, level))
+        for at, pin, level in sorted(due):
+            self.set_input(pin, level, at)
+
+    # Apply the scripted steps in real time on a background thread
+    def play(self, stop=None):
+        stop = stop or threading.Event()
+
+        def run():
+            while not stop.is_set():
+                with self._lock:
+                    upcoming = [steps[0][0] for steps in self._waveforms.values() if steps]
+                if not upcoming:
+                    return
+                stop.wait(max(min(upcoming) - self.clock(), 0))
+                self.advance()
+
+        thread = threading.Thread(target=run, name="gpio-waveform", daemon=True)
+        thread.start()
+        return thread
+
+
+def load_backend(name=GPIO_BACKEND):
+    if name == "sim":
+        return SimulatedGPIO()
+    try:
+        import RPi.GPIO as GPIO
+        return GPIO
+    except (ImportError, RuntimeError) as e: # RuntimeError when not on a Pi
+        if name == "rpi":
+            raise
+        print(f"RPi.GPIO unavailable, using simulated GPIO: {e}")
+        return SimulatedGPIO()
+
+
+GPIO = load_backend()
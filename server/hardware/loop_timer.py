@@ -0,0 +1,48 @@
+from collections import deque
+import time
+
+# Keeps a loop on a fixed cadence. wait() sleeps until the next scheduled tick
+# rather than for a fixed time, so slow iterations don't push later ones back,
+# and records how late each tick actually woke up (jitter). It can also be
+# woken early by an event, e.g. a PIR edge
+class LoopTimer:
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep, window=600):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.next_tick = None
+        self.overruns = 0
+        self._jitter = deque(maxlen=window) # Seconds late, for the last `window` ticks
+
+    # Sleep until the next tick, or until `wake` (a threading.Event) is set.
+    # Returns True for a tick, False when woken early. Early wakes don't move the schedule
+    def wait(self, wake=None):
+        if self.next_tick is None:
+            self.next_tick = self.clock() + self.interval
+
+        delay = self.next_tick - self.clock()
+        if delay > 0:
+            if wake is None:
+                self.sleep(delay)
+            elif wake.wait(delay):
+                wake.clear()
+                return False
+        elif -delay > self.interval:
+            # A whole tick behind. Start again from now instead of rushing to catch up
+            self.overruns += 1
+            self.next_tick = self.clock()
+
+        self._jitter.append(max(0.0, self.clock() - self.next_tick))
+        self.next_tick += self.interval
+        return True
+
+    def stats(self):
+        jitter = sorted(self._jitter)
+        if not jitter:
+            return {"mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "overruns": self.overruns}
+        return {
+            "mean_ms": round(sum(jitter) / len(jitter) * 1000, 2),
+            "p99_ms": round(jitter[int(len(jitter) * 0.99)] * 1000, 2),
+            "max_ms": round(jitter[-1] * 1000, 2),
+            "overruns": self.overruns
+        }
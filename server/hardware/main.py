@@ -1,56 +1,98 @@
-from .sensor_publisher import publish_motion
-from .buzzer import PiezoBuzzer   
-from .pir import PIRSensor 
-import RPi.GPIO as GPIO
+from .sensor_publisher import BackgroundPublisher, RASPBERRY_DEVICE_ID
+from .sensors import SensorGroup, parse_sensors
+from .loop_timer import LoopTimer
+from .trace import TraceRecorder
+from .buzzer import PiezoBuzzer
+from .gpio import GPIO, SimulatedGPIO
+from .replay import load_trace
 import time
+import os
 
-# Configure PIR and Buzzer
-PIR_PIN = 17   
-pir = PIRSensor(PIR_PIN)
-buzzer = PiezoBuzzer()
+# Variables
+INACTIVE_TIME_THRESHOLD = float(os.getenv("INACTIVE_TIME_THRESHOLD", 30))
+WAIT_TIME_THRESHOLD = float(os.getenv("WAIT_TIME_THRESHOLD", 10)) # If motion detected this long, wants to go out
+POTTY_RESPONSE_TIME = float(os.getenv("POTTY_RESPONSE_TIME", 10)) # Seconds for owner to respond before back to normal tracking
+MOTION_HYSTERESIS = float(os.getenv("MOTION_HYSTERESIS", INACTIVE_TIME_THRESHOLD)) # Longest gap in motion that keeps the wait going
+SAMPLE_INTERVAL = 1.0 # Seconds between PIR reads
+STATS_INTERVAL = 600.0 # Seconds between publish counter prints
 
-# Variables 
-curr_time = time.time()
-prev_time = time.time()
-start_detect_time = None
-detected_potty = False
-INACTIVE_TIME_THRESHOLD = 30.0
-WAIT_TIME_THRESHOLD = 10.0 # If motion detected this long, wants to go out
+# Configure PIRs and Buzzer. One PIR on pin 17 unless PIR_SENSORS lists several
+PIR_PIN = 17
+PIR_SENSORS = parse_sensors(os.getenv("PIR_SENSORS"), PIR_PIN)
+if not RASPBERRY_DEVICE_ID: # Every sensor's events go on this Pi's own channel
+    raise ValueError("RASPBERRY_DEVICE_ID isn't set. Register the Pi with python channels.py register <user_id> <device_id>")
+PIR_EDGE_DETECT = os.getenv("PIR_EDGE_DETECT", "1") == "1" # 0 to poll once per tick instead
+background = BackgroundPublisher() # Network calls happen on its thread
+sensors = SensorGroup(
+    PIR_SENSORS,
+    background.publish_messages, # Every sensor's events from a tick are queued together
+    edge_detect=PIR_EDGE_DETECT,
+    inactive_threshold=INACTIVE_TIME_THRESHOLD,
+    wait_threshold=WAIT_TIME_THRESHOLD,
+    response_time=POTTY_RESPONSE_TIME,
+    hysteresis=MOTION_HYSTERESIS
+)
+buzzer = PiezoBuzzer() # Shared by every door
+
+# Off the Pi, play a recorded trace into the simulated PIR pins in real time
+PIR_SIM_TRACE = os.getenv("PIR_SIM_TRACE")
+if PIR_SIM_TRACE and isinstance(GPIO, SimulatedGPIO):
+    samples = load_trace(PIR_SIM_TRACE)
+    for sensor in sensors.sensors:
+        GPIO.load_waveform(sensor.pir.pin, [(at - samples[0][0], level) for at, level in samples])
+    GPIO.play()
+
+# Record the raw PIR levels for hardware/replay.py and benchmarks/bench_pir.py,
+# one file per sensor when there are several
+PIR_TRACE_PATH = os.getenv("PIR_TRACE_PATH")
+recorders = []
+if PIR_TRACE_PATH:
+    for sensor in sensors.sensors:
+        path = PIR_TRACE_PATH if len(sensors.sensors) == 1 else f"{PIR_TRACE_PATH}.{sensor.device_id}"
+        recorder = TraceRecorder(path, pin=sensor.pir.pin)
+        if sensor.pir.edge_detect:
+            recorder.attach(sensor.pir)
+        recorders.append((sensor.pir, recorder))
+
+last_stats_time = time.time()
+timer = LoopTimer(SAMPLE_INTERVAL)
+
+def print_stats():
+    print(f"Sensors: {sensors.stats()}")
+    print(f"Publish queue: {background.stats()}")
+    print(f"Loop jitter: {timer.stats()}")
 
 try:
-    print("Starting motion detection...")
+    print(f"Starting motion detection on {len(sensors.sensors)} sensor(s)...")
     time.sleep(5)  # Give PIR sensor time to stabilize
     buzzer.tigger_startup_buzzer()
 
     while True:
         now = time.time()
-        
-        # No motion detected for some time
-        if now - prev_time > INACTIVE_TIME_THRESHOLD:
-            print("No activity for some time!")
-            publish_motion("inactive")#
-            start_detect_time = None
-        
-        # Basic motion detected
-        if pir.motion_detected():
-            print("Motion detected")
-            publish_motion("detected")
-            prev_time = now # Reset
-            
-            if start_detect_time is None:
-                start_detect_time = now
-            elif detected_potty is False and now - start_detect_time > WAIT_TIME_THRESHOLD: # Dog waiting by door
-                detected_potty = True
-                print("Dog wants to potty!")
-                publish_motion("potty")
-                start_detect_time = now
-                buzzer.trigger_buzzer()
-                time.sleep(10) # 10s for owner to respond before back to normal tracking
-                detected_potty = False
-                
-        time.sleep(1)  
+        # Every tick in both modes: an edge inside the bounce time never reaches
+        # the recorder's callback. Only changes of level are written
+        for pir, recorder in recorders:
+            recorder.record(pir.read())
+
+        for sensor in sensors.step(now):
+            print(f"Dog wants to potty at {sensor.name}!")
+            buzzer.trigger_buzzer() # Plays in the background
+
+        if now - last_stats_time > STATS_INTERVAL:
+            print_stats()
+            last_stats_time = now
+            for _, recorder in recorders:
+                recorder.flush()
+
+        # Next tick, or straight away on an edge from any PIR
+        timer.wait(sensors.wake if sensors.edge_detect else None)
 
 except KeyboardInterrupt:
     print("Exiting program...")
-    pir.cleanup()
-    GPIO.cleanup()
\ No newline at end of file
+    background.stop()
+    buzzer.cleanup()
+    print_stats()
+    sensors.cleanup() # Removes the edge callbacks, so nothing records after the close below
+    for _, recorder in recorders:
+        recorder.close()
+    GPIO.cleanup()
@@ -0,0 +1,87 @@
+import threading
+import sqlite3
+import json
+
+# On-disk queue of motion messages that could not be published. Rows are only
+# appended and deleted from the front, and flushed oldest first in batches.
+# Past max_rows it compacts: heartbeats go first (they only repeat a state),
+# then the oldest events, so the SD card never fills up
+class Outbox:
+    def __init__(self, path, max_rows=50000, batch_size=100):
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.compacted = 0
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL") # Only applies to a new file
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL") # Fewer SD card syncs
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                heartbeat INTEGER NOT NULL DEFAULT 0,
+                message TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def pending(self):
+        return self._count
+
+    def append(self, message):
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO outbox (heartbeat, message) VALUES (?, ?)",
+                (1 if message.get("heartbeat") else 0, json.dumps(message))
+            )
+            self._count += 1
+            if self._count > self.max_rows:
+                self._compact()
+            self.conn.commit()
+
+    # Bring the outbox down to 90% of max_rows, so it doesn't compact on every append
+    def _compact(self):
+        excess = self._count - int(self.max_rows * 0.9)
+        for condition in ("heartbeat = 1", "1 = 1"):
+            if excess <= 0:
+                break
+            deleted = self.conn.execute(
+                f"DELETE FROM outbox WHERE id IN (SELECT id FROM outbox WHERE {condition} ORDER BY id LIMIT ?)",
+                (excess,)
+            ).rowcount
+            excess -= deleted
+            self._count -= deleted
+            self.compacted += deleted
+        self.conn.execute("PRAGMA incremental_vacuum")
+
+    # Send queued messages in order, batch_size at a time, with send(messages).
+    # Stops at the first batch that fails and raises its error. Returns how many were sent
+    def flush(self, send):
+        sent = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT id, message FROM outbox ORDER BY id LIMIT ?",
+                    (self.batch_size,)
+                ).fetchall()
+            if not rows:
+                return sent
+
+            send([json.loads(message) for _, message in rows])
+
+            with self._lock:
+                deleted = self.conn.execute("DELETE FROM outbox WHERE id <= ?", (rows[-1][0],)).rowcount
+                self._count -= deleted
+                self.conn.commit()
+            sent += len(rows)
+
+    def stats(self):
+        return {
+            "pending": self._count,
+            "compacted": self.compacted
+        }
+
+    def close(self):
+        self.conn.close()
@@ -1,18 +1,71 @@
-import RPi.GPIO as GPIO
+from .gpio import GPIO
+
+PIR_BOUNCE_MS = 50 # Edges closer together than this are treated as one
 
 class PIRSensor:
-    def __init__(self, pin, mode=GPIO.BCM):
+    def __init__(self, pin, mode=GPIO.BCM, edge_detect=False, bouncetime=PIR_BOUNCE_MS, gpio=GPIO):
         self.pin = pin
-        GPIO.setmode(mode)
-        GPIO.setup(self.pin, GPIO.IN)
+        self.gpio = gpio
+        self.gpio.setmode(mode)
+        self.gpio.setup(self.pin, self.gpio.IN)
+
+        # Edge-triggered mode
+        self.edge_detect = False
+        self.edges = 0
+        self._pulse = False # Rising edge not yet seen by motion_detected()
+        self._callbacks = []
+        if edge_detect:
+            self.start_edge_detection(bouncetime)
+
+    # Switch to GPIO interrupts. Falls back to polling (returns False) if the
+    # kernel or pin can't do edge detection
+    def start_edge_detection(self, bouncetime=PIR_BOUNCE_MS):
+        try:
+            self.gpio.add_event_detect(self.pin, self.gpio.BOTH, callback=self._on_edge, bouncetime=bouncetime)
+        except RuntimeError as e:
+            print(f"Edge detection unavailable, polling PIR instead: {e}")
+            return False
+
+        self.edge_detect = True
+        return True
+
+    # Called on the GPIO thread. Reads the level, as the callback isn't told which edge it was
+    def _on_edge(self, channel):
+        motion = self.gpio.input(self.pin) == self.gpio.HIGH
+        if motion:
+            self._pulse = True
+        self.edges += 1
+
+        for callback in self._callbacks:
+            callback(motion)
+
+    # callback(motion) runs on every edge, on the GPIO thread
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
 
     def read(self):
         # Return raw GPIO value (0 or 1).
-        return GPIO.input(self.pin)
+        return self.gpio.input(self.pin)
 
     def motion_detected(self):
         # Return True if motion is detected.
-        return GPIO.input(self.pin) == GPIO.HIGH
+        if not self.edge_detect:
+            return self.gpio.input(self.pin) == self.gpio.HIGH
+
+        # A pulse that ended before this call still counts once. Otherwise read
+        # the pin, as edges inside the bounce time never reach _on_edge
+        if self._pulse:
+            self._pulse = False
+            return True
+        return self.gpio.input(self.pin) == self.gpio.HIGH
+
+    def stats(self):
+        return {
+            "mode": "edge" if self.edge_detect else "poll",
+            "edges": self.edges
+        }
 
     def cleanup(self):
-        GPIO.cleanup(self.pin)
+        if self.edge_detect:
+            self.gpio.remove_event_detect(self.pin)
+        self.gpio.cleanup(self.pin)
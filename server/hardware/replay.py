@@ -0,0 +1,156 @@
+from .detection import MotionDetector, INACTIVE_TIME_THRESHOLD, WAIT_TIME_THRESHOLD, POTTY_RESPONSE_TIME
+from .sensor_publisher import StatePublisher, HEARTBEAT_INTERVAL
+from .trace import is_trace, read_trace
+import itertools
+import argparse
+import time
+
+# Replays recorded PIR traces through MotionDetector and StatePublisher on a
+# simulated clock, so thresholds can be tuned against days of data in seconds.
+#
+# A trace is a binary file from trace.TraceRecorder, or a text file with one
+# "timestamp level" pair per line (comma or space separated, '#' starts a
+# comment), e.g. the PIR output level each time it changed:
+#   1740819600.00,1
+#   1740819604.25,0
+# Run from server/:
+#   python -m hardware.replay door.csv --wait 5 10 15 --hysteresis 10 30
+
+SAMPLE_INTERVAL = 1.0 # Same as main.py
+
+
+def load_trace(path):
+    if is_trace(path):
+        return read_trace(path)[1]
+
+    samples = []
+    with open(path) as file:
+        for line in file:
+            line = line.split("#")[0].replace(",", " ").split()
+            if line:
+                samples.append((float(line[0]), int(line[1]) != 0))
+    samples.sort(key=lambda sample: sample[0])
+    return samples
+
+
+# Motion seen at each tick, like the loop in main.py sees it: the level at the
+# tick, or any pulse since the last tick (edge detection latches short pulses).
+# Yields (time, motion)
+def sample_trace(samples, interval=SAMPLE_INTERVAL):
+    if not samples:
+        return
+    now = samples[0][0]
+    end = samples[-1][0]
+    level = False
+    i = 0
+    while now <= end:
+        motion = level
+        while i < len(samples) and samples[i][0] <= now:
+            level = samples[i][1]
+            motion = motion or level
+            i += 1
+        yield now, motion
+        now += interval
+
+
+# Run one trace through a detector with the given thresholds. The publisher
+# only counts what would be sent
+def replay(
+    samples,
+    inactive_threshold=INACTIVE_TIME_THRESHOLD,
+    wait_threshold=WAIT_TIME_THRESHOLD,
+    response_time=POTTY_RESPONSE_TIME,
+    hysteresis=None,
+    interval=SAMPLE_INTERVAL,
+    heartbeat_interval=HEARTBEAT_INTERVAL
+):
+    clock = [samples[0][0] if samples else 0.0]
+    detector = MotionDetector(
+        inactive_threshold=inactive_threshold,
+        wait_threshold=wait_threshold,
+        response_time=response_time,
+        hysteresis=hysteresis,
+        clock=lambda: clock[0]
+    )
+    publisher = StatePublisher(
+        publish=lambda state, heartbeat=False: None,
+        heartbeat_interval=heartbeat_interval,
+        clock=lambda: clock[0]
+    )
+
+    alerts = []
+    seconds = {"inactive": 0.0, "detected": 0.0, "potty": 0.0}
+    transitions = 0
+    ticks = 0
+    started = time.perf_counter()
+
+    for now, motion in sample_trace(samples, interval):
+        clock[0] = now
+        ticks += 1
+        state, alert = detector.update(motion)
+        if alert:
+            alerts.append(now)
+        if state:
+            if state != publisher.state and publisher.state is not None:
+                transitions += 1
+            publisher.update(state)
+        publisher.tick()
+        if publisher.state:
+            seconds[publisher.state] += interval
+
+    elapsed = time.perf_counter() - started
+    simulated = ticks * interval
+    return {
+        "inactive_threshold": inactive_threshold,
+        "wait_threshold": wait_threshold,
+        "hysteresis": detector.hysteresis,
+        "alerts": len(alerts),
+        "alert_times": alerts,
+        "transitions": transitions,
+        "seconds": seconds,
+        "publishes": publisher.stats(),
+        "simulated_seconds": simulated,
+        "speedup": round(simulated / elapsed) if elapsed else None
+    }
+
+
+# Every combination of the thresholds, over every trace
+def grid_search(traces, inactive_thresholds, wait_thresholds, hysteresis_values, **kwargs):
+    results = []
+    for inactive, wait, hysteresis in itertools.product(inactive_thresholds, wait_thresholds, hysteresis_values):
+        for name, samples in traces:
+            result = replay(samples, inactive_threshold=inactive, wait_threshold=wait, hysteresis=hysteresis, **kwargs)
+            result["trace"] = name
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay PIR traces through the potty detector")
+    parser.add_argument("traces", nargs="+")
+    parser.add_argument("--inactive", type=float, nargs="+", default=[INACTIVE_TIME_THRESHOLD])
+    parser.add_argument("--wait", type=float, nargs="+", default=[WAIT_TIME_THRESHOLD])
+    parser.add_argument("--hysteresis", type=float, nargs="+", default=[None])
+    parser.add_argument("--response", type=float, default=POTTY_RESPONSE_TIME)
+    parser.add_argument("--interval", type=float, default=SAMPLE_INTERVAL)
+    args = parser.parse_args()
+
+    traces = [(path, load_trace(path)) for path in args.traces]
+    results = grid_search(
+        traces, args.inactive, args.wait, args.hysteresis,
+        response_time=args.response, interval=args.interval
+    )
+
+    print("trace\tinactive\twait\thysteresis\talerts\ttransitions\tpotty_s\tdetected_s\tpublishes\tspeedup")
+    for result in results:
+        publishes = result["publishes"]["sent"] + result["publishes"]["heartbeats"]
+        print(
+            f"{result['trace']}\t{result['inactive_threshold']}\t{result['wait_threshold']}\t"
+            f"{result['hysteresis']}\t{result['alerts']}\t{result['transitions']}\t"
+            f"{result['seconds']['potty']:.0f}\t{result['seconds']['detected']:.0f}\t"
+            f"{publishes}\t{result['speedup']}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
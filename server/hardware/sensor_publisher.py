@@ -1,21 +1,310 @@
 from pubnub.pnconfiguration import PNConfiguration
 from pubnub.pubnub import PubNub
 from dotenv import load_dotenv
+from .outbox import Outbox
+import threading
+import tempfile
+import queue
 import time
 import os
 
-load_dotenv("/home/pi/PottyDog/.env")
+# Settings from POTTYDOG_ENV_FILE, else the Pi's install folder, else a .env
+# found the way the server finds its own (e.g. when running off the Pi)
+PI_ENV_FILE = "/home/pi/PottyDog/.env"
+POTTYDOG_ENV_FILE = os.getenv("POTTYDOG_ENV_FILE")
+if POTTYDOG_ENV_FILE:
+    load_dotenv(POTTYDOG_ENV_FILE)
+elif os.path.exists(PI_ENV_FILE):
+    load_dotenv(PI_ENV_FILE)
+else:
+    load_dotenv()
 
-# Create PubNub object
-pnconfig = PNConfiguration()
-pnconfig.publish_key = os.getenv("PUBLISH_KEY")
-pnconfig.subscribe_key = os.getenv("SUBSCRIBE_KEY")
-pnconfig.uuid = "raspberry-pi"
-pubnub = PubNub(pnconfig)
-pubnub.set_token(os.getenv("PUBLISH_TOKEN"))
+# PubNub object, created on first publish so importing this needs no keys
+pubnub = None
 
-def publish_motion(state):
-    pubnub.publish().channel("Channel-Barcelona").message({
+def get_pubnub():
+    global pubnub
+    if pubnub is None:
+        pnconfig = PNConfiguration()
+        pnconfig.publish_key = os.getenv("PUBLISH_KEY")
+        pnconfig.subscribe_key = os.getenv("SUBSCRIBE_KEY")
+        pnconfig.uuid = "raspberry-pi"
+        pubnub = PubNub(pnconfig)
+        pubnub.set_token(os.getenv("PUBLISH_TOKEN"))
+    return pubnub
+
+# Same naming as channels.device_channel on the server
+def device_channel(device_id):
+    return f"pottydog.device.{device_id}"
+
+# This Pi's own channel, which carries the messages of all of its sensors
+RASPBERRY_DEVICE_ID = os.getenv("RASPBERRY_DEVICE_ID")
+DEVICE_CHANNEL = device_channel(RASPBERRY_DEVICE_ID)
+
+# Keep below the server's MOTION_STATE_CAP so history has no gaps
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", 30)) # Seconds
+
+# Events that could not be published wait here until the network is back.
+# Defaults to the Pi's install folder, or the temp folder with simulated GPIO
+OUTBOX_PATH = os.getenv("OUTBOX_PATH")
+OUTBOX_MAX_ROWS = int(os.getenv("OUTBOX_MAX_ROWS", 50000)) # About 100 bytes each
+OUTBOX_RETRY_INTERVAL = float(os.getenv("OUTBOX_RETRY_INTERVAL", 10)) # Seconds between flush attempts
+outbox = None
+last_flush_attempt = 0.0
+
+def default_outbox_path():
+    # Imported here so the .env above is loaded before the backend is picked
+    from .gpio import GPIO, SimulatedGPIO
+    if isinstance(GPIO, SimulatedGPIO):
+        return os.path.join(tempfile.gettempdir(), "pottydog-outbox.sqlite3")
+    return "/home/pi/PottyDog/outbox.sqlite3"
+
+def get_outbox():
+    global outbox
+    if outbox is None:
+        outbox = Outbox(OUTBOX_PATH or default_outbox_path(), max_rows=OUTBOX_MAX_ROWS)
+    return outbox
+
+
+# A motion message. device_id is only set when one Pi has several sensors
+def motion_message(state, heartbeat=False, timestamp=None, device_id=None):
+    message = {
         "motion": state,
-        "timestamp": time.time()
-    }).sync()
\ No newline at end of file
+        "timestamp": timestamp or time.time()
+    }
+    if heartbeat:
+        message["heartbeat"] = True
+    if device_id:
+        message["device_id"] = device_id
+    return message
+
+
+# Every message goes on this Pi's own channel, one publish for the lot: one
+# message as is, several as a batch the server unpacks in order. Messages for
+# the Pi's other sensors name their device_id, and the server only accepts them
+# when that device is registered to the same user as the Pi
+def send_messages(messages):
+    message = messages[0] if len(messages) == 1 else {"type": "batch", "events": messages}
+    get_pubnub().publish().channel(DEVICE_CHANNEL).message(message).sync()
+
+
+# Try to send what is in the outbox, at most every OUTBOX_RETRY_INTERVAL seconds
+def flush_outbox():
+    global last_flush_attempt
+    box = get_outbox()
+    if not box.pending() or time.time() - last_flush_attempt < OUTBOX_RETRY_INTERVAL:
+        return 0
+
+    last_flush_attempt = time.time()
+    try:
+        sent = box.flush(send_messages)
+        print(f"Sent {sent} event(s) from the outbox")
+        return sent
+    except Exception as e:
+        print(f"Outbox flush failed, {box.pending()} event(s) waiting: {e}")
+        return 0
+
+
+# Publish motion messages. Never raises: what can't be sent now goes to the
+# outbox, and while the outbox has events new ones queue behind them
+def publish_messages(messages):
+    box = get_outbox()
+    if box.pending():
+        flush_outbox()
+    if box.pending():
+        for message in messages:
+            box.append(message)
+        return
+
+    try:
+        send_messages(messages)
+    except Exception as e:
+        print(f"Publish failed, saved to outbox: {e}")
+        for message in messages:
+            box.append(message)
+
+
+# Publish a motion state
+def publish_motion(state, heartbeat=False, timestamp=None, device_id=None):
+    publish_messages([motion_message(state, heartbeat, timestamp, device_id)])
+
+
+SENSOR_QUEUE_DEPTH = int(os.getenv("SENSOR_QUEUE_DEPTH", 100))
+SENSOR_BATCH_SIZE = int(os.getenv("SENSOR_BATCH_SIZE", 50)) # Most messages per send
+
+# Runs publish_messages on its own thread so the sampling loop never waits on the
+# network. Events keep the time they were sampled at. Whatever has queued up
+# while a send was in progress, from every sensor, goes out in the next send.
+# If the queue is full events are dropped and counted rather than blocking the loop
+class BackgroundPublisher:
+    def __init__(
+        self,
+        send=publish_messages,
+        flush=flush_outbox,
+        max_depth=SENSOR_QUEUE_DEPTH,
+        idle_interval=1.0,
+        batch_size=SENSOR_BATCH_SIZE
+    ):
+        self.send = send
+        self.flush = flush
+        self.idle_interval = idle_interval # Seconds without events before trying the outbox
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_depth)
+
+        # Counters
+        self.queued = 0
+        self.sent = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth_seen = 0
+        self.total_send_time = 0.0
+        self.max_send_time = 0.0
+
+        # Last, as the worker updates the counters
+        self._worker = threading.Thread(target=self._run, name="motion-publisher", daemon=True)
+        self._worker.start()
+
+    # Called from the sampling loop. Never blocks
+    def publish(self, state, heartbeat=False, device_id=None):
+        return self.publish_messages([motion_message(state, heartbeat, time.time(), device_id)])
+
+    # Queue several messages as one item, e.g. every sensor's events from one tick
+    def publish_messages(self, messages):
+        try:
+            self._queue.put_nowait(messages)
+        except queue.Full:
+            self.dropped += len(messages)
+            return False
+        self.queued += len(messages)
+        self.max_depth_seen = max(self.max_depth_seen, self._queue.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_interval)
+            except queue.Empty:
+                try:
+                    self.flush() # Catch up after a network drop
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Outbox flush failed: {e}")
+                continue
+            if item is None:
+                return
+
+            batch = list(item)
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.extend(item)
+
+            # An error loses this batch, not the worker
+            start = time.perf_counter()
+            try:
+                self.send(batch)
+            except Exception as e:
+                self.errors += 1
+                self.dropped += len(batch)
+                print(f"Publish failed, {len(batch)} event(s) lost: {e}")
+            else:
+                elapsed = time.perf_counter() - start
+                self.sent += len(batch)
+                self.batches += 1
+                self.total_send_time += elapsed
+                self.max_send_time = max(self.max_send_time, elapsed)
+            if stopping:
+                return
+
+    # Send what is queued, then stop the worker
+    def stop(self, timeout=10):
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._worker.join(timeout)
+
+    def stats(self):
+        return {
+            "depth": self._queue.qsize(),
+            "max_depth": self.max_depth_seen,
+            "queued": self.queued,
+            "sent": self.sent,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avg_send_ms": round(self.total_send_time / self.batches * 1000, 2) if self.batches else 0.0,
+            "max_send_ms": round(self.max_send_time * 1000, 2)
+        }
+
+
+# Publishes only when the motion state changes, plus a heartbeat with the
+# current state every heartbeat_interval seconds so the dashboard and server
+# know the Pi is still there. If publish returns False (e.g. the background
+# queue is full) the state wasn't sent, and tick() tries it again
+class StatePublisher:
+    def __init__(self, publish=publish_motion, heartbeat_interval=HEARTBEAT_INTERVAL, clock=time.time):
+        self.publish = publish
+        self.heartbeat_interval = heartbeat_interval
+        self.clock = clock
+        self.state = None # Last state sent
+        self.unsent = None # State change publish refused, to try again
+        self.last_sent = None
+
+        # Counters
+        self.sent = 0
+        self.heartbeats = 0
+        self.suppressed = 0
+        self.retries = 0
+
+    def _send_state(self, state):
+        if self.publish(state) is False:
+            self.unsent = state
+            return False
+        self.unsent = None
+        self.sent += 1
+        self.state = state
+        self.last_sent = self.clock()
+        return True
+
+    # Report the current state. Returns True if a message was published
+    def update(self, state):
+        if state != self.state:
+            return self._send_state(state)
+        self.unsent = None # Back to what was last sent
+        if self.tick():
+            return True
+        self.suppressed += 1
+        return False
+
+    # Send a state change that was refused, or a heartbeat if one is due, or
+    # due within early seconds
+    def tick(self, early=0):
+        if self.unsent is not None:
+            self.retries += 1
+            return self._send_state(self.unsent)
+        if self.state is None or self.clock() - self.last_sent < self.heartbeat_interval - early:
+            return False
+        if self.publish(self.state, heartbeat=True) is False:
+            return False # Still due next tick
+        self.heartbeats += 1
+        self.last_sent = self.clock()
+        return True
+
+    def stats(self):
+        published = self.sent + self.heartbeats
+        total = published + self.suppressed
+        return {
+            "sent": self.sent,
+            "heartbeats": self.heartbeats,
+            "suppressed": self.suppressed,
+            "retries": self.retries,
+            "reduction": round(self.suppressed / total, 3) if total else 0.0
+        }
\ No newline at end of file
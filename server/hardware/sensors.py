@@ -0,0 +1,120 @@
+from .sensor_publisher import StatePublisher, motion_message, HEARTBEAT_INTERVAL
+from .detection import MotionDetector
+from .pir import PIRSensor
+from .gpio import GPIO
+import threading
+import time
+
+# Several PIR sensors, e.g. one per door, run by one loop in one process. Each
+# has its own detection state and device id, and they share the loop, the
+# buzzer and the background publisher.
+# Configured with PIR_SENSORS as device_id:pin pairs:
+#   PIR_SENSORS=pi-front-door:17,pi-back-door:27
+# Their events go out together on the Pi's own channel (RASPBERRY_DEVICE_ID),
+# so register the Pi and every sensor's device id to the same user
+# (python channels.py register <user_id> <device_id>)
+
+
+# "pi-front-door:17,pi-back-door:27" -> [("pi-front-door", 17), ("pi-back-door", 27)].
+# Empty means the one sensor on default_pin, publishing as this Pi (device_id None)
+def parse_sensors(spec, default_pin):
+    sensors = []
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        device_id, _, pin = entry.strip().rpartition(":")
+        if not device_id or not pin.isdigit():
+            raise ValueError(f"PIR_SENSORS entry '{entry}' should be device_id:pin")
+        sensors.append((device_id, int(pin)))
+    if len({device_id for device_id, _ in sensors}) < len(sensors) or len({pin for _, pin in sensors}) < len(sensors):
+        raise ValueError("PIR_SENSORS has the same device id or pin twice")
+    return sensors or [(None, default_pin)]
+
+
+# One sensor's PIR, detector and state publisher
+class DoorSensor:
+    def __init__(
+        self,
+        device_id,
+        pin,
+        publish,
+        edge_detect=False,
+        gpio=GPIO,
+        clock=time.time,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+        **thresholds
+    ):
+        self.device_id = device_id
+        self.name = device_id or f"pin {pin}"
+        self.pir = PIRSensor(pin, edge_detect=edge_detect, gpio=gpio)
+        self.detector = MotionDetector(clock=clock, **thresholds)
+        self.publisher = StatePublisher(
+            publish=lambda state, heartbeat=False: publish(state, heartbeat, device_id),
+            heartbeat_interval=heartbeat_interval,
+            clock=clock
+        )
+
+    # One pass of the loop for this sensor. Returns True on a potty alert
+    def step(self, now):
+        state, alert = self.detector.update(self.pir.motion_detected(), now)
+        if state:
+            self.publisher.update(state)
+        self.publisher.tick() # Heartbeat while nothing changes
+        return alert
+
+    def stats(self):
+        return {
+            "publish": self.publisher.stats(),
+            "pir": self.pir.stats(),
+            "alerts": self.detector.alerts
+        }
+
+    def cleanup(self):
+        self.pir.cleanup()
+
+
+# Every sensor, stepped together. Their messages from one step are handed to
+# publish_messages together, and go out as one publish
+class SensorGroup:
+    def __init__(self, sensors, publish_messages, edge_detect=False, gpio=GPIO, clock=time.time, **options):
+        self.publish_messages = publish_messages
+        self.clock = clock
+        self.wake = threading.Event() # Set on an edge from any sensor
+        self._pending = []
+        self._now = None # Time of the step in progress, which messages carry
+        self.sensors = [
+            DoorSensor(device_id, pin, self._queue, edge_detect=edge_detect, gpio=gpio, clock=clock, **options)
+            for device_id, pin in sensors
+        ]
+        for sensor in self.sensors:
+            if sensor.pir.edge_detect:
+                sensor.pir.add_callback(lambda motion: self.wake.set())
+        self.edge_detect = any(sensor.pir.edge_detect for sensor in self.sensors)
+
+    def _queue(self, state, heartbeat, device_id):
+        self._pending.append(motion_message(state, heartbeat, self._now, device_id))
+
+    # Step every sensor at now. Returns the sensors that raised a potty alert
+    def step(self, now=None):
+        now = self.clock() if now is None else now
+        self._now = now
+        alerts = [sensor for sensor in self.sensors if sensor.step(now)]
+        if self._pending:
+            # Heartbeats at least half due go in this publish too, so the
+            # sensors' heartbeats line up instead of each needing its own
+            for sensor in self.sensors:
+                sensor.publisher.tick(early=sensor.publisher.heartbeat_interval / 2)
+            if self.publish_messages(self._pending) is False:
+                # Refused (background queue full). Try the state changes again
+                # next step. Heartbeats are dropped, the next one repeats them
+                self._pending = [message for message in self._pending if not message.get("heartbeat")]
+            else:
+                self._pending = []
+        return alerts
+
+    def stats(self):
+        return {sensor.name: sensor.stats() for sensor in self.sensors}
+
+    def cleanup(self):
+        for sensor in self.sensors:
+            sensor.cleanup()
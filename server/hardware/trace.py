@@ -0,0 +1,91 @@
+import threading
+import struct
+import time
+
+# Compact binary PIR traces, for replaying real days of data off the Pi.
+# Header: magic, version, pin, wall clock start, monotonic start.
+# Then one 4-byte record per level change: the top bit is the new level, the
+# other 31 bits the microseconds since the previous record. Gaps longer than
+# that (~35 minutes) get extra records repeating the level. A day with a few
+# hundred changes is a few KB
+TRACE_MAGIC = b"PIRT"
+TRACE_VERSION = 1
+HEADER = struct.Struct("<4sBHdd")
+RECORD = struct.Struct("<I")
+LEVEL_BIT = 1 << 31
+MAX_DELTA_US = LEVEL_BIT - 1
+
+
+class TraceRecorder:
+    def __init__(self, path, pin=0, clock=time.monotonic, wall_clock=time.time):
+        self.clock = clock
+        self.file = open(path, "wb")
+        self.start = clock()
+        self.file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, pin, wall_clock(), self.start))
+        self.level = None
+        self.last_us = 0
+        self.records = 0
+        self._lock = threading.Lock() # Edges are recorded from the GPIO thread
+
+    # Record a sample or edge. Only changes of level are written
+    def record(self, level, now=None):
+        level = bool(level)
+        now = self.clock() if now is None else now
+        with self._lock:
+            if level != self.level:
+                self._write(level, now)
+
+    def _write(self, level, now):
+        now_us = max(int((now - self.start) * 1e6), self.last_us)
+        delta = now_us - self.last_us
+        while delta > MAX_DELTA_US:
+            self.file.write(RECORD.pack(MAX_DELTA_US | (LEVEL_BIT if self.level else 0)))
+            self.records += 1
+            delta -= MAX_DELTA_US
+        self.file.write(RECORD.pack(delta | (LEVEL_BIT if level else 0)))
+        self.records += 1
+        self.last_us = now_us
+        self.level = level
+
+    # Log edges as they happen, from PIRSensor's edge callback. Edges dropped by
+    # the bounce time aren't seen, so keep calling record() with the pin level too
+    def attach(self, pir):
+        self.record(pir.read())
+        pir.add_callback(self.record)
+
+    def flush(self):
+        with self._lock:
+            self.file.flush()
+
+    # Ends with the current level, so the replay knows how long the trace ran
+    def close(self, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            if self.level is not None:
+                self._write(self.level, now)
+            self.file.close()
+
+
+def is_trace(path):
+    with open(path, "rb") as file:
+        return file.read(len(TRACE_MAGIC)) == TRACE_MAGIC
+
+
+# Returns the header as a dict and the samples as (wall clock time, level) pairs
+def read_trace(path):
+    with open(path, "rb") as file:
+        data = file.read()
+
+    magic, version, pin, wall_start, monotonic_start = HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError(f"{path} is not a version {TRACE_VERSION} PIR trace")
+
+    end = len(data) - (len(data) - HEADER.size) % RECORD.size # Drop a record cut short by a power loss
+    samples = []
+    offset_us = 0
+    for (record,) in RECORD.iter_unpack(data[HEADER.size:end]):
+        offset_us += record & MAX_DELTA_US
+        samples.append((wall_start + offset_us / 1e6, bool(record & LEVEL_BIT)))
+
+    header = {"pin": pin, "start": wall_start, "monotonic_start": monotonic_start}
+    return header, samples
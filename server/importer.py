@@ -0,0 +1,168 @@
+# Bulk import of historical potty logs from CSV or NDJSON.
+# Columns/keys: logged_at (ISO date time), potty_type, notes (optional).
+# Rows are inserted in chunks, one transaction per chunk, and rows that already
+# exist for the user (same logged_at and potty_type) are skipped.
+#   python importer.py <user_id> <file.csv|file.ndjson>
+
+# Imports
+from collections import Counter
+from datetime import datetime
+import json
+import time
+import csv
+import sys
+import os
+
+# Files
+from db import get_db_connection
+from stats import add_daily_counts
+
+POTTY_TYPES = ('pee', 'poop', 'both', 'other')
+IMPORT_CHUNK_ROWS = int(os.getenv('IMPORT_CHUNK_ROWS', 1000))
+MAX_REPORTED_ERRORS = 50
+
+
+# Yield (line number, raw row dict) from a text stream
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, None # Reported as invalid by validate_row
+
+
+# Check a raw row against the potty_logs schema. Raises ValueError
+def validate_row(row):
+    if not isinstance(row, dict):
+        raise ValueError("not a valid row")
+
+    logged_at = row.get('logged_at')
+    potty_type = (row.get('potty_type') or '').strip().lower()
+    notes = row.get('notes') or 'N/A'
+
+    if not logged_at:
+        raise ValueError("missing logged_at")
+    logged_at = datetime.fromisoformat(str(logged_at).strip()).replace(microsecond=0, tzinfo=None)
+
+    if potty_type not in POTTY_TYPES:
+        raise ValueError(f"potty_type must be one of: {', '.join(POTTY_TYPES)}")
+
+    return logged_at, potty_type, str(notes)
+
+
+# Rows in the chunk that the user already has, as (logged_at, potty_type)
+def existing_logs(cursor, user_id, chunk):
+    timestamps = sorted({logged_at for logged_at, _, _ in chunk})
+    cursor.execute(
+        f"""
+        SELECT logged_at, potty_type FROM potty_logs
+        WHERE user_id = %s AND logged_at IN ({', '.join(['%s'] * len(timestamps))})
+        """,
+        (user_id, *timestamps)
+    )
+    return {(row[0], row[1]) for row in cursor.fetchall()}
+
+
+def insert_chunk(conn, user_id, chunk):
+    cursor = conn.cursor()
+    try:
+        existing = existing_logs(cursor, user_id, chunk)
+        new_rows = []
+        for logged_at, potty_type, notes in chunk:
+            if (logged_at, potty_type) not in existing:
+                existing.add((logged_at, potty_type)) # Also skips repeats within the chunk
+                new_rows.append((user_id, logged_at, potty_type, notes))
+
+        if new_rows:
+            cursor.executemany(
+                "INSERT INTO potty_logs (user_id, logged_at, potty_type, notes) VALUES (%s, %s, %s, %s)",
+                new_rows
+            )
+            add_daily_counts(cursor, user_id, Counter((row[1].date(), row[2]) for row in new_rows))
+        conn.commit()
+        return len(new_rows)
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+# Import rows for a user and return a report with per-chunk throughput
+def import_logs(conn, user_id, rows, chunk_size=IMPORT_CHUNK_ROWS):
+    report = {
+        'imported': 0,
+        'duplicates': 0,
+        'invalid': 0,
+        'errors': [],
+        'chunks': []
+    }
+    chunk = []
+
+    def flush():
+        start = time.perf_counter()
+        inserted = insert_chunk(conn, user_id, chunk)
+        elapsed = time.perf_counter() - start
+
+        report['imported'] += inserted
+        report['duplicates'] += len(chunk) - inserted
+        report['chunks'].append({
+            'rows': len(chunk),
+            'inserted': inserted,
+            'seconds': round(elapsed, 4),
+            'rows_per_sec': round(len(chunk) / elapsed) if elapsed else None
+        })
+        chunk.clear()
+
+    for line_no, row in rows:
+        try:
+            chunk.append(validate_row(row))
+        except (ValueError, TypeError) as e:
+            report['invalid'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'line': line_no, 'error': str(e)})
+            continue
+
+        if len(chunk) >= chunk_size:
+            flush()
+
+    if chunk:
+        flush()
+
+    return report
+
+
+def main(args):
+    if len(args) != 2:
+        print("Usage: python importer.py <user_id> <file.csv|file.ndjson>")
+        return
+
+    user_id, path = int(args[0]), args[1]
+    fmt = 'csv' if path.endswith('.csv') else 'ndjson'
+
+    conn = get_db_connection()
+    try:
+        with open(path, newline='') as f:
+            report = import_logs(conn, user_id, read_rows(f, fmt))
+    finally:
+        conn.close()
+
+    for i, chunk in enumerate(report['chunks'], start=1):
+        print(f"Chunk {i}: {chunk['inserted']}/{chunk['rows']} rows inserted in {chunk['seconds']}s ({chunk['rows_per_sec']} rows/s)")
+    for error in report['errors']:
+        print(f"Line {error['line']}: {error['error']}")
+    print(f"Imported {report['imported']}, skipped {report['duplicates']} duplicate(s) and {report['invalid']} invalid row(s)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
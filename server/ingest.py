@@ -0,0 +1,356 @@
+# Motion event ingestion. Subscribes to every Pi's channel and stores the motion
+# states in motion_events. Events are written in batches, one multi-row INSERT
+# per batch, flushed when MOTION_BATCH_SIZE events are waiting or the oldest has
+# waited MOTION_FLUSH_INTERVAL seconds. If the DB falls behind, submit() blocks
+# the subscriber once MOTION_MAX_PENDING events are waiting, and drops events it
+# still can't queue after MOTION_PUT_TIMEOUT. A batch the DB keeps rejecting is
+# split in half until the bad rows are found, and those are dropped and counted
+# as poisoned. While the DB can't be reached batches are retried for as long as
+# it takes. An event naming another device_id than its channel's (a Pi sending
+# for its other sensors) is only stored if both devices belong to the same
+# user. Also rolls up motion_hourly_stats as hours complete. Run it next to the web app:
+#   python ingest.py
+
+# Imports
+from pubnub.callbacks import SubscribeCallback
+from collections import deque
+from datetime import datetime
+import threading
+import time
+import sys
+import os
+
+# Files
+from db import get_db_connection
+from channels import DEVICE_CHANNELS, DEVICE_OWNER_TTL, DeviceOwners, device_from_channel, event_device, unpack_messages
+from pb import create_pubnub
+from motion import rollup_motion
+
+MOTION_STATES = ('inactive', 'detected', 'potty')
+MOTION_BATCH_SIZE = int(os.getenv('MOTION_BATCH_SIZE', 200))
+MOTION_FLUSH_INTERVAL = float(os.getenv('MOTION_FLUSH_INTERVAL', 1.0)) # Seconds
+MOTION_MAX_PENDING = int(os.getenv('MOTION_MAX_PENDING', 5000))
+MOTION_PUT_TIMEOUT = float(os.getenv('MOTION_PUT_TIMEOUT', 5.0)) # Seconds
+MOTION_RETRY_BACKOFF = float(os.getenv('MOTION_RETRY_BACKOFF', 1.0)) # Seconds
+MOTION_MAX_ATTEMPTS = int(os.getenv('MOTION_MAX_ATTEMPTS', 3)) # Failed writes before a batch is split
+STATS_INTERVAL = 60 # Seconds between stats lines and rollups from the CLI
+
+
+# Row for motion_events from a message on device_id's channel, without the
+# user_id, and the channel's device_id last.
+# Raises ValueError for anything that isn't a motion state
+def parse_event(device_id, message, received_at=None):
+    if not isinstance(message, dict) or message.get('motion') not in MOTION_STATES:
+        raise ValueError("not a motion message")
+
+    received_at = received_at or datetime.now().replace(microsecond=0)
+    try:
+        occurred_at = datetime.fromtimestamp(float(message['timestamp'])).replace(microsecond=0)
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        occurred_at = received_at
+
+    return event_device(device_id, message), message['motion'], occurred_at, received_at, device_id
+
+
+# The DB couldn't be reached, so the batch itself isn't to blame
+class DatabaseUnavailable(Exception):
+    pass
+
+
+# Batches motion events in memory and writes them from a background thread
+class MotionIngest:
+    def __init__(
+        self,
+        connect=get_db_connection,
+        batch_size=MOTION_BATCH_SIZE,
+        flush_interval=MOTION_FLUSH_INTERVAL,
+        max_pending=MOTION_MAX_PENDING,
+        put_timeout=MOTION_PUT_TIMEOUT,
+        backoff=MOTION_RETRY_BACKOFF,
+        max_attempts=MOTION_MAX_ATTEMPTS,
+        device_ttl=DEVICE_OWNER_TTL,
+        clock=time.monotonic,
+        sleep=time.sleep
+    ):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.backoff = backoff
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.sleep = sleep
+
+        self._pending = deque() # (queued_at, event)
+        self._retry = deque() # (batch, failed attempts) to write before anything new
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flushing = 0
+        self._worker = None
+        self._stopping = False
+        self.owners = DeviceOwners(device_ttl, clock)
+
+        # Stats
+        self.inserted = 0
+        self.batches = 0
+        self.invalid = 0
+        self.unknown_device = 0
+        self.not_owned = 0
+        self.blocked = 0
+        self.dropped = 0
+        self.errors = 0
+        self.poisoned = 0
+        self.total_write_time = 0.0
+
+    # Queue one message from a device. Blocks while the queue is full.
+    # False if the message was invalid or had to be dropped
+    def submit(self, device_id, message, received_at=None):
+        try:
+            event = parse_event(device_id, message, received_at)
+        except ValueError:
+            with self._cond:
+                self.invalid += 1
+            return False
+
+        with self._cond:
+            if len(self._pending) >= self.max_pending and not self._stopping:
+                self.blocked += 1
+                deadline = self.clock() + self.put_timeout
+                while len(self._pending) >= self.max_pending and not self._stopping:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            if self._stopping or len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+
+            self._pending.append((self.clock(), event))
+            self._ensure_worker()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='motion-ingest', daemon=True)
+            self._worker.start()
+
+    # Wait for a full batch, the flush interval, flush() or shutdown().
+    # Returns (batch, failed attempts so far), failed batches first
+    def _next_batch(self):
+        with self._cond:
+            if self._retry:
+                batch, attempts = self._retry.popleft()
+                self._in_flight = len(batch)
+                return batch, attempts
+
+            while True:
+                if len(self._pending) >= self.batch_size:
+                    break
+                if self._pending and (self._stopping or self._flushing):
+                    break
+                if not self._pending:
+                    if self._stopping:
+                        return None
+                    self._cond.wait()
+                    continue
+
+                wait = self._pending[0][0] + self.flush_interval - self.clock()
+                if wait <= 0:
+                    break
+                self._cond.wait(wait)
+
+            batch = [self._pending.popleft()[1] for _ in range(min(self.batch_size, len(self._pending)))]
+            self._in_flight = len(batch)
+            self._cond.notify_all() # Room for blocked submitters
+            return batch, 0
+
+    def _run(self):
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+
+            batch, attempts = item
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Error writing {len(batch)} motion event(s): {e}")
+                with self._cond:
+                    self.errors += 1
+                    if self._stopping:
+                        self.dropped += len(batch)
+                    elif isinstance(e, DatabaseUnavailable):
+                        self._retry.appendleft((batch, attempts))
+                    else:
+                        self._retry_or_split(batch, attempts + 1)
+                if not self._stopping:
+                    self.sleep(self.backoff)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    # Retry a batch the DB rejected. After max_attempts it is split in half, each
+    # half getting one try, until the rows to blame are on their own and dropped
+    def _retry_or_split(self, batch, attempts):
+        if attempts < self.max_attempts:
+            self._retry.appendleft((batch, attempts))
+        elif len(batch) > 1:
+            middle = len(batch) // 2
+            self._retry.appendleft((batch[middle:], self.max_attempts - 1))
+            self._retry.appendleft((batch[:middle], self.max_attempts - 1))
+        else:
+            print(f"Dropping motion event the DB keeps rejecting: {batch[0]}")
+            self.poisoned += 1
+
+    # One multi-row INSERT for the batch, in one transaction
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            conn = self.connect()
+        except Exception as e:
+            raise DatabaseUnavailable(e) from e
+        cursor = None
+        try:
+            cursor = conn.cursor(dictionary=True)
+            self.owners.load(cursor, {device_id for event in batch for device_id in (event[0], event[4])})
+
+            rows = []
+            not_owned = 0
+            for device_id, motion, occurred_at, received_at, channel_device_id in batch:
+                if self.owners.can_send(channel_device_id, device_id):
+                    rows.append((self.owners.get(device_id), device_id, motion, occurred_at, received_at))
+                elif self.owners.get(device_id) is not None:
+                    not_owned += 1 # Registered, but to someone else than the sending Pi
+            if rows:
+                cursor.execute(
+                    "INSERT INTO motion_events (user_id, device_id, motion, occurred_at, received_at) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows)),
+                    [value for row in rows for value in row]
+                )
+            conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            if cursor:
+                cursor.close()
+            conn.close()
+
+        with self._cond:
+            self.inserted += len(rows)
+            self.unknown_device += len(batch) - len(rows) - not_owned
+            self.not_owned += not_owned
+            self.batches += 1
+            self.total_write_time += time.perf_counter() - start
+
+    # Write everything queued so far without waiting for the flush interval
+    def flush(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._pending or self._retry or self._in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    # Stop taking events, write what is left and stop the worker
+    def shutdown(self, timeout=10):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            worker = self._worker
+
+        if worker:
+            worker.join(timeout)
+        return not self._pending and not self._retry
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._pending) + sum(len(batch) for batch, _ in self._retry),
+                'in_flight': self._in_flight,
+                'inserted': self.inserted,
+                'batches': self.batches,
+                'avg_batch_rows': round(self.inserted / self.batches, 1) if self.batches else 0.0,
+                'avg_write_ms': round(self.total_write_time / self.batches * 1000, 2) if self.batches else 0.0,
+                'invalid': self.invalid,
+                'unknown_device': self.unknown_device,
+                'not_owned': self.not_owned,
+                'blocked': self.blocked,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'poisoned': self.poisoned
+            }
+
+
+# PubNub listener that hands device channel messages to a MotionIngest
+class MotionListener(SubscribeCallback):
+    def __init__(self, ingest):
+        self.ingest = ingest
+
+    def status(self, pubnub, status):
+        if status.is_error():
+            print(f"PubNub subscribe error: {status.error_data}")
+
+    def message(self, pubnub, message):
+        device_id = device_from_channel(message.channel)
+        if not device_id:
+            return
+        for event in unpack_messages(message.message):
+            self.ingest.submit(device_id, event)
+
+    def presence(self, pubnub, presence):
+        pass
+
+
+# Roll up hours that have completed since the last call
+def rollup():
+    conn = None
+    try:
+        conn = get_db_connection()
+        hours = rollup_motion(conn)
+        if hours:
+            print(f"Rolled up {hours} hour(s) of motion events")
+    except Exception as e:
+        print(f"Error rolling up motion events: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+
+def main(args):
+    ingest = MotionIngest()
+    pubnub = create_pubnub()
+    pubnub.add_listener(MotionListener(ingest))
+    pubnub.subscribe().channels([DEVICE_CHANNELS]).execute()
+    print(f"Ingesting motion events from {DEVICE_CHANNELS}...")
+
+    try:
+        while True:
+            time.sleep(STATS_INTERVAL)
+            print(ingest.stats())
+            rollup()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        pubnub.unsubscribe_all()
+        ingest.shutdown()
+        pubnub.stop()
+        print(ingest.stats())
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
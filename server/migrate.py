@@ -0,0 +1,125 @@
+# Versioned schema migrations. Files live in migrations/<dialect>/NNNN_name.sql
+# and each one is applied once, in order, and recorded in schema_migrations.
+#   python migrate.py           apply pending migrations
+#   python migrate.py status    list applied and pending migrations
+
+# Imports
+import sys
+import re
+import os
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_FILENAME = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+
+# All migrations for a dialect as (version, name, path), oldest first
+def list_migrations(dialect):
+    folder = os.path.join(MIGRATIONS_DIR, dialect)
+    migrations = []
+    for filename in os.listdir(folder):
+        match = _FILENAME.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(folder, filename)))
+    return sorted(migrations)
+
+
+# Split a migration file into statements. Trigger bodies (BEGIN ... END;) stay whole
+def split_statements(sql):
+    statements = []
+    current = []
+    depth = 0
+
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith('--')):
+            continue
+
+        current.append(line)
+        if re.match(r'^BEGIN\b', stripped, re.IGNORECASE):
+            depth += 1
+        elif re.match(r'^END\s*;', stripped, re.IGNORECASE):
+            depth -= 1
+
+        if depth == 0 and stripped.endswith(';'):
+            statements.append('\n'.join(current).rstrip().rstrip(';'))
+            current = []
+
+    if '\n'.join(current).strip():
+        statements.append('\n'.join(current).rstrip().rstrip(';'))
+    return statements
+
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    cursor.close()
+    return versions
+
+
+# Apply pending migrations and return the ones that ran
+def migrate(conn, dialect, verbose=False):
+    done = applied_versions(conn)
+    ran = []
+
+    for version, name, path in list_migrations(dialect):
+        if version in done:
+            continue
+
+        with open(path) as f:
+            statements = split_statements(f.read())
+
+        if verbose:
+            print(f"Applying {version:04d}_{name} ({len(statements)} statements)")
+
+        cursor = conn.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        ran.append((version, name))
+
+    return ran
+
+
+def main(args):
+    from db import connect, get_dialect
+
+    conn = connect()
+    dialect = get_dialect()
+
+    try:
+        if args and args[0] == 'status':
+            done = applied_versions(conn)
+            for version, name, _ in list_migrations(dialect):
+                state = 'applied' if version in done else 'pending'
+                print(f"{version:04d}_{name}: {state}")
+            return
+
+        ran = migrate(conn, dialect, verbose=True)
+        print(f"Applied {len(ran)} migration(s)" if ran else "Database is up to date")
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
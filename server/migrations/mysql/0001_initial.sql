@@ -0,0 +1,43 @@
+-- Tables as they were in schema.sql before migrations. IF NOT EXISTS makes
+-- this a no-op on databases created from the old schema.sql.
+
+-- Users table. 
+CREATE TABLE IF NOT EXISTS users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(50),                    
+    email VARCHAR(100) NOT NULL UNIQUE,     
+    password VARCHAR(255), -- password hash; can be NULL for Google users
+    dog_name VARCHAR(50),                    
+    profile_picture VARCHAR(255),             
+    google_id VARCHAR(100) UNIQUE, -- for Google OAuth login
+    is_admin BOOLEAN DEFAULT FALSE,
+    can_read BOOLEAN DEFAULT TRUE,
+    can_write BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Settings table. 1:1 relationship with users.
+CREATE TABLE IF NOT EXISTS settings (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL UNIQUE,
+    light_mode BOOLEAN DEFAULT TRUE,
+    disabled_alerts BOOLEAN DEFAULT FALSE,
+    CONSTRAINT fk_user
+        FOREIGN KEY (user_id) 
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- Potty logs table. M:1 relationship with users.
+CREATE TABLE IF NOT EXISTS potty_logs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    logged_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    potty_type ENUM('pee', 'poop', 'both', 'other') NOT NULL,
+    notes TEXT,
+    CONSTRAINT fk_potty_logs_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
@@ -0,0 +1,3 @@
+-- Lets per-user date range filters and "latest log" lookups use an index
+-- instead of scanning the user's whole history.
+CREATE INDEX idx_potty_logs_user_logged_at ON potty_logs (user_id, logged_at);
@@ -0,0 +1,2 @@
+-- Prefix search on the admin user list. email already has its UNIQUE index.
+CREATE INDEX idx_users_username ON users (username);
@@ -0,0 +1,15 @@
+-- Raspberry Pi devices. M:1 relationship with users. Each device publishes to
+-- its own channel, which is in its owner's channel group.
+CREATE TABLE devices (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    device_id VARCHAR(64) NOT NULL UNIQUE, -- RASPBERRY_DEVICE_ID on the Pi
+    name VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_devices_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX idx_devices_user ON devices (user_id);
@@ -0,0 +1,16 @@
+-- Motion states published by the Pis, written in batches by ingest.py.
+-- M:1 relationship with users, through the device that sent them.
+CREATE TABLE IF NOT EXISTS motion_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    device_id VARCHAR(64) NOT NULL,
+    motion ENUM('inactive', 'detected', 'potty') NOT NULL,
+    occurred_at DATETIME NOT NULL, -- Pi's timestamp
+    received_at DATETIME NOT NULL,
+    CONSTRAINT fk_motion_events_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX idx_motion_events_user_occurred ON motion_events (user_id, occurred_at);
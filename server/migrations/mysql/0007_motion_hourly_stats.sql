@@ -0,0 +1,24 @@
+-- Seconds spent in each motion state per user, device and hour. Built from
+-- motion_events by motion.py once an hour is complete, so long windows read
+-- these rows instead of every raw event.
+CREATE TABLE IF NOT EXISTS motion_hourly_stats (
+    user_id INT NOT NULL,
+    device_id VARCHAR(64) NOT NULL,
+    hour DATETIME NOT NULL,
+    motion ENUM('inactive', 'detected', 'potty') NOT NULL,
+    seconds INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, hour, device_id, motion),
+    CONSTRAINT fk_motion_hourly_stats_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- motion_hourly_stats is complete for every hour before rolled_up_to. One row.
+CREATE TABLE IF NOT EXISTS motion_rollup_state (
+    id INT PRIMARY KEY,
+    rolled_up_to DATETIME NOT NULL
+);
+
+-- Rollups read every user's events in a time range
+CREATE INDEX idx_motion_events_occurred ON motion_events (occurred_at);
@@ -0,0 +1,6 @@
+-- Events received at or after received_to haven't been checked for hours
+-- that were already rolled up. NULL until the first rollup after this migration
+ALTER TABLE motion_rollup_state ADD COLUMN received_to DATETIME NULL;
+
+-- Late events are found by when they arrived
+CREATE INDEX idx_motion_events_received ON motion_events (received_at);
@@ -0,0 +1,49 @@
+-- SQLite version of migrations/mysql/0001_initial.sql for the embedded 'sqlite' DB_DRIVER.
+
+-- Users table.
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50),
+    email VARCHAR(100) NOT NULL UNIQUE,
+    password VARCHAR(255), -- password hash; can be NULL for Google users
+    dog_name VARCHAR(50),
+    profile_picture VARCHAR(255),
+    google_id VARCHAR(100) UNIQUE, -- for Google OAuth login
+    is_admin BOOLEAN DEFAULT FALSE,
+    can_read BOOLEAN DEFAULT TRUE,
+    can_write BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    updated_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+-- SQLite has no ON UPDATE CURRENT_TIMESTAMP
+CREATE TRIGGER IF NOT EXISTS users_updated_at AFTER UPDATE ON users
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE users SET updated_at = datetime('now', 'localtime') WHERE id = NEW.id;
+END;
+
+-- Settings table. 1:1 relationship with users.
+CREATE TABLE IF NOT EXISTS settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL UNIQUE,
+    light_mode BOOLEAN DEFAULT TRUE,
+    disabled_alerts BOOLEAN DEFAULT FALSE,
+    CONSTRAINT fk_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- Potty logs table. M:1 relationship with users.
+CREATE TABLE IF NOT EXISTS potty_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    logged_at DATETIME DEFAULT (datetime('now', 'localtime')),
+    potty_type TEXT NOT NULL CHECK (potty_type IN ('pee', 'poop', 'both', 'other')),
+    notes TEXT,
+    CONSTRAINT fk_potty_logs_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
@@ -0,0 +1,19 @@
+-- Per user, per day, per potty type counts of potty_logs. Kept up to date by
+-- stats.py on every insert so the dashboard reads one row instead of counting.
+CREATE TABLE IF NOT EXISTS potty_daily_stats (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    potty_type TEXT NOT NULL CHECK (potty_type IN ('pee', 'poop', 'both', 'other')),
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, potty_type),
+    CONSTRAINT fk_potty_daily_stats_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- Backfill from existing logs
+INSERT INTO potty_daily_stats (user_id, day, potty_type, count)
+SELECT user_id, DATE(logged_at), potty_type, COUNT(*)
+FROM potty_logs
+GROUP BY user_id, DATE(logged_at), potty_type;
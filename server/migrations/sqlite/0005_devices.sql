@@ -0,0 +1,14 @@
+-- SQLite version of migrations/mysql/0005_devices.sql.
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    device_id VARCHAR(64) NOT NULL UNIQUE, -- RASPBERRY_DEVICE_ID on the Pi
+    name VARCHAR(50),
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime')),
+    CONSTRAINT fk_devices_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_devices_user ON devices (user_id);
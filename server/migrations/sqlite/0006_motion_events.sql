@@ -0,0 +1,15 @@
+-- SQLite version of migrations/mysql/0006_motion_events.sql.
+CREATE TABLE IF NOT EXISTS motion_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL,
+    device_id VARCHAR(64) NOT NULL,
+    motion TEXT NOT NULL CHECK (motion IN ('inactive', 'detected', 'potty')),
+    occurred_at DATETIME NOT NULL, -- Pi's timestamp
+    received_at DATETIME NOT NULL,
+    CONSTRAINT fk_motion_events_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_motion_events_user_occurred ON motion_events (user_id, occurred_at);
@@ -0,0 +1,4 @@
+-- SQLite version of migrations/mysql/0008_motion_rollup_received.sql.
+ALTER TABLE motion_rollup_state ADD COLUMN received_to DATETIME NULL;
+
+CREATE INDEX IF NOT EXISTS idx_motion_events_received ON motion_events (received_at);
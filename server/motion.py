@@ -0,0 +1,293 @@
+# Motion state history, downsampled into fixed minute, hour or day buckets.
+# Each motion event's state lasts until the device's next event, for at most
+# MOTION_STATE_CAP seconds, so gaps (Pi off, network down) don't count as any
+# state. Complete hours are rolled up into motion_hourly_stats, and hour/day
+# series read those rows, with raw events only for the hours not rolled up yet.
+# Hours that late events arrive for after they were rolled up are rolled up again.
+#   python motion.py rollup    roll up every complete hour (ingest.py does this too)
+
+# Imports
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Files
+from db import get_db_connection
+
+MOTION_STATES = ('inactive', 'detected', 'potty')
+BUCKETS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+MOTION_STATE_CAP = int(os.getenv('MOTION_STATE_CAP', 60)) # Seconds
+MOTION_ROLLUP_DELAY = int(os.getenv('MOTION_ROLLUP_DELAY', 2)) # Hours to wait for late events
+ROLLUP_CHUNK = timedelta(hours=6) # Rolled up per transaction
+RECEIVED_SLACK = timedelta(minutes=10) # Rows ingest.py may still be holding get checked again next run
+FETCH_ROWS = 5000
+
+
+def floor_time(value, bucket):
+    if bucket == 'minute':
+        return value.replace(second=0, microsecond=0)
+    if bucket == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Add the seconds from `since` to `until` to each bucket they overlap
+def add_seconds(totals, key, since, until, bucket):
+    while since < until:
+        bucket_end = floor_time(since, bucket) + BUCKETS[bucket]
+        part_end = min(until, bucket_end)
+        totals_key = key + (floor_time(since, bucket),)
+        totals[totals_key] = totals.get(totals_key, 0) + (part_end - since).total_seconds()
+        since = part_end
+
+
+# Seconds per state and bucket from (device_id, motion, occurred_at) rows in time
+# order, counting only time inside [start, end). Rows from up to MOTION_STATE_CAP
+# seconds before start say which state each device was in when the window began.
+# Returns {(device_id, motion, bucket_start): seconds}
+def state_durations(rows, start, end, bucket, cap=MOTION_STATE_CAP):
+    cap = timedelta(seconds=cap)
+    totals = {}
+    last = {} # device_id -> (motion, occurred_at)
+
+    def close(device_id, until):
+        motion, since = last[device_id]
+        until = min(until, since + cap, end)
+        since = max(since, start)
+        if since < until:
+            add_seconds(totals, (device_id, motion), since, until, bucket)
+
+    for device_id, motion, occurred_at in rows:
+        if device_id in last:
+            close(device_id, occurred_at)
+        last[device_id] = (motion, occurred_at)
+
+    for device_id in last:
+        close(device_id, end)
+    return totals
+
+
+# Rows of a query on an unbuffered cursor, read in chunks so long ranges never
+# sit in memory. Finish reading before using the connection for anything else
+def stream_rows(conn, query, params):
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+# (device_id, motion, occurred_at) for a user, oldest first. Uses the
+# (user_id, occurred_at) index
+def fetch_events(conn, user_id, since, until, device_id=None):
+    conditions = ["user_id = %s", "occurred_at >= %s", "occurred_at < %s"]
+    params = [user_id, since, until]
+    if device_id:
+        conditions.append("device_id = %s")
+        params.append(device_id)
+
+    rows = stream_rows(
+        conn,
+        f"""
+        SELECT device_id, motion, occurred_at FROM motion_events
+        WHERE {' AND '.join(conditions)}
+        ORDER BY occurred_at, id
+        """,
+        params
+    )
+    for row in rows:
+        yield row['device_id'], row['motion'], row['occurred_at']
+
+
+def get_rolled_up_to(cursor):
+    cursor.execute("SELECT rolled_up_to FROM motion_rollup_state WHERE id = 1")
+    row = cursor.fetchone()
+    return row['rolled_up_to'] if row else None
+
+
+# Series of {t, inactive, detected, potty} points, one per bucket in [start, end),
+# including empty buckets. start and end must be on bucket boundaries
+def motion_series(conn, user_id, start, end, bucket, device_id=None, now=None):
+    now = now or datetime.now()
+    totals = {}
+
+    # Rolled up hours first
+    raw_start = start
+    if bucket != 'minute':
+        cursor = conn.cursor(dictionary=True)
+        try:
+            rolled_up_to = get_rolled_up_to(cursor)
+            if rolled_up_to and rolled_up_to > start:
+                raw_start = min(rolled_up_to, end)
+
+                conditions = ["user_id = %s", "hour >= %s", "hour < %s"]
+                params = [user_id, start, raw_start]
+                if device_id:
+                    conditions.append("device_id = %s")
+                    params.append(device_id)
+
+                cursor.execute(
+                    f"""
+                    SELECT hour, motion, seconds FROM motion_hourly_stats
+                    WHERE {' AND '.join(conditions)}
+                    """,
+                    params
+                )
+                for row in cursor.fetchall():
+                    key = (row['motion'], floor_time(row['hour'], bucket))
+                    totals[key] = totals.get(key, 0) + row['seconds']
+        finally:
+            cursor.close()
+
+    # Raw events for the rest, never past now
+    raw_end = min(end, now)
+    if raw_start < raw_end:
+        rows = fetch_events(conn, user_id, raw_start - timedelta(seconds=MOTION_STATE_CAP), raw_end, device_id)
+        for (_, motion, bucket_start), seconds in state_durations(rows, raw_start, raw_end, bucket).items():
+            totals[(motion, bucket_start)] = totals.get((motion, bucket_start), 0) + seconds
+
+    points = []
+    t = start
+    while t < end:
+        point = {'t': t.isoformat()}
+        for motion in MOTION_STATES:
+            point[motion] = round(totals.get((motion, t), 0))
+        points.append(point)
+        t += BUCKETS[bucket]
+    return points
+
+
+# Rebuild motion_hourly_stats for every hour in [since, until). Doesn't commit
+def rebuild_hours(conn, cursor, since, until):
+    rows = stream_rows(
+        conn,
+        """
+        SELECT user_id, device_id, motion, occurred_at FROM motion_events
+        WHERE occurred_at >= %s AND occurred_at < %s
+        ORDER BY occurred_at, id
+        """,
+        (since - timedelta(seconds=MOTION_STATE_CAP), until)
+    )
+    totals = state_durations(
+        (((row['user_id'], row['device_id']), row['motion'], row['occurred_at']) for row in rows),
+        since, until, 'hour'
+    )
+
+    cursor.execute("DELETE FROM motion_hourly_stats WHERE hour >= %s AND hour < %s", (since, until))
+    values = [
+        (user_id, device_id, hour, motion, round(seconds))
+        for ((user_id, device_id), motion, hour), seconds in totals.items()
+    ]
+    for i in range(0, len(values), 1000):
+        chunk = values[i:i + 1000]
+        cursor.execute(
+            "INSERT INTO motion_hourly_stats (user_id, device_id, hour, motion, seconds) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk)),
+            [value for row in chunk for value in row]
+        )
+
+
+# Rolled up hours that events received after received_to landed in (e.g. the
+# Pi's outbox replaying after an outage), as [(since, until)] runs. An event
+# changes the state from MOTION_STATE_CAP seconds either side of it
+def late_hours(conn, received_to, rolled_up_to):
+    cap = timedelta(seconds=MOTION_STATE_CAP)
+    hours = set()
+    rows = stream_rows(
+        conn,
+        """
+        SELECT occurred_at FROM motion_events
+        WHERE received_at > %s AND occurred_at < %s
+        """,
+        (received_to, rolled_up_to)
+    )
+    for row in rows:
+        hour = floor_time(row['occurred_at'] - cap, 'hour')
+        while hour <= row['occurred_at'] + cap and hour < rolled_up_to:
+            hours.add(hour)
+            hour += BUCKETS['hour']
+
+    runs = []
+    for hour in sorted(hours):
+        if runs and runs[-1][1] == hour and hour - runs[-1][0] < ROLLUP_CHUNK:
+            runs[-1] = (runs[-1][0], hour + BUCKETS['hour'])
+        else:
+            runs.append((hour, hour + BUCKETS['hour']))
+    return runs
+
+
+# Roll up every complete hour since the last run into motion_hourly_stats, and
+# roll up again the hours that late events have arrived for since then.
+# Hours are rebuilt, not added to, so running it twice is harmless
+def rollup_motion(conn, now=None):
+    now = now or datetime.now()
+    cutoff = floor_time(now, 'hour') - timedelta(hours=MOTION_ROLLUP_DELAY)
+    received_to = now - RECEIVED_SLACK
+    cursor = conn.cursor(dictionary=True)
+    hours = 0
+
+    try:
+        cursor.execute("SELECT rolled_up_to, received_to FROM motion_rollup_state WHERE id = 1")
+        state = cursor.fetchone()
+        if state is None:
+            cursor.execute("SELECT occurred_at FROM motion_events ORDER BY occurred_at LIMIT 1")
+            row = cursor.fetchone()
+            since = floor_time(row['occurred_at'], 'hour') if row else cutoff
+            cursor.execute(
+                "INSERT INTO motion_rollup_state (id, rolled_up_to, received_to) VALUES (1, %s, %s)",
+                (since, received_to)
+            )
+            conn.commit()
+        else:
+            since = state['rolled_up_to']
+
+            # Late events first
+            if state['received_to']:
+                for run_since, run_until in late_hours(conn, state['received_to'], since):
+                    rebuild_hours(conn, cursor, run_since, run_until)
+                    conn.commit()
+                    hours += int((run_until - run_since) / timedelta(hours=1))
+            cursor.execute("UPDATE motion_rollup_state SET received_to = %s WHERE id = 1", (received_to,))
+            conn.commit()
+
+        while since < cutoff:
+            until = min(since + ROLLUP_CHUNK, cutoff)
+            rebuild_hours(conn, cursor, since, until)
+            cursor.execute("UPDATE motion_rollup_state SET rolled_up_to = %s WHERE id = 1", (until,))
+            conn.commit()
+
+            hours += int((until - since) / timedelta(hours=1))
+            since = until
+        return hours
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+def main(args):
+    if not args or args[0] != 'rollup':
+        print("Usage: python motion.py rollup")
+        return
+
+    conn = get_db_connection()
+    try:
+        print(f"Rolled up {rollup_motion(conn)} hour(s) of motion events")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,18 +1,25 @@
 # Imports
 from flask import current_app, Blueprint, session, jsonify
 from pubnub.models.consumer.v3.channel import Channel
+from pubnub.models.consumer.v3.group import Group
 from pubnub.pnconfiguration import PNConfiguration
 from pubnub.pubnub import PubNub
 from dotenv import load_dotenv
+import threading
+import time
 import os
 
 # Files
 from db import get_db_connection
+from channels import user_channel, user_group
 
 pubnub_bp = Blueprint("pubnub", __name__)
 
 load_dotenv()
 
+PUBNUB_TOKEN_TTL = int(os.getenv('PUBNUB_TOKEN_TTL', 1440)) # Minutes
+PUBNUB_TOKEN_REFRESH_MARGIN = int(os.getenv('PUBNUB_TOKEN_REFRESH_MARGIN', 60)) # Minutes before expiry to issue a new one
+
 # PubNub setup
 def create_pubnub():
     pnconfig = PNConfiguration()
@@ -23,19 +30,22 @@ def create_pubnub():
     return PubNub(pnconfig)
 
 
-# Generate PubNub token for access manager
-def generate_token(user_id, read, write, pubnub, ttl=1440):  # ttl in minutes
+# Generate PubNub token for access manager. Always lets the user hear their own
+# notices. Read access adds their devices' channel group, write access lets them
+# publish to their user channel
+def generate_token(user_id, read, write, pubnub, ttl=PUBNUB_TOKEN_TTL):  # ttl in minutes
     try:
-        channel = Channel.id("Channel-Barcelona")
-        if read:
-            channel.read()
+        channel = Channel.id(user_channel(user_id)).read()
         if write:
             channel.write()
 
+        groups = [Group.id(user_group(user_id)).read()] if read else []
+
         envelope = pubnub.grant_token() \
             .ttl(ttl) \
             .authorized_uuid(f'pottydog-website') \
             .channels([channel]) \
+            .groups(groups) \
             .sync()
 
         return envelope.result.token
@@ -45,6 +55,104 @@ def generate_token(user_id, read, write, pubnub, ttl=1440):  # ttl in minutes
         return None
 
 
+# Reuses granted tokens per (user, can_read, can_write) until they are close to
+# expiring, so most dashboard loads skip the grant_token round trip
+class TokenCache:
+    def __init__(self, ttl=PUBNUB_TOKEN_TTL, refresh_margin=PUBNUB_TOKEN_REFRESH_MARGIN, clock=time.time):
+        self.ttl = ttl * 60
+        self.refresh_margin = refresh_margin * 60
+        self.clock = clock
+        self._tokens = {} # user_id -> {(can_read, can_write): (token, expires_at)}
+        self._lock = threading.Lock()
+        self._sweep_at = 1024 # Users cached before expired tokens are swept
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.issue_errors = 0
+        self.total_issue_time = 0.0
+        self.max_issue_time = 0.0
+        self.invalidations = 0
+
+    # Cached token, or a new one from issue() (which returns None on failure)
+    def get_token(self, user_id, can_read, can_write, issue):
+        key = (can_read, can_write)
+        now = self.clock()
+
+        with self._lock:
+            cached = self._tokens.get(user_id, {}).get(key)
+            if cached and cached[1] - now > self.refresh_margin:
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        start = time.perf_counter()
+        token = issue()
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.total_issue_time += elapsed
+            self.max_issue_time = max(self.max_issue_time, elapsed)
+            if not token:
+                self.issue_errors += 1
+                return None
+
+            user_tokens = self._tokens.setdefault(user_id, {})
+            user_tokens[key] = (token, now + self.ttl)
+            self._prune(user_tokens, now)
+            if len(self._tokens) > self._sweep_at:
+                self._sweep(now)
+        return token
+
+    # Drop every cached token for a user, e.g. after their permissions change
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._tokens.pop(user_id, None)
+            self.invalidations += 1
+
+    # Expired tokens for a user's other permission combinations
+    def _prune(self, user_tokens, now):
+        for key in [key for key, (_, expires_at) in user_tokens.items() if expires_at <= now]:
+            del user_tokens[key]
+
+    # Forget users whose tokens have all expired
+    def _sweep(self, now):
+        for user_id in list(self._tokens):
+            self._prune(self._tokens[user_id], now)
+            if not self._tokens[user_id]:
+                del self._tokens[user_id]
+        self._sweep_at = max(1024, len(self._tokens) * 2)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            issued = self.misses - self.issue_errors
+            return {
+                'users': len(self._tokens),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+                'issue_errors': self.issue_errors,
+                'avg_issue_ms': round(self.total_issue_time / self.misses * 1000, 2) if self.misses else 0.0,
+                'max_issue_ms': round(self.max_issue_time * 1000, 2),
+                'issued': issued,
+                'invalidations': self.invalidations
+            }
+
+
+# Tell browsers that these users' permissions changed, so they fetch a new token.
+# changes is a list of (user_id, can_read, can_write). Each user only hears about
+# their own change. Publishes in the background and returns straight away
+def notify_permission_changes(publish_queue, changes):
+    for user_id, can_read, can_write in changes:
+        publish_queue.publish(user_channel(user_id), {
+            "type": "update_token",
+            "message": "Your permissions have been changed",
+            "can_read": can_read,
+            "can_write": can_write
+        })
+
+
 # Give token on login
 @pubnub_bp.route('/get_pubnub_token', methods=['POST'])
 def get_pubnub_token():
@@ -77,8 +185,13 @@ def get_pubnub_token():
         # Get PubNub instance from app.py
         pubnub = current_app.pubnub
         
-        # Create the token for the user
-        token = generate_token(user_id, bool(user['can_read']), bool(user['can_write']), pubnub)
+        # Reuse the user's token if it is still valid, otherwise create one
+        can_read = bool(user['can_read'])
+        can_write = bool(user['can_write'])
+        token = current_app.token_cache.get_token(
+            user_id, can_read, can_write,
+            lambda: generate_token(user_id, can_read, can_write, pubnub)
+        )
         if not token:
             return jsonify({
             'token': None, 
@@ -89,7 +202,9 @@ def get_pubnub_token():
             'token': token,
             'user_id': user_id,
             'username': user['username'],
-            'can_read': user['can_read']
+            'can_read': user['can_read'],
+            'channels': [user_channel(user_id)],
+            'channel_groups': [user_group(user_id)] if can_read else []
         })
     
     except:
@@ -99,7 +214,7 @@ def get_pubnub_token():
         }), 500
     
     finally:
-        if conn:
-            conn.close()
         if cursor:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
+        if conn:
+            conn.close()
\ No newline at end of file
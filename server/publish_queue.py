@@ -0,0 +1,167 @@
+# Imports
+from collections import deque
+import threading
+import time
+import os
+
+PUBLISH_QUEUE_DEPTH = int(os.getenv('PUBLISH_QUEUE_DEPTH', 1000))
+PUBLISH_BATCH_SIZE = int(os.getenv('PUBLISH_BATCH_SIZE', 50))
+PUBLISH_MAX_RETRIES = int(os.getenv('PUBLISH_MAX_RETRIES', 3))
+PUBLISH_RETRY_BACKOFF = float(os.getenv('PUBLISH_RETRY_BACKOFF', 0.5)) # Seconds, doubled every retry
+PUBLISH_DROP_POLICY = os.getenv('PUBLISH_DROP_POLICY', 'oldest') # 'oldest' or 'newest' when full
+
+
+# Split (channel, message) pairs by channel, keeping their order within each
+def group_by_channel(items):
+    groups = {}
+    for channel, message in items:
+        groups.setdefault(channel, []).append(message)
+    return list(groups.items())
+
+
+# In-process queue of PubNub messages sent by a background worker thread,
+# so request handlers never wait on PubNub. The worker takes up to batch_size
+# messages at a time and sends each channel's share as one publish: a single
+# message as is, several as a batch ({"type": "batch", "events": [...]}, see
+# channels.unpack_messages)
+class PublishQueue:
+    def __init__(
+        self,
+        pubnub,
+        max_depth=PUBLISH_QUEUE_DEPTH,
+        batch_size=PUBLISH_BATCH_SIZE,
+        max_retries=PUBLISH_MAX_RETRIES,
+        backoff=PUBLISH_RETRY_BACKOFF,
+        drop_policy=PUBLISH_DROP_POLICY,
+        sleep=time.sleep
+    ):
+        if drop_policy not in ('oldest', 'newest'):
+            raise ValueError(f"Unknown drop policy '{drop_policy}'")
+
+        self.pubnub = pubnub
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.drop_policy = drop_policy
+        self.sleep = sleep
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._worker = None
+        self._stopping = False
+
+        # Stats
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.publishes = 0
+        self.total_publish_time = 0.0
+
+    # Queue a message and return straight away. False if it was dropped
+    def publish(self, channel, message):
+        with self._cond:
+            if self._stopping:
+                self.dropped += 1
+                return False
+
+            if len(self._queue) >= self.max_depth:
+                self.dropped += 1
+                if self.drop_policy == 'newest':
+                    return False
+                self._queue.popleft()
+
+            self._queue.append((channel, message))
+            self.enqueued += 1
+            self._ensure_worker()
+            self._cond.notify()
+        return True
+
+    # Worker starts on first use, so each process (after a fork) gets its own
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name='pubnub-publisher', daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                self.batches += 1
+
+            for channel, messages in group_by_channel(batch):
+                message = messages[0] if len(messages) == 1 else {'type': 'batch', 'events': messages}
+                ok = self._send(channel, message)
+                with self._cond:
+                    self._in_flight -= len(messages)
+                    if ok:
+                        self.sent += len(messages)
+                    else:
+                        self.failed += len(messages)
+                    self._cond.notify_all()
+
+    # Publish with bounded retries and exponential backoff
+    def _send(self, channel, message):
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self.pubnub.publish().channel(channel).message(message).sync()
+                with self._cond:
+                    self.publishes += 1
+                    self.total_publish_time += time.perf_counter() - start
+                return True
+
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Giving up publishing to {channel}: {e}")
+                    return False
+                with self._cond:
+                    self.retries += 1
+                self.sleep(self.backoff * 2 ** attempt)
+
+    # Wait until everything queued so far has been sent or given up on
+    def flush(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # Stop taking messages, send what is left and stop the worker
+    def shutdown(self, timeout=10):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            worker = self._worker
+
+        if worker:
+            worker.join(timeout)
+        return not self._queue
+
+    def stats(self):
+        with self._cond:
+            return {
+                'depth': len(self._queue),
+                'in_flight': self._in_flight,
+                'enqueued': self.enqueued,
+                'sent': self.sent,
+                'failed': self.failed,
+                'retries': self.retries,
+                'dropped': self.dropped,
+                'batches': self.batches,
+                'publishes': self.publishes,
+                'avg_publish_ms': round(self.total_publish_time / self.publishes * 1000, 2) if self.publishes else 0.0
+            }
@@ -1,8 +1,14 @@
 # Imports
-from flask import Blueprint, current_app, render_template, request, session, redirect, url_for
+from flask import Blueprint, current_app, render_template, request, session, redirect, url_for, jsonify
+from datetime import datetime
+import io
 
 # Files
-from db import get_db_connection
+from db import get_db_connection, get_pool_stats
+from stats import increment_daily_count
+from importer import import_logs, read_rows
+from users import ADMIN_PAGE_SIZE, parse_user_query, fetch_user_page
+from pb import notify_permission_changes
 
 routes_bp = Blueprint("routes", __name__)
 
@@ -37,14 +43,18 @@ def create_log():
         if not notes:
             notes = 'N/A'
             
+        # Log time set here so the daily rollup uses the same day
+        logged_at = datetime.now().replace(microsecond=0)
         cursor.execute(
             """
-            INSERT INTO potty_logs (user_id, potty_type, notes)
-            VALUES (%s, %s, %s)
+            INSERT INTO potty_logs (user_id, logged_at, potty_type, notes)
+            VALUES (%s, %s, %s, %s)
             """,
-            (user_id, potty_type, notes)
+            (user_id, logged_at, potty_type, notes)
         )
+        increment_daily_count(cursor, user_id, logged_at.date(), potty_type)
         conn.commit()
+        current_app.dashboard_cache.invalidate(user_id)
         
         return redirect(url_for('dashboard'))
     
@@ -63,6 +73,42 @@ def create_log():
         if conn:
             conn.close()
 
+# Bulk import of potty logs from an uploaded CSV or NDJSON file
+@routes_bp.route('/potty-activity/import', methods=['POST'])
+def import_potty_logs():
+    user_id = session.get('user_id')
+    if not user_id:
+        return jsonify({'message': "Unauthorized"}), 401
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'message': "Please choose a CSV or NDJSON file to import!"}), 400
+    
+    fmt = request.form.get('format') or ('csv' if upload.filename.lower().endswith('.csv') else 'ndjson')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'message': "Format must be csv or ndjson!"}), 400
+    
+    conn = None
+    
+    try:
+        conn = get_db_connection()
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+        report = import_logs(conn, user_id, read_rows(stream, fmt))
+        
+        if report['imported']:
+            current_app.dashboard_cache.invalidate(user_id)
+        
+        return jsonify(report), 200
+    
+    except Exception as e:
+        print(e)
+        return jsonify({'message': "Something went wrong. Please contact the admin if issues persist."}), 500
+    
+    finally:
+        if conn:
+            conn.close()
+
+
 # Change permissions of users from admin dashboard
 @routes_bp.route('/admin-dashboard/permissions', methods=['POST'])
 def update_permissions():
@@ -92,57 +138,59 @@ def update_permissions():
                 message="You do not have the right permissions to access this page!"
             ), 401
         
-        # Proceed with updating logic 
-        cursor.execute("""
-            SELECT id, can_read, can_write FROM users 
-            WHERE is_admin = FALSE OR is_admin = 0
-        """)
-        users = cursor.fetchall()
+        # Proceed with updating logic, only for the users on the submitted page
+        page_ids = [int(id) for id in request.form.getlist('user_ids') if id.isdigit()][:ADMIN_PAGE_SIZE]
+        users = []
+        if page_ids:
+            cursor.execute(
+                f"""
+                SELECT id, can_read, can_write FROM users 
+                WHERE is_admin = FALSE AND id IN ({', '.join(['%s'] * len(page_ids))})
+                """,
+                tuple(page_ids)
+            )
+            users = cursor.fetchall()
 
-        count = 0
+        # Work out who changed. Read form data: True if checked, False if not
+        changes = []
         for user in users:
             id = user['id']
-            can_read = user['can_read']
-            can_write = user['can_write']
-            
-            # Read form data: True if checked, False if not
             read_new = f'read_{id}' in request.form
             write_new = f'write_{id}' in request.form
 
-            # Only update if values changed
-            if read_new != can_read or write_new != can_write:
-                count += 1
-                cursor.execute(
-                    "UPDATE users SET can_read = %s, can_write = %s WHERE id = %s",
-                    (read_new, write_new, id)
-                )
-                
-                # Send to the user's channel that their token has been updated
-                current_app.pubnub.publish() \
-                    .channel('Channel-Barcelona') \
-                    .message({
-                        "type": "update_token", 
-                        "message": "Your permissions have been changed",
-                        "can_read": read_new,
-                        "can_write": write_new
-                    }) \
-                    .sync()
+            if read_new != bool(user['can_read']) or write_new != bool(user['can_write']):
+                changes.append((id, read_new, write_new))
+        count = len(changes)
+
+        # One UPDATE per combination of new permissions, at most four
+        groups = {}
+        for id, read_new, write_new in changes:
+            groups.setdefault((read_new, write_new), []).append(id)
+
+        for (read_new, write_new), ids in groups.items():
+            cursor.execute(
+                f"UPDATE users SET can_read = %s, can_write = %s WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                (read_new, write_new, *ids)
+            )
 
         conn.commit()
         
-        # Updated users
-        cursor.execute("""
-            SELECT id, can_write, username, can_read FROM users 
-            WHERE is_admin = FALSE OR is_admin = 0
-        """)
-        users = cursor.fetchall()
+        # Old tokens carry the old permissions. Let the users' browsers know, now that the change is committed
+        for id, _, _ in changes:
+            current_app.token_cache.invalidate_user(id)
+        if changes:
+            notify_permission_changes(current_app.publish_queue, changes)
+        
+        # Same page of users again, with their updated permissions
+        query = parse_user_query(request.args)
+        users, has_next = fetch_user_page(cursor, query)
         
         if count > 1:
-            return render_template('admin-dashboard.html', success="Successfully changed permissions of selected users!", users=users), 200
+            return render_template('admin-dashboard.html', success="Successfully changed permissions of selected users!", users=users, query=query, has_next=has_next), 200
         elif count == 1:
-            return render_template('admin-dashboard.html', success="Successfully changed permissions of selected user!", users=users), 200
+            return render_template('admin-dashboard.html', success="Successfully changed permissions of selected user!", users=users, query=query, has_next=has_next), 200
         
-        return render_template('admin-dashboard.html', success="No changes were made!", users=users), 200
+        return render_template('admin-dashboard.html', success="No changes were made!", users=users, query=query, has_next=has_next), 200
             
     except Exception as e:
         print(e)
@@ -311,4 +359,47 @@ def update_preferences():
             if cursor:
                 cursor.close()
             if conn:
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+
+# Performance counters for the admin. DB pool, dashboard cache and PubNub tokens
+@routes_bp.route('/admin-dashboard/metrics', methods=['GET'])
+def metrics():
+    user_id = session.get('user_id')
+    if not session.get('is_admin') or not user_id:
+        return jsonify({'message': "Unauthorized"}), 401
+    
+    conn = None
+    cursor = None
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Double check that user did not just add is_admin manually
+        cursor.execute(
+            'SELECT is_admin FROM users WHERE id = %s',
+            (user_id,)
+        )
+        user = cursor.fetchone()
+        
+        if not user or not bool(user['is_admin']):
+            return jsonify({'message': "Unauthorized"}), 401
+        
+    except Exception as e:
+        print(e)
+        return jsonify({'message': "Something went wrong."}), 500
+    
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+    
+    return jsonify({
+        'db_pool': get_pool_stats(),
+        'dashboard_cache': current_app.dashboard_cache.stats(),
+        'pubnub_tokens': current_app.token_cache.stats(),
+        'publish_queue': current_app.publish_queue.stats(),
+        'sse': current_app.broker.stats()
+    }), 200
@@ -59,14 +59,43 @@ function updateStatusUI(status, message, imagePath) {
     text.innerText = ` ${message}`
 }
 
+// Get user's PubNub token and channels based on permissions
+function fetchPubNubToken() {
+    return fetch("/get_pubnub_token", { method: "POST" }).then(res => res.json())
+}
+
+// Change mascot UI depending on a motion message
+function showMotion(motion) {
+    if (!statusMap.has(motion)) return
+
+    const [message, imagePath] = statusMap.get(motion)
+    updateStatusUI(motion, message, imagePath)
+}
+
+// Live updates straight from the server when PubNub can't be used
+let eventSource = null
+function startEventSource(onFail) {
+    if (eventSource || !window.EventSource) return
+
+    let opened = false
+    eventSource = new EventSource("/events")
+    eventSource.onopen = () => { opened = true }
+    eventSource.addEventListener("motion", event => showMotion(JSON.parse(event.data).motion))
+
+    // Never connected, e.g. no read access. Later errors reconnect by themselves
+    eventSource.onerror = () => {
+        if (opened) return
+        eventSource.close()
+        if (onFail) onFail()
+    }
+}
+
 document.addEventListener("DOMContentLoaded", () => {
-    // Get user's PubNub token based on permissions
-    fetch("/get_pubnub_token", { method: "POST" })
-        .then(res => res.json())
+    fetchPubNubToken()
         .then(data => {
-            // No registered device yet
+            // Could not get a token. Try the server's own stream before giving up
             if (!data.token) {
-                alert(data.message)
+                startEventSource(() => alert(data.message))
                 return
             }
 
@@ -76,24 +105,52 @@ document.addEventListener("DOMContentLoaded", () => {
                 return
             }
 
+            // PubNub script blocked or failed to load
+            if (typeof PubNub === "undefined") {
+                startEventSource()
+                return
+            }
+
             const pubnub = new PubNub({
                 subscribeKey: PUBNUB_SUB_KEY,
                 authKey: data.token,
                 uuid: "pottydog-website"
             })
 
-            pubnub.subscribe({ channels: ["Channel-Barcelona"] })
+            // Own notices plus the channel group holding this household's devices
+            pubnub.subscribe({ channels: data.channels, channelGroups: data.channel_groups })
 
-            // For changing mascot UI depending on PubNub motion message
             pubnub.addListener({
+                status: function (event) {
+                    if (event.category === "PNNetworkDownCategory" || event.category === "PNAccessDeniedCategory") {
+                        pubnub.unsubscribeAll()
+                        startEventSource()
+                    }
+                },
                 message: function (event) {
-                    const motion = event.message.motion
-                    if (!statusMap.has(motion)) return
+                    // Several messages sent together: Pi events saved while offline, or
+                    // server notices queued up. The last motion is the current state
+                    const messages = event.message.type === "batch" ? event.message.events || [] : [event.message]
+                    const motions = messages.filter(message => message.motion)
+                    const notice = messages.find(message => message.type === "update_token")
+
+                    // Permissions changed by the admin. Get a token for the new ones
+                    if (notice) {
+                        fetchPubNubToken()
+                            .then(update => {
+                                if (!update.token || !update.can_read) {
+                                    pubnub.unsubscribeAll()
+                                    alert(notice.message)
+                                    return
+                                }
+                                pubnub.setToken(update.token)
+                            })
+                            .catch(err => console.error("Error refreshing token:", err))
+                    }
 
-                    const [message, imagePath] = statusMap.get(motion)
-                    updateStatusUI(motion, message, imagePath)
+                    if (motions.length) showMotion(motions[motions.length - 1].motion)
                 }
             })
         })
         .catch(err => console.error("Error fetching token:", err))
-})
\ No newline at end of file
+})
@@ -0,0 +1,101 @@
+# Daily potty activity rollup (potty_daily_stats).
+# Writers call these with their own cursor so the rollup changes in the same
+# transaction as the potty_logs rows. To rebuild it from potty_logs:
+#   python stats.py rebuild [user_id]
+
+# Imports
+import sys
+
+# Files
+from db import get_db_connection, get_dialect
+
+UPSERT = {
+    'mysql': """
+        INSERT INTO potty_daily_stats (user_id, day, potty_type, count)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+    """,
+    'sqlite': """
+        INSERT INTO potty_daily_stats (user_id, day, potty_type, count)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (user_id, day, potty_type) DO UPDATE SET count = count + excluded.count
+    """
+}
+
+
+# Add to the counts for new logs. counts is {(day, potty_type): amount}
+def add_daily_counts(cursor, user_id, counts):
+    if not counts:
+        return
+    cursor.executemany(
+        UPSERT[get_dialect()],
+        [(user_id, day, potty_type, amount) for (day, potty_type), amount in counts.items()]
+    )
+
+
+def increment_daily_count(cursor, user_id, day, potty_type):
+    add_daily_counts(cursor, user_id, {(day, potty_type): 1})
+
+
+# Total logs of any type for a user on a day
+def get_daily_count(cursor, user_id, day):
+    cursor.execute(
+        "SELECT COALESCE(SUM(count), 0) AS activity_count FROM potty_daily_stats WHERE user_id = %s AND day = %s",
+        (user_id, day)
+    )
+    row = cursor.fetchone()
+    return int(row['activity_count'] if isinstance(row, dict) else row[0])
+
+
+# Recount the rollup from potty_logs for one user, or everyone
+def rebuild_daily_stats(conn, user_id=None):
+    cursor = conn.cursor()
+    try:
+        if user_id is None:
+            cursor.execute("DELETE FROM potty_daily_stats")
+            cursor.execute("""
+                INSERT INTO potty_daily_stats (user_id, day, potty_type, count)
+                SELECT user_id, DATE(logged_at), potty_type, COUNT(*)
+                FROM potty_logs
+                GROUP BY user_id, DATE(logged_at), potty_type
+            """)
+        else:
+            cursor.execute("DELETE FROM potty_daily_stats WHERE user_id = %s", (user_id,))
+            cursor.execute(
+                """
+                INSERT INTO potty_daily_stats (user_id, day, potty_type, count)
+                SELECT user_id, DATE(logged_at), potty_type, COUNT(*)
+                FROM potty_logs
+                WHERE user_id = %s
+                GROUP BY user_id, DATE(logged_at), potty_type
+                """,
+                (user_id,)
+            )
+        rows = cursor.rowcount
+        conn.commit()
+        return rows
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cursor.close()
+
+
+def main(args):
+    if not args or args[0] != 'rebuild':
+        print("Usage: python stats.py rebuild [user_id]")
+        return
+
+    user_id = int(args[1]) if len(args) > 1 else None
+    conn = get_db_connection()
+    try:
+        rows = rebuild_daily_stats(conn, user_id)
+        print(f"Rebuilt potty_daily_stats: {rows} row(s)")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+from drivers import connect_sqlite
+from datetime import datetime, timedelta
+from app import app
+import pytest
+
+
+# Test client backed by a sqlite DB with 25 logs for user 1, one per hour
+@pytest.fixture
+def client(tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, email) VALUES (1, 'theopic@email.com')")
+    cursor.executemany(
+        "INSERT INTO potty_logs (user_id, logged_at, potty_type, notes) VALUES (%s, %s, %s, %s)",
+        [
+            (1, datetime(2025, 3, 1, 0, 0) + timedelta(hours=i), 'pee' if i % 2 else 'poop', 'N/A')
+            for i in range(25)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+    app.config['TESTING'] = True
+    with patch('api.get_db_connection', side_effect=lambda: connect_sqlite(path)):
+        with app.test_client() as client:
+            with client.session_transaction() as session:
+                session['user_id'] = 1
+                session['can_read'] = True
+            yield client
+
+
+# Test that logged out users are rejected
+def test_potty_logs_logged_out(client):
+    with client.session_transaction() as session:
+        session.clear()
+
+    response = client.get('/api/potty-logs')
+    assert response.status_code == 401
+
+
+# Test that users without read access are rejected
+def test_potty_logs_no_read_access(client):
+    with client.session_transaction() as session:
+        session['can_read'] = False
+
+    response = client.get('/api/potty-logs')
+    assert response.status_code == 401
+
+
+# Test that following the cursor visits every log once, newest first
+def test_potty_logs_keyset_pages(client):
+    seen = []
+    cursor = None
+
+    while True:
+        url = '/api/potty-logs?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        seen.extend(log['logged_at'] for log in data['logs'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+# Test date range and potty type filters
+def test_potty_logs_filters(client):
+    data = client.get('/api/potty-logs?start=2025-03-02&end=2025-03-02').get_json()
+    assert [log['logged_at'] for log in data['logs']] == ['2025-03-02T00:00:00']
+    assert data['next_cursor'] is None
+
+    data = client.get('/api/potty-logs?end=2025-03-01&potty_type=pee').get_json()
+    assert len(data['logs']) == 12
+    assert all(log['potty_type'] == 'pee' for log in data['logs'])
+
+
+# Test that bad query args are a 400
+def test_potty_logs_invalid_query(client):
+    assert client.get('/api/potty-logs?start=yesterday').status_code == 400
+    assert client.get('/api/potty-logs?potty_type=zoomies').status_code == 400
+    assert client.get('/api/potty-logs?limit=0').status_code == 400
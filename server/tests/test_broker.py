@@ -0,0 +1,142 @@
+from unittest.mock import patch, MagicMock
+from pubnub.models.consumer.pubsub import PNMessageResult
+from broker import Broker, BrokerFullError, MotionBridge
+from events import stream_events
+from app import app
+import pytest
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+# Test that messages only reach clients on the topic
+def test_broker_fan_out():
+    broker = Broker()
+    kitchen = [broker.subscribe(['pottydog.device.kitchen']) for _ in range(3)]
+    garden = broker.subscribe(['pottydog.device.garden'])
+
+    assert broker.publish('pottydog.device.kitchen', {'motion': 'potty'}) == 3
+    assert [s.get(timeout=0) for s in kitchen] == [{'motion': 'potty'}] * 3
+    assert garden.get(timeout=0) is None
+
+    broker.unsubscribe(kitchen[0])
+    assert broker.publish('pottydog.device.kitchen', {'motion': 'inactive'}) == 2
+    assert broker.stats()['clients'] == 3
+
+
+# Test that a slow client keeps only its newest messages
+def test_broker_bounded_queue():
+    broker = Broker(max_queue=2)
+    subscription = broker.subscribe(['topic'])
+
+    for i in range(5):
+        broker.publish('topic', {'n': i})
+
+    assert [subscription.get(timeout=0) for _ in range(2)] == [{'n': 3}, {'n': 4}]
+    assert subscription.dropped == 3
+    assert broker.stats()['dropped'] == 3
+
+
+# Test the client limit
+def test_broker_max_clients():
+    broker = Broker(max_clients=1)
+    broker.subscribe(['topic'])
+
+    with pytest.raises(BrokerFullError):
+        broker.subscribe(['topic'])
+    assert broker.stats()['rejected'] == 1
+
+
+# Test SSE framing, heartbeats and clean up when the stream is closed
+def test_stream_events():
+    broker = Broker()
+    subscription = broker.subscribe(['topic'])
+    stream = stream_events(broker, subscription, heartbeat=0.01)
+
+    assert next(stream) == "retry: 3000\n\n"
+    assert next(stream) == ": heartbeat\n\n"
+    broker.publish('topic', {'motion': 'detected'})
+    assert next(stream) == 'event: motion\ndata: {"motion": "detected"}\n\n'
+
+    stream.close()
+    assert broker.stats()['clients'] == 0
+
+
+# Test that only device channel messages are bridged from PubNub
+def test_motion_bridge():
+    broker = MagicMock()
+    bridge = MotionBridge(broker)
+
+    bridge.message(None, PNMessageResult({'motion': 'potty'}, 'pottydog.device.*', 'pottydog.device.pi-1', 1))
+    bridge.message(None, PNMessageResult({'type': 'update_token'}, None, 'pottydog.user.1', 1))
+
+    broker.publish.assert_called_once_with('pottydog.device.pi-1', {'motion': 'potty'})
+
+
+# Test that events a Pi sends for its other sensors are bridged under their own
+# channel, only for sensors registered to the Pi's user
+def test_motion_bridge_other_devices():
+    broker = MagicMock()
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [
+        {'device_id': 'pi-1', 'user_id': 1},
+        {'device_id': 'pi-door', 'user_id': 1},
+        {'device_id': 'pi-neighbour', 'user_id': 2}
+    ]
+    connect = MagicMock()
+    connect.return_value.cursor.return_value = cursor
+    bridge = MotionBridge(broker, connect=connect)
+
+    events = [
+        {'motion': 'detected'},
+        {'motion': 'potty', 'device_id': 'pi-door'},
+        {'motion': 'potty', 'device_id': 'pi-neighbour'}
+    ]
+    bridge.message(None, PNMessageResult({'type': 'batch', 'events': events}, 'pottydog.device.*', 'pottydog.device.pi-1', 1))
+    assert [call.args for call in broker.publish.call_args_list] == [
+        ('pottydog.device.pi-1', events[0]),
+        ('pottydog.device.pi-door', events[1])
+    ]
+
+    bridge.message(None, PNMessageResult({'motion': 'inactive', 'device_id': 'pi-door'}, None, 'pottydog.device.pi-1', 2))
+    assert connect.call_count == 1 # Owners are cached
+    assert broker.publish.call_args.args == ('pottydog.device.pi-door', {'motion': 'inactive', 'device_id': 'pi-door'})
+
+
+# Test that /events streams the user's own devices
+@patch('events.get_db_connection')
+def test_events_endpoint(mock_get_db_connection, client):
+    app.broker = Broker()
+    mock_cursor = MagicMock()
+    mock_get_db_connection.return_value.cursor.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [{'device_id': 'pi-1'}]
+
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['can_read'] = True
+
+    response = client.get('/events')
+    assert response.mimetype == 'text/event-stream'
+    stream = iter(response.response)
+    assert next(stream) == b"retry: 3000\n\n"
+
+    app.broker.publish('pottydog.device.pi-2', {'motion': 'potty'})
+    app.broker.publish('pottydog.device.pi-1', {'motion': 'detected'})
+    assert next(stream) == b'event: motion\ndata: {"motion": "detected"}\n\n'
+
+    response.close()
+    assert app.broker.stats()['clients'] == 0
+
+
+# Test that /events needs read access
+def test_events_no_read_access(client):
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['can_read'] = False
+
+    response = client.get('/events')
+    assert response.status_code == 401
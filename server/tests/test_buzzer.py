@@ -0,0 +1,53 @@
+from hardware.buzzer import PiezoBuzzer, PRIORITY_POTTY, PRIORITY_STARTUP
+from hardware.gpio import SimulatedGPIO
+import time
+
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def wait_until_done(buzzer):
+    return wait_for(lambda: not buzzer.is_playing())
+
+
+def frequencies(gpio):
+    return [value for _, _, action, value in gpio.pwm_log if action == "frequency"]
+
+
+# Test that a pattern plays in the background, with rests left silent
+def test_buzzer_pattern():
+    gpio = SimulatedGPIO()
+    buzzer = PiezoBuzzer(gpio=gpio)
+
+    start = time.monotonic()
+    assert buzzer.play([(1000, 0.02), (None, 0.02), (2000, 0.02)])
+    assert time.monotonic() - start < 0.02 # Didn't wait for it
+    assert wait_until_done(buzzer)
+
+    actions = [(action, value) for _, pin, action, value in gpio.pwm_log if pin == 13]
+    assert actions == [
+        ("frequency", 1000), ("start", 50), ("stop", None),
+        ("frequency", 2000), ("start", 50), ("stop", None)
+    ]
+    buzzer.cleanup()
+
+
+# Test that the potty alert cuts off the startup tune, but not the other way round
+def test_buzzer_priority():
+    gpio = SimulatedGPIO()
+    buzzer = PiezoBuzzer(gpio=gpio)
+
+    buzzer.play([(1000, 5)], PRIORITY_STARTUP)
+    assert buzzer.play([(4000, 5)], PRIORITY_POTTY)
+    assert not buzzer.play([(1000, 5)], PRIORITY_STARTUP)
+    assert wait_for(lambda: 4000 in frequencies(gpio))
+
+    buzzer.cancel()
+    assert wait_until_done(buzzer)
+    buzzer.cleanup()
+    assert frequencies(gpio)[-1] == 4000
+    assert gpio.pwm_log[-1][2] == "stop"
@@ -0,0 +1,86 @@
+from unittest.mock import patch, MagicMock
+from cache import MemoryCache, DashboardCache, create_dashboard_cache
+from datetime import datetime
+from app import app
+import pytest
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+# Test that the least recently used entry is evicted first
+def test_memory_cache_lru():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+# Test that entries expire after their timeout
+def test_memory_cache_ttl():
+    now = [100.0]
+    cache = MemoryCache(clock=lambda: now[0])
+    cache.set('a', 1, timeout=10)
+
+    assert cache.get('a') == 1
+    now[0] = 110.0
+    assert cache.get('a') is None
+
+
+# Test hit/miss counters and invalidation
+def test_dashboard_cache_stats():
+    cache = DashboardCache(MemoryCache(), ttl=60)
+
+    assert cache.get(1) is None
+    cache.set(1, {'last_potty_time': None, 'activity_count': 0})
+    assert cache.get(1)['activity_count'] == 0
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['invalidations'] == 1
+
+
+# Test that a Redis host without the redis package falls back to the in-process cache
+@patch('cache.CACHE_REDIS_HOST', 'localhost')
+def test_dashboard_cache_redis_missing():
+    with patch.dict('sys.modules', {'redis': None}):
+        cache = create_dashboard_cache()
+    assert isinstance(cache.backend, MemoryCache)
+
+
+# Test that a second dashboard load is served from the cache
+@patch('app.get_db_connection')
+def test_dashboard_uses_cache(mock_get_db_connection, client):
+    app.dashboard_cache = DashboardCache(MemoryCache())
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_db_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.side_effect = [
+        {'logged_at': datetime(2025, 3, 1, 8, 30)},
+        {'activity_count': 4}
+    ]
+
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['username'] = 'TheoPic'
+
+    first = client.get('/dashboard')
+    second = client.get('/dashboard')
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert mock_get_db_connection.call_count == 1
+    assert app.dashboard_cache.stats()['hits'] == 1
@@ -0,0 +1,78 @@
+from unittest.mock import patch, MagicMock
+from channels import user_channel, device_channel, user_group, get_device_ids, sync_user_group, register_device
+from drivers import connect_sqlite
+from pb import generate_token, TokenCache
+from app import app
+import pytest
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+# Test that device channels are added to the owner's group in chunks
+def test_sync_user_group():
+    pubnub = MagicMock()
+    add = pubnub.add_channel_to_channel_group.return_value.channels
+
+    sync_user_group(pubnub, 7, [f'pi-{i}' for i in range(250)])
+
+    chunks = [call[0][0] for call in add.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [200, 50]
+    assert chunks[0][0] == 'pottydog.device.pi-0'
+    add.return_value.channel_group.assert_called_with('pottydog-user-7')
+
+
+# Test that registering a device stores it and adds it to the user's group
+def test_register_device(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'test.sqlite3'))
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("INSERT INTO users (id, username, email) VALUES (1, 'TheoPic', 'theo@email.com')")
+    conn.commit()
+    pubnub = MagicMock()
+
+    register_device(conn, pubnub, 1, 'pi-kitchen', 'Kitchen')
+    register_device(conn, pubnub, 1, 'pi-garden')
+
+    assert get_device_ids(cursor, 1) == ['pi-kitchen', 'pi-garden']
+    pubnub.add_channel_to_channel_group.return_value.channels.assert_called_with(['pottydog.device.pi-garden'])
+    conn.close()
+
+
+# Test that the token only covers the user's own channel and group
+def test_generate_token_resources():
+    pubnub = MagicMock()
+    grant = pubnub.grant_token.return_value.ttl.return_value.authorized_uuid.return_value
+
+    generate_token(3, True, False, pubnub)
+    channel = grant.channels.call_args[0][0][0]
+    group = grant.channels.return_value.groups.call_args[0][0][0]
+    assert channel.get_id() == user_channel(3)
+    assert channel.is_read() and not channel.is_write()
+    assert group.get_id() == user_group(3) and group.is_read()
+
+    generate_token(3, False, True, pubnub)
+    channel = grant.channels.call_args[0][0][0]
+    assert channel.is_read() and channel.is_write()
+    assert grant.channels.return_value.groups.call_args[0][0] == []
+
+
+# Test that the token response tells the browser what to subscribe to
+@patch('pb.generate_token', return_value='token')
+@patch('pb.get_db_connection')
+def test_get_pubnub_token_channels(mock_get_db_connection, mock_generate_token, client):
+    app.token_cache = TokenCache()
+    mock_cursor = MagicMock()
+    mock_get_db_connection.return_value.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = {'id': 5, 'username': 'TheoPic', 'can_read': 1, 'can_write': 0}
+
+    with client.session_transaction() as session:
+        session['user_id'] = 5
+
+    data = client.post('/get_pubnub_token').get_json()
+    assert data['channels'] == ['pottydog.user.5']
+    assert data['channel_groups'] == ['pottydog-user-5']
+    assert device_channel('pi') == 'pottydog.device.pi'
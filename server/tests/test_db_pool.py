@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock
+from db import ConnectionPool, PoolTimeoutError
+import threading
+import pytest
+
+
+# Fake connect function that hands out mock connections
+def make_connect():
+    created = []
+
+    def connect():
+        conn = MagicMock()
+        conn.in_transaction = False
+        created.append(conn)
+        return conn
+
+    return connect, created
+
+
+# Test that closing a pooled connection reuses it instead of reconnecting
+def test_connection_reused():
+    connect, created = make_connect()
+    pool = ConnectionPool(connect, size=2, timeout=1)
+
+    conn = pool.get_connection()
+    conn.close()
+    conn = pool.get_connection()
+    conn.close()
+
+    assert len(created) == 1
+    assert pool.stats()['checkouts'] == 2
+    assert pool.stats()['idle'] == 1
+    assert created[0].ping.call_count == 1 # Only pinged when taken from idle
+
+
+# Test that the pool never opens more than its size and times out waiters
+def test_pool_bounded_timeout():
+    connect, created = make_connect()
+    pool = ConnectionPool(connect, size=1, timeout=0.05)
+
+    conn = pool.get_connection()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+
+    conn.close()
+    assert len(created) == 1
+    assert pool.stats()['timeouts'] == 1
+
+
+# Test that a waiter gets the connection as soon as it is returned
+def test_waiter_gets_released_connection():
+    connect, created = make_connect()
+    pool = ConnectionPool(connect, size=1, timeout=2)
+    conn = pool.get_connection()
+    got = []
+
+    thread = threading.Thread(target=lambda: got.append(pool.get_connection()))
+    thread.start()
+    while pool.stats()['waiters'] == 0:
+        pass
+    conn.close()
+    thread.join()
+
+    assert len(created) == 1
+    assert pool.stats()['waits'] == 1
+    got[0].close()
+
+
+# Test that a dead connection is replaced on checkout
+def test_dead_connection_discarded():
+    connect, created = make_connect()
+    pool = ConnectionPool(connect, size=1, timeout=1)
+
+    pool.get_connection().close()
+    created[0].ping.side_effect = Exception("MySQL server has gone away")
+    conn = pool.get_connection()
+
+    assert len(created) == 2
+    assert pool.stats()['discarded'] == 1
+    assert pool.stats()['open'] == 1
+    conn.close()
+
+
+# Test that connections older than the max lifetime are recycled
+def test_connection_recycled_after_lifetime():
+    connect, created = make_connect()
+    pool = ConnectionPool(connect, size=1, timeout=1, max_lifetime=0.0001)
+
+    conn = pool.get_connection()
+    threading.Event().wait(0.01)
+    conn.close()
+
+    assert created[0].close.called
+    assert pool.stats()['recycled'] == 1
+    assert pool.stats()['open'] == 0
+
+
+# Test that uncommitted work is rolled back before reuse
+def test_release_rolls_back_open_transaction():
+    connect, created = make_connect()
+    pool = ConnectionPool(connect, size=1, timeout=1)
+
+    conn = pool.get_connection()
+    created[0].in_transaction = True
+    conn.close()
+
+    assert created[0].rollback.called
+    with pytest.raises(AttributeError):
+        conn.cursor()
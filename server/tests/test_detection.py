@@ -0,0 +1,64 @@
+from hardware.detection import MotionDetector
+from hardware.replay import load_trace, sample_trace, replay, grid_search
+
+
+def run(detector, motion_seconds, seconds):
+    results = []
+    for now in range(1, seconds + 1):
+        results.append(detector.update(now in motion_seconds, now))
+    return results
+
+
+# Test detected, then potty after the wait, then inactive, on a fake clock
+def test_detector_states():
+    detector = MotionDetector(inactive_threshold=30, wait_threshold=10, response_time=10, clock=lambda: 0.0)
+    results = run(detector, set(range(1, 26)), 70)
+
+    assert results[0] == ("detected", False)
+    assert results[11] == ("potty", True) # 11s after motion started
+    assert results[20] == ("potty", False) # Shown while the owner can respond
+    assert results[21] == ("detected", False)
+    assert results[22] == ("potty", True) # Still waiting after the owner had time to respond
+    assert results[40] == (None, False) # Quiet but not inactive yet
+    assert results[60] == ("inactive", False)
+    assert detector.alerts == 2
+
+
+# Test that a gap in motion longer than the hysteresis restarts the wait
+def test_detector_hysteresis():
+    motion = set(range(1, 7)) | set(range(12, 18)) # 6s, 5s gap, 6s
+
+    default = MotionDetector(inactive_threshold=30, wait_threshold=10, clock=lambda: 0.0)
+    assert any(alert for _, alert in run(default, motion, 20))
+
+    strict = MotionDetector(inactive_threshold=30, wait_threshold=10, hysteresis=3, clock=lambda: 0.0)
+    assert not any(alert for _, alert in run(strict, motion, 20))
+
+
+# Test reading a trace and latching short pulses between ticks
+def test_sample_trace(tmp_path):
+    path = tmp_path / "door.csv"
+    path.write_text("# door\n100.0,0\n101.2,1\n101.4,0\n103 1\n104.5 0\n")
+    samples = load_trace(str(path))
+
+    assert samples[1] == (101.2, True)
+    assert list(sample_trace(samples)) == [(100.0, False), (101.0, False), (102.0, True), (103.0, True), (104.0, True)]
+
+
+# Test a replayed hour of a dog waiting at the door, and a threshold grid over it
+def test_replay():
+    start = 1740819600.0
+    samples = [(start, False)]
+    for visit in (600, 1800): # Two 20s visits to the door, 2s pulses every 3s
+        for second in range(0, 20, 3):
+            samples += [(start + visit + second, True), (start + visit + second + 2, False)]
+    samples.append((start + 3600, False))
+
+    result = replay(samples, inactive_threshold=30, wait_threshold=10)
+    assert result["alerts"] == 2
+    assert result["simulated_seconds"] == 3601
+    assert result["seconds"]["potty"] > 0
+    assert result["publishes"]["sent"] == result["transitions"] + 1
+
+    results = grid_search([("door", samples)], [30], [10, 25], [None])
+    assert [r["alerts"] for r in results] == [2, 0]
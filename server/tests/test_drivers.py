@@ -0,0 +1,51 @@
+from drivers import connect_sqlite, SQLiteCursor
+from datetime import datetime, date
+import pytest
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'test.sqlite3'))
+    yield conn
+    conn.close()
+
+
+# Test that MySQL placeholders are translated for sqlite
+def test_placeholder_translation():
+    assert SQLiteCursor._translate("SELECT * FROM users WHERE id = %s AND email LIKE 'a%%'") == \
+        "SELECT * FROM users WHERE id = ? AND email LIKE 'a%'"
+
+
+# Test that the schema is created and rows come back like mysql.connector dictionary cursors
+def test_sqlite_dictionary_rows(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "INSERT INTO users (username, email) VALUES (%s, %s)",
+        ('TheoPic', 'theopic@email.com')
+    )
+    user_id = cursor.lastrowid
+    cursor.execute(
+        "INSERT INTO potty_logs (user_id, logged_at, potty_type, notes) VALUES (%s, %s, %s, %s)",
+        (user_id, datetime(2025, 3, 1, 8, 30), 'pee', 'N/A')
+    )
+    conn.commit()
+
+    cursor.execute(
+        "SELECT logged_at, potty_type FROM potty_logs WHERE user_id = %s AND DATE(logged_at) = %s",
+        (user_id, date(2025, 3, 1))
+    )
+    log = cursor.fetchone()
+
+    assert log == {'logged_at': datetime(2025, 3, 1, 8, 30), 'potty_type': 'pee'}
+
+
+# Test that the potty_type check matches the MySQL ENUM
+def test_sqlite_potty_type_check(conn):
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (email) VALUES (%s)", ('a@email.com',))
+
+    with pytest.raises(Exception):
+        cursor.execute(
+            "INSERT INTO potty_logs (user_id, potty_type) VALUES (%s, %s)",
+            (cursor.lastrowid, 'zoomies')
+        )
@@ -0,0 +1,96 @@
+from unittest.mock import MagicMock, patch
+from drivers import connect_sqlite
+from datetime import datetime, timedelta
+from app import app
+import gzip
+import json
+import pytest
+
+
+# Test client backed by a sqlite DB with 30 logs for user 1, one per day
+@pytest.fixture
+def client(tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, email, is_admin) VALUES (1, 'TheoPic', 'theopic@email.com', TRUE)")
+    cursor.executemany(
+        "INSERT INTO potty_logs (user_id, logged_at, potty_type, notes) VALUES (%s, %s, %s, %s)",
+        [(1, datetime(2025, 3, 1, 9, 0) + timedelta(days=i), 'pee', 'N/A') for i in range(30)]
+    )
+    conn.commit()
+    conn.close()
+
+    app.config['TESTING'] = True
+    with patch('export.get_db_connection', side_effect=lambda: connect_sqlite(path)), \
+         patch('export.EXPORT_CHUNK_ROWS', 7):
+        with app.test_client() as client:
+            with client.session_transaction() as session:
+                session['user_id'] = 1
+                session['can_read'] = True
+            yield client
+
+
+# Test that users without read access can't export
+def test_export_no_read_access(client):
+    with client.session_transaction() as session:
+        session['can_read'] = False
+
+    response = client.get('/potty-activity/export')
+    assert response.status_code == 401
+
+
+# Test CSV export streams every row in chunks
+def test_export_csv(client):
+    response = client.get('/potty-activity/export')
+    lines = response.data.decode().splitlines()
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert lines[0] == 'logged_at,potty_type,notes'
+    assert len(lines) == 31
+
+
+# Test gzipped NDJSON export with a date range
+def test_export_ndjson_gzip_range(client):
+    response = client.get('/potty-activity/export?format=ndjson&gzip=1&start=2025-03-05&end=2025-03-06')
+    rows = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+
+    assert response.status_code == 200
+    assert 'potty-logs' in response.headers['Content-Disposition']
+    assert [row['logged_at'] for row in rows] == ['2025-03-05 09:00:00', '2025-03-06 09:00:00']
+
+
+# Test that the all-users export needs an admin session
+def test_export_all_requires_admin(client):
+    response = client.get('/admin-dashboard/export', follow_redirects=True)
+    assert b"Administrator Login" in response.data
+
+    with client.session_transaction() as session:
+        session['is_admin'] = True
+
+    response = client.get('/admin-dashboard/export?format=ndjson')
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert len(rows) == 30
+    assert rows[0]['username'] == 'TheoPic'
+
+
+# Test that an unknown format is rejected
+def test_export_bad_format(client):
+    assert client.get('/potty-activity/export?format=xml').status_code == 400
+
+
+
+# Test that the connection goes back to the pool when the body is never read,
+# even if closing the unread cursor fails
+def test_export_releases_unread(client):
+    conn = MagicMock()
+    conn.cursor.return_value.close.side_effect = Exception("Unread result found")
+
+    with patch('export.get_db_connection', return_value=conn):
+        response = client.head('/potty-activity/export')
+        response.close()
+
+    assert response.status_code == 200
+    conn.cursor.return_value.fetchmany.assert_not_called()
+    conn.close.assert_called_once()
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+from importer import import_logs, read_rows
+from stats import get_daily_count
+from drivers import connect_sqlite
+from datetime import date
+import io
+import pytest
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'test.sqlite3'))
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, email) VALUES (1, 'theopic@email.com')")
+    conn.commit()
+    with patch('stats.get_dialect', return_value='sqlite'):
+        yield conn
+    conn.close()
+
+
+def count_logs(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM potty_logs")
+    return cursor.fetchone()[0]
+
+
+# Test CSV import in chunks, with invalid rows reported and the rollup updated
+def test_import_csv(conn):
+    data = io.StringIO(
+        "logged_at,potty_type,notes\n"
+        "2025-03-01 08:00,pee,\n"
+        "2025-03-01 12:00,poop,after walk\n"
+        "2025-03-01 18:00,zoomies,\n"
+        "2025-03-02T07:30:00,Pee,\n"
+        "not a date,pee,\n"
+    )
+
+    report = import_logs(conn, 1, read_rows(data, 'csv'), chunk_size=2)
+
+    assert report['imported'] == 3
+    assert report['invalid'] == 2
+    assert [error['line'] for error in report['errors']] == [4, 6]
+    assert len(report['chunks']) == 2
+    assert count_logs(conn) == 3
+    assert get_daily_count(conn.cursor(dictionary=True), 1, date(2025, 3, 1)) == 2
+
+
+# Test that importing the same file twice skips every duplicate
+def test_import_skips_duplicates(conn):
+    lines = (
+        '{"logged_at": "2025-03-01 08:00:00", "potty_type": "pee"}\n'
+        '{"logged_at": "2025-03-01 08:00:00", "potty_type": "pee"}\n'
+        '{"logged_at": "2025-03-01 08:00:00", "potty_type": "poop"}\n'
+        'oops\n'
+    )
+
+    first = import_logs(conn, 1, read_rows(io.StringIO(lines), 'ndjson'))
+    second = import_logs(conn, 1, read_rows(io.StringIO(lines), 'ndjson'))
+
+    assert first['imported'] == 2
+    assert first['duplicates'] == 1
+    assert first['invalid'] == 1
+    assert second['imported'] == 0
+    assert second['duplicates'] == 3
+    assert count_logs(conn) == 2
+    assert get_daily_count(conn.cursor(dictionary=True), 1, date(2025, 3, 1)) == 2
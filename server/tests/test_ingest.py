@@ -0,0 +1,218 @@
+from unittest.mock import MagicMock
+from pubnub.models.consumer.pubsub import PNMessageResult
+from ingest import MotionIngest, MotionListener, parse_event
+from drivers import connect_sqlite
+from datetime import datetime
+import threading
+import pytest
+
+
+# sqlite DB with one user who owns device 'pi-1'
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, email) VALUES (1, 'TheoPic', 'theo@email.com')")
+    cursor.execute("INSERT INTO devices (user_id, device_id) VALUES (1, 'pi-1')")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count_events(path):
+    conn = connect_sqlite(path)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT COUNT(*) AS count FROM motion_events")
+    count = cursor.fetchone()['count']
+    conn.close()
+    return count
+
+
+# Test that the Pi's timestamp is used and bad messages are rejected
+def test_parse_event():
+    received = datetime(2025, 3, 1, 12, 0, 5)
+    event = parse_event('pi-1', {'motion': 'potty', 'timestamp': datetime(2025, 3, 1, 12, 0, 0, 500).timestamp()}, received)
+    assert event == ('pi-1', 'potty', datetime(2025, 3, 1, 12, 0, 0), received, 'pi-1')
+    assert parse_event('pi-1', {'motion': 'potty', 'device_id': 'pi-door'}, received)[::4] == ('pi-door', 'pi-1')
+
+    assert parse_event('pi-1', {'motion': 'detected'}, received)[2] == received
+    with pytest.raises(ValueError):
+        parse_event('pi-1', {'motion': 'jumping'})
+
+
+# Test that events are written in full batches, and flush() writes the rest
+def test_ingest_batches(path):
+    ingest = MotionIngest(connect=lambda: connect_sqlite(path), batch_size=3, flush_interval=60)
+
+    for _ in range(7):
+        assert ingest.submit('pi-1', {'motion': 'detected', 'timestamp': 1700000000})
+    ingest.submit('pi-2', {'motion': 'detected'}) # Not registered
+    ingest.submit('pi-1', {'state': 'detected'})
+    assert ingest.flush(timeout=5)
+
+    stats = ingest.stats()
+    assert count_events(path) == 7
+    assert stats['inserted'] == 7
+    assert stats['batches'] == 3
+    assert stats['unknown_device'] == 1
+    assert stats['invalid'] == 1
+    ingest.shutdown()
+
+
+# Test that a part batch is written once the flush interval passes
+def test_ingest_flush_interval(path):
+    ingest = MotionIngest(connect=lambda: connect_sqlite(path), batch_size=100, flush_interval=0.05)
+    written = threading.Event()
+    write = ingest._write
+    ingest._write = lambda batch: (write(batch), written.set())
+
+    ingest.submit('pi-1', {'motion': 'potty'})
+    assert written.wait(timeout=5)
+    assert count_events(path) == 1
+    ingest.shutdown()
+
+
+# Test that submit() blocks and then drops while the DB is stuck
+def test_ingest_backpressure(path):
+    release = threading.Event()
+    ingest = MotionIngest(
+        connect=lambda: release.wait() and connect_sqlite(path),
+        batch_size=2, max_pending=2, put_timeout=0.05
+    )
+
+    for _ in range(2):
+        ingest.submit('pi-1', {'motion': 'detected'})
+    while ingest.stats()['in_flight'] == 0: # Worker is stuck writing the first batch
+        pass
+    assert ingest.submit('pi-1', {'motion': 'detected'})
+    assert ingest.submit('pi-1', {'motion': 'detected'})
+    assert not ingest.submit('pi-1', {'motion': 'detected'})
+
+    release.set()
+    assert ingest.flush(timeout=5)
+    stats = ingest.stats()
+    assert stats['blocked'] == 1 and stats['dropped'] == 1
+    assert count_events(path) == 4
+    ingest.shutdown()
+
+
+# Test that a failed batch is kept and written on the next try
+def test_ingest_retries(path):
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise Exception("DB is down")
+        return connect_sqlite(path)
+
+    sleeps = []
+    ingest = MotionIngest(connect=connect, batch_size=2, sleep=sleeps.append)
+    ingest.submit('pi-1', {'motion': 'detected'})
+    ingest.submit('pi-1', {'motion': 'inactive'})
+    assert ingest.flush(timeout=5)
+
+    assert count_events(path) == 2
+    assert ingest.stats()['errors'] == 1
+    assert sleeps == [ingest.backoff]
+    ingest.shutdown()
+
+
+# Test that only device channel messages are passed on, with batches unpacked
+def test_motion_listener():
+    ingest = MagicMock()
+    listener = MotionListener(ingest)
+
+    listener.message(None, PNMessageResult({'motion': 'potty'}, 'pottydog.device.*', 'pottydog.device.pi-1', 1))
+    listener.message(None, PNMessageResult({'type': 'update_token'}, None, 'pottydog.user.1', 1))
+
+    ingest.submit.assert_called_once_with('pi-1', {'motion': 'potty'})
+
+    batch = {'type': 'batch', 'events': [{'motion': 'detected'}, {'motion': 'inactive'}]}
+    listener.message(None, PNMessageResult(batch, 'pottydog.device.*', 'pottydog.device.pi-1', 2))
+    assert [call.args[1]['motion'] for call in ingest.submit.call_args_list[1:]] == ['detected', 'inactive']
+
+
+# Test that a Pi's events for its other sensors are only stored when the sensor
+# is registered to the same user
+def test_ingest_other_devices(path):
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, email) VALUES (2, 'Other', 'other@email.com')")
+    cursor.execute("INSERT INTO devices (user_id, device_id) VALUES (1, 'pi-door'), (2, 'pi-neighbour')")
+    conn.commit()
+    conn.close()
+
+    ingest = MotionIngest(connect=lambda: connect_sqlite(path), flush_interval=60)
+    for device_id in ('pi-door', 'pi-neighbour', 'pi-unknown'):
+        ingest.submit('pi-1', {'motion': 'detected', 'device_id': device_id})
+    ingest.submit('pi-door', {'motion': 'detected', 'device_id': 'pi-1'}) # Either way round
+    assert ingest.flush(timeout=5)
+
+    conn = connect_sqlite(path)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT user_id, device_id FROM motion_events ORDER BY id")
+    assert [(row['user_id'], row['device_id']) for row in cursor.fetchall()] == [(1, 'pi-door'), (1, 'pi-1')]
+    conn.close()
+    stats = ingest.stats()
+    assert stats['not_owned'] == 1 and stats['unknown_device'] == 1
+    ingest.shutdown()
+
+
+# Test that a row the DB keeps rejecting is split out and dropped, and the rest written
+def test_ingest_poison_row(path):
+    conn = connect_sqlite(path)
+    conn.cursor().execute("INSERT INTO devices (user_id, device_id) VALUES (1, 'pi-bad')")
+    conn.commit()
+    conn.close()
+
+    ingest = MotionIngest(connect=lambda: connect_sqlite(path), batch_size=8, sleep=lambda seconds: None)
+    write = ingest._write
+
+    def reject_bad(batch):
+        if any(device_id == 'pi-bad' for device_id, *_ in batch):
+            raise Exception("constraint failed")
+        write(batch)
+
+    ingest._write = reject_bad
+    for i in range(8):
+        ingest.submit('pi-bad' if i == 5 else 'pi-1', {'motion': 'detected'})
+    assert ingest.flush(timeout=5)
+
+    assert count_events(path) == 7
+    assert ingest.stats()['poisoned'] == 1
+    ingest.shutdown()
+
+
+# Test that a device's owner is looked up again once the cache expires
+def test_ingest_device_ttl(path):
+    now = [0.0]
+    ingest = MotionIngest(connect=lambda: connect_sqlite(path), batch_size=1, device_ttl=300, clock=lambda: now[0])
+
+    def owners():
+        conn = connect_sqlite(path)
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT user_id FROM motion_events ORDER BY id")
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+        conn.close()
+        return user_ids
+
+    ingest.submit('pi-1', {'motion': 'detected'})
+    assert ingest.flush(timeout=5)
+
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, email) VALUES (2, 'Other', 'other@email.com')")
+    cursor.execute("UPDATE devices SET user_id = 2 WHERE device_id = 'pi-1'")
+    conn.commit()
+    conn.close()
+
+    ingest.submit('pi-1', {'motion': 'detected'})
+    assert ingest.flush(timeout=5)
+    now[0] = 301
+    ingest.submit('pi-1', {'motion': 'detected'})
+    assert ingest.flush(timeout=5)
+
+    assert owners() == [1, 1, 2]
+    ingest.shutdown()
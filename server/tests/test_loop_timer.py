@@ -0,0 +1,55 @@
+from hardware.loop_timer import LoopTimer
+import threading
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds + 0.002 # Oversleeps by 2ms
+
+
+# Test that ticks stay on the schedule even when iterations take different times
+def test_loop_timer_cadence():
+    clock = FakeClock()
+    timer = LoopTimer(1.0, clock=clock, sleep=clock.sleep)
+
+    for work in (0.1, 0.5, 0.9, 0.0):
+        clock.now += work
+        timer.wait()
+
+    assert abs(clock.now - 4.102) < 1e-9 # Anchored at the first wait, not pushed back by the work
+    assert timer.stats()["max_ms"] == 2.0
+    assert timer.stats()["overruns"] == 0
+
+
+# Test that a long stall restarts the schedule instead of bursting to catch up
+def test_loop_timer_overrun():
+    clock = FakeClock()
+    timer = LoopTimer(1.0, clock=clock, sleep=clock.sleep)
+
+    timer.wait()
+    clock.now += 5
+    timer.wait()
+    start = clock.now
+    timer.wait()
+
+    assert timer.overruns == 1
+    assert clock.now - start >= 1.0
+
+
+# Test that an event wakes the loop early without moving the schedule
+def test_loop_timer_wake():
+    clock = FakeClock()
+    timer = LoopTimer(1.0, clock=clock, sleep=clock.sleep)
+    wake = threading.Event()
+
+    wake.set()
+    assert not timer.wait(wake)
+    assert not wake.is_set()
+    assert timer.next_tick == 1.0
+    assert timer.wait() and clock.now == 1.002
@@ -0,0 +1,48 @@
+from migrate import split_statements, list_migrations, migrate
+from drivers import connect_sqlite
+from utils import day_range
+from datetime import date, datetime
+
+
+# Test that statements split on semicolons but trigger bodies stay whole
+def test_split_statements():
+    sql = """
+-- comment
+CREATE TABLE a (id INT);
+
+CREATE TRIGGER t AFTER UPDATE ON a
+BEGIN
+    UPDATE a SET id = 1;
+END;
+CREATE INDEX i ON a (id);
+"""
+    statements = split_statements(sql)
+
+    assert len(statements) == 3
+    assert statements[1].startswith("CREATE TRIGGER") and statements[1].endswith("END")
+
+
+# Test that both dialects have the same migration versions
+def test_dialects_in_step():
+    mysql = [(version, name) for version, name, _ in list_migrations('mysql')]
+    sqlite = [(version, name) for version, name, _ in list_migrations('sqlite')]
+    assert mysql == sqlite
+
+
+# Test that migrations run once and a second run is a no-op
+def test_migrate_idempotent(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'test.sqlite3'))
+
+    assert migrate(conn, 'sqlite') == []
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_potty_logs_user_logged_at'")
+    assert cursor.fetchone()
+    conn.close()
+
+
+# Test the half-open day range used for date filters
+def test_day_range():
+    start, end = day_range(date(2025, 12, 31))
+    assert start == datetime(2025, 12, 31)
+    assert end == datetime(2026, 1, 1)
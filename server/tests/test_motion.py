@@ -0,0 +1,129 @@
+from unittest.mock import patch
+from motion import state_durations, motion_series, rollup_motion
+from drivers import connect_sqlite
+from datetime import datetime, timedelta
+from app import app
+import pytest
+
+DAY = datetime(2025, 3, 1)
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+# sqlite DB for user 1 with devices 'door' and 'yard'. The door sees motion every
+# 10s from 09:59:00 to 10:01:00, then goes inactive. The yard is inactive at 10:30
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, email) VALUES (1, 'TheoPic', 'theo@email.com')")
+
+    events = [('door', 'detected', DAY.replace(hour=9, minute=59) + timedelta(seconds=10 * i)) for i in range(12)]
+    events.append(('door', 'inactive', DAY.replace(hour=10, minute=1)))
+    events.append(('yard', 'inactive', DAY.replace(hour=10, minute=30)))
+    cursor.executemany(
+        "INSERT INTO motion_events (user_id, device_id, motion, occurred_at, received_at) VALUES (1, %s, %s, %s, %s)",
+        [(device_id, motion, occurred_at, occurred_at) for device_id, motion, occurred_at in events]
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+# Test that states last until the next event, capped, and are split across buckets
+def test_state_durations():
+    start = DAY.replace(hour=10)
+    rows = [
+        ('door', 'detected', start - timedelta(seconds=30)),
+        ('door', 'potty', start + timedelta(seconds=50)),
+        ('door', 'inactive', start + timedelta(minutes=5)) # Potty capped at 60s
+    ]
+    totals = state_durations(rows, start, start + timedelta(minutes=6), 'minute', cap=60)
+
+    assert totals[('door', 'detected', start)] == 30 # Capped 60s after it was seen
+    assert totals[('door', 'potty', start)] == 10
+    assert totals[('door', 'potty', start + timedelta(minutes=1))] == 50
+    assert totals[('door', 'inactive', start + timedelta(minutes=5))] == 60
+    assert ('door', 'potty', start + timedelta(minutes=2)) not in totals
+
+
+# Test hour buckets from raw events, then the same answer from the rollup
+def test_motion_series_rollup(path):
+    conn = connect_sqlite(path)
+    start, end = DAY, DAY + timedelta(days=1)
+    now = DAY + timedelta(days=2)
+
+    raw = motion_series(conn, 1, start, end, 'hour', now=now)
+    assert len(raw) == 24
+    assert raw[9] == {'t': '2025-03-01T09:00:00', 'inactive': 0, 'detected': 60, 'potty': 0}
+    assert raw[10] == {'t': '2025-03-01T10:00:00', 'inactive': 120, 'detected': 60, 'potty': 0}
+
+    assert rollup_motion(conn, now=now) == 37 # 09:00 on day 1 to 2h before now
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("SELECT COUNT(*) AS count FROM motion_hourly_stats")
+    assert cursor.fetchone()['count'] == 4 # door detected at 9 and 10, door and yard inactive at 10
+    assert rollup_motion(conn, now=now) == 0
+
+    assert motion_series(conn, 1, start, end, 'hour', now=now) == raw
+    assert motion_series(conn, 1, start, end, 'day', now=now)[0]['inactive'] == 120
+    assert motion_series(conn, 1, start, end, 'hour', device_id='yard', now=now)[10]['inactive'] == 60
+    conn.close()
+
+
+# Test that the open state isn't counted past now
+def test_motion_series_now(path):
+    conn = connect_sqlite(path)
+    start = DAY.replace(hour=10)
+
+    points = motion_series(conn, 1, start, start + timedelta(minutes=3), 'minute', now=start + timedelta(seconds=90))
+    assert [point['detected'] for point in points] == [60, 0, 0]
+    assert [point['inactive'] for point in points] == [0, 30, 0]
+    conn.close()
+
+
+# Test the endpoint's bucket and window checks
+@patch('api.get_db_connection')
+def test_motion_endpoint(mock_get_db_connection, client, path):
+    mock_get_db_connection.side_effect = lambda: connect_sqlite(path)
+
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['can_read'] = True
+
+    response = client.get('/api/motion?bucket=hour&start=2025-03-01&end=2025-03-01')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert len(data['points']) == 24
+    assert data['points'][10]['detected'] == 60
+
+    assert client.get('/api/motion?bucket=second').status_code == 400
+    assert client.get('/api/motion?bucket=minute&start=2025-03-01&end=2025-03-03').status_code == 400
+
+
+# Test that an event arriving after its hour was rolled up gets rolled up again
+def test_rollup_late_event(path):
+    conn = connect_sqlite(path)
+    start, end = DAY, DAY + timedelta(days=1)
+    now = DAY + timedelta(days=2)
+    assert rollup_motion(conn, now=now) == 37
+
+    # The yard's outbox replays a detection from 10:20 a day and a half late
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(
+        "INSERT INTO motion_events (user_id, device_id, motion, occurred_at, received_at) VALUES (1, 'yard', 'detected', %s, %s)",
+        (DAY.replace(hour=10, minute=20), now + timedelta(hours=1))
+    )
+    conn.commit()
+    later = now + timedelta(hours=2)
+
+    assert rollup_motion(conn, now=later) == 1 + 2 # Hour 10 again, and the two new hours
+    assert rollup_motion(conn, now=later) == 0
+    points = motion_series(conn, 1, start, end, 'hour', now=later)
+    assert points[10] == {'t': '2025-03-01T10:00:00', 'inactive': 120, 'detected': 120, 'potty': 0}
+    conn.close()
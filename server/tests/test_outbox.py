@@ -0,0 +1,50 @@
+from hardware.outbox import Outbox
+import pytest
+
+
+# Test that events are flushed in order, in batches, and kept when sending fails
+def test_outbox_flush(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.sqlite3'), batch_size=3)
+    for i in range(7):
+        outbox.append({'motion': 'detected', 'n': i})
+
+    batches = []
+    def send(messages):
+        if len(batches) == 2:
+            raise Exception("Network down")
+        batches.append([message['n'] for message in messages])
+
+    with pytest.raises(Exception):
+        outbox.flush(send)
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+    assert outbox.pending() == 1
+
+    assert outbox.flush(batches.append) == 1
+    assert outbox.pending() == 0
+    outbox.close()
+
+
+# Test that compaction drops heartbeats before state changes, oldest first
+def test_outbox_compaction(tmp_path):
+    outbox = Outbox(str(tmp_path / 'outbox.sqlite3'), max_rows=10, batch_size=100)
+    for i in range(10):
+        outbox.append({'motion': 'detected', 'n': i, 'heartbeat': i % 2 == 1})
+    outbox.append({'motion': 'potty', 'n': 10})
+
+    sent = []
+    outbox.flush(lambda messages: sent.extend(message['n'] for message in messages))
+    assert sent == [0, 2, 4, 5, 6, 7, 8, 9, 10] # Down to 9 rows, by dropping the two oldest heartbeats
+    assert outbox.stats()['compacted'] == 2
+    outbox.close()
+
+
+# Test that queued events survive a restart
+def test_outbox_reopen(tmp_path):
+    path = str(tmp_path / 'outbox.sqlite3')
+    outbox = Outbox(path)
+    outbox.append({'motion': 'potty'})
+    outbox.close()
+
+    outbox = Outbox(path)
+    assert outbox.pending() == 1
+    outbox.close()
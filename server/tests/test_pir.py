@@ -0,0 +1,70 @@
+from hardware.gpio import SimulatedGPIO
+from hardware.pir import PIRSensor
+
+
+# Test polling reads the pin level as it is
+def test_pir_polling():
+    gpio = SimulatedGPIO(clock=lambda: 0.0)
+    pir = PIRSensor(17, gpio=gpio)
+
+    assert not pir.motion_detected()
+    gpio.set_input(17, 1)
+    assert pir.motion_detected() and pir.read() == gpio.HIGH
+    assert pir.stats() == {"mode": "poll", "edges": 0}
+
+
+# Test that a pulse between two reads still counts once in edge mode
+def test_pir_edge_pulse():
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    pir = PIRSensor(17, edge_detect=True, gpio=gpio)
+    levels = []
+    pir.add_callback(levels.append)
+
+    gpio.set_input(17, 1)
+    now[0] = 0.5
+    gpio.set_input(17, 0)
+    assert pir.motion_detected() # Latched
+    assert not pir.motion_detected()
+    assert levels == [True, False]
+    assert pir.stats() == {"mode": "edge", "edges": 2}
+
+
+# Test that edges inside the bounce time are ignored, as RPi.GPIO does
+def test_pir_edge_bounce():
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    pir = PIRSensor(17, edge_detect=True, bouncetime=50, gpio=gpio)
+
+    gpio.load_waveform(17, [(0.01, 1), (0.02, 0), (0.03, 1), (1.0, 0)], start=0.0)
+    gpio.advance(0.5)
+    assert pir.edges == 1
+    now[0] = 1.0
+    gpio.advance()
+    assert pir.edges == 2
+    assert pir.motion_detected() # The first pulse, latched
+    assert not pir.motion_detected()
+
+
+# Test that motion ends when the falling edge came inside the bounce time and was dropped
+def test_pir_edge_lost_fall():
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    pir = PIRSensor(17, edge_detect=True, bouncetime=50, gpio=gpio)
+
+    gpio.set_input(17, 1)
+    now[0] = 0.02
+    gpio.set_input(17, 0)
+    assert pir.edges == 1
+    assert pir.motion_detected() # The pulse, latched
+    assert not pir.motion_detected()
+
+
+# Test falling back to polling when edge detection can't be set up
+def test_pir_edge_fallback():
+    gpio = SimulatedGPIO()
+    gpio.add_event_detect(17, gpio.BOTH)
+    pir = PIRSensor(17, edge_detect=True, gpio=gpio)
+
+    assert not pir.edge_detect
+    pir.cleanup()
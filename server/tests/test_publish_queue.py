@@ -0,0 +1,111 @@
+from benchmarks.fake_pubnub import FakePubNub
+from publish_queue import PublishQueue
+from channels import unpack_messages
+import threading
+
+
+def sent_messages(pubnub, channel='channel'):
+    return [event['n'] for name, message in pubnub.published if name == channel for event in unpack_messages(message)]
+
+
+# Test that queued messages are sent in order by the worker
+def test_publish_queue_sends_in_order():
+    pubnub = FakePubNub()
+    queue = PublishQueue(pubnub, batch_size=3)
+
+    for i in range(10):
+        assert queue.publish('channel', {'n': i})
+    assert queue.flush(timeout=5)
+
+    assert sent_messages(pubnub) == list(range(10))
+    assert queue.stats()['sent'] == 10
+    queue.shutdown()
+
+
+# Test that messages queued up for the same channel go out as one publish
+def test_publish_queue_batches_per_channel():
+    release = threading.Event()
+    pubnub = FakePubNub(delay=release)
+    queue = PublishQueue(pubnub, batch_size=10)
+
+    queue.publish('first', {'n': 0})
+    while queue.stats()['in_flight'] == 0: # Worker is holding message 0
+        pass
+    for i in range(1, 7):
+        queue.publish('a' if i % 2 else 'b', {'n': i})
+
+    release.set()
+    assert queue.flush(timeout=5)
+    assert [channel for channel, _ in pubnub.published] == ['first', 'a', 'b']
+    assert pubnub.published[1][1]['type'] == 'batch'
+    assert sent_messages(pubnub, 'a') == [1, 3, 5] and sent_messages(pubnub, 'b') == [2, 4, 6]
+    assert queue.stats()['publishes'] == 3 and queue.stats()['sent'] == 7
+    queue.shutdown()
+
+
+# Test that publish() returns while PubNub is still busy
+def test_publish_queue_does_not_block():
+    release = threading.Event()
+    pubnub = FakePubNub(delay=release)
+    queue = PublishQueue(pubnub)
+
+    queue.publish('channel', {'n': 1})
+    assert pubnub.published == []
+
+    release.set()
+    assert queue.flush(timeout=5)
+    assert len(pubnub.published) == 1
+    queue.shutdown()
+
+
+# Test that failures are retried with backoff, then given up on
+def test_publish_queue_retries():
+    pubnub = FakePubNub()
+    sleeps = []
+    queue = PublishQueue(pubnub, max_retries=2, backoff=0.5, sleep=sleeps.append)
+
+    pubnub.fail_next = 2
+    queue.publish('channel', {'n': 1})
+    queue.flush(timeout=5)
+    pubnub.fail_next = 3
+    queue.publish('channel', {'n': 2})
+    queue.flush(timeout=5)
+
+    assert sleeps == [0.5, 1.0, 0.5, 1.0]
+    assert [message['n'] for _, message in pubnub.published] == [1]
+    assert queue.stats()['failed'] == 1
+    assert queue.stats()['retries'] == 4
+    queue.shutdown()
+
+
+# Test both drop policies when the queue is full
+def test_publish_queue_drop_policy():
+    for policy, expected in [('oldest', [0, 3, 4]), ('newest', [0, 1, 2])]:
+        release = threading.Event()
+        pubnub = FakePubNub(delay=release)
+        queue = PublishQueue(pubnub, max_depth=2, batch_size=1, drop_policy=policy)
+
+        queue.publish('channel', {'n': 0})
+        while queue.stats()['in_flight'] == 0: # Worker is holding message 0
+            pass
+        for i in range(1, 5):
+            queue.publish('channel', {'n': i})
+
+        release.set()
+        queue.flush(timeout=5)
+        assert [message['n'] for _, message in pubnub.published] == expected
+        assert queue.stats()['dropped'] == 2
+        queue.shutdown()
+
+
+# Test that shutdown sends what is left and refuses new messages
+def test_publish_queue_shutdown_flushes():
+    pubnub = FakePubNub()
+    queue = PublishQueue(pubnub)
+
+    for i in range(5):
+        queue.publish('channel', {'n': i})
+    assert queue.shutdown(timeout=5)
+
+    assert sent_messages(pubnub) == list(range(5))
+    assert not queue.publish('channel', {'n': 5})
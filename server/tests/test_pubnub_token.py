@@ -0,0 +1,72 @@
+from unittest.mock import patch, MagicMock
+from pb import TokenCache
+from app import app
+import pytest
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+# Test that a token is reused until it is within the refresh margin of expiring
+def test_token_cache_reuse_and_refresh():
+    now = [0.0]
+    cache = TokenCache(ttl=60, refresh_margin=10, clock=lambda: now[0])
+    issue = MagicMock(side_effect=['token-1', 'token-2'])
+
+    assert cache.get_token(1, True, False, issue) == 'token-1'
+    now[0] = 49 * 60
+    assert cache.get_token(1, True, False, issue) == 'token-1'
+    now[0] = 51 * 60
+    assert cache.get_token(1, True, False, issue) == 'token-2'
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+    assert stats['issued'] == 2
+
+
+# Test that permissions are part of the key and invalidation drops a user's tokens
+def test_token_cache_permissions_and_invalidate():
+    cache = TokenCache()
+    issue = MagicMock(side_effect=['read', 'read-write', 'read-again'])
+
+    assert cache.get_token(1, True, False, issue) == 'read'
+    assert cache.get_token(1, True, True, issue) == 'read-write'
+    cache.invalidate_user(1)
+    assert cache.get_token(1, True, False, issue) == 'read-again'
+
+
+# Test that failed grants are not cached
+def test_token_cache_issue_error():
+    cache = TokenCache()
+    issue = MagicMock(side_effect=[None, 'token'])
+
+    assert cache.get_token(1, True, False, issue) is None
+    assert cache.get_token(1, True, False, issue) == 'token'
+    assert cache.stats()['issue_errors'] == 1
+
+
+# Test that repeated dashboard loads only grant one token
+@patch('pb.generate_token', return_value='token')
+@patch('pb.get_db_connection')
+def test_get_pubnub_token_cached(mock_get_db_connection, mock_generate_token, client):
+    app.token_cache = TokenCache()
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_get_db_connection.return_value = mock_conn
+    mock_conn.cursor.return_value = mock_cursor
+    mock_cursor.fetchone.return_value = {'id': 1, 'username': 'TheoPic', 'can_read': 1, 'can_write': 0}
+
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+
+    for _ in range(3):
+        response = client.post('/get_pubnub_token')
+        assert response.get_json()['token'] == 'token'
+
+    assert mock_generate_token.call_count == 1
+    assert app.token_cache.stats()['hits'] == 2
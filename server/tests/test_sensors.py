@@ -0,0 +1,117 @@
+from hardware.sensors import SensorGroup, parse_sensors
+from hardware.gpio import SimulatedGPIO
+from hardware.outbox import Outbox
+from hardware import sensor_publisher
+from benchmarks.fake_pubnub import FakePubNub
+import pytest
+
+
+# Test reading PIR_SENSORS, and the single sensor default
+def test_parse_sensors():
+    assert parse_sensors("pi-front:17, pi-back:27", 17) == [("pi-front", 17), ("pi-back", 27)]
+    assert parse_sensors(None, 17) == [(None, 17)]
+    with pytest.raises(ValueError):
+        parse_sensors("pi-front", 17)
+    with pytest.raises(ValueError):
+        parse_sensors("pi-front:17,pi-back:17", 17)
+
+
+# Test that each sensor keeps its own state and every step's messages go out together
+def test_sensor_group():
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    sent = []
+    group = SensorGroup(
+        [("pi-front", 17), ("pi-back", 27)], sent.append,
+        edge_detect=True, gpio=gpio, clock=lambda: now[0],
+        heartbeat_interval=1000, wait_threshold=5
+    )
+
+    gpio.set_input(17, 1)
+    assert group.wake.is_set()
+    alerts = []
+    for second in range(1, 8):
+        now[0] = second
+        alerts += [sensor.name for sensor in group.step()]
+
+    assert alerts == ["pi-front"]
+    assert [[(m["device_id"], m["motion"]) for m in messages] for messages in sent] == [
+        [("pi-front", "detected")],
+        [("pi-front", "potty")]
+    ]
+    assert group.stats()["pi-back"]["publish"]["sent"] == 0
+
+    now[0] = 40 # Both doors quiet for longer than the inactive threshold
+    gpio.set_input(17, 0)
+    group.step()
+    assert [m["device_id"] for m in sent[-1]] == ["pi-front", "pi-back"]
+
+
+# Test that a heartbeat at least half due joins another sensor's publish, so
+# after that the sensors' heartbeats go out together
+def test_sensor_group_heartbeats_line_up():
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    sent = []
+    group = SensorGroup([("pi-front", 17), ("pi-back", 27)], sent.append, gpio=gpio, clock=lambda: now[0], heartbeat_interval=10)
+    front, back = group.sensors
+
+    front.publisher.update("inactive")
+    group.step(0.0)
+    now[0] = 6.0
+    back.publisher.update("inactive")
+    group.step(6.0)
+    now[0] = 16.0
+    group.step(16.0)
+
+    assert [[(m["device_id"], m.get("heartbeat", False)) for m in messages] for messages in sent] == [
+        [("pi-front", False)],
+        [("pi-back", False), ("pi-front", True)], # 6s into front's 10s
+        [("pi-front", True), ("pi-back", True)]
+    ]
+
+
+# Test that a step's messages the publisher refused go out with the next step, minus heartbeats
+def test_sensor_group_refused():
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    sent = []
+    accept = [False]
+    def publish_messages(messages):
+        if not accept[0]:
+            return False
+        sent.append(messages)
+        return True
+
+    group = SensorGroup([(None, 17)], publish_messages, gpio=gpio, clock=lambda: now[0], heartbeat_interval=1)
+    gpio.set_input(17, 1)
+    group.step(1.0)
+    group.step(2.0) # Heartbeat, refused too
+    assert sent == []
+
+    accept[0] = True
+    group.step(2.5)
+    assert [[(m["motion"], m.get("heartbeat", False)) for m in messages] for messages in sent] == [[("detected", False)]]
+    assert sent[0][0]["timestamp"] == 1.0 # The step's time, not the clock's
+
+
+# Test that every sensor's messages go out as one batch on the Pi's own channel,
+# and are all saved to the outbox when that fails
+def test_publish_messages_one_channel(tmp_path, monkeypatch):
+    pubnub = FakePubNub()
+    monkeypatch.setattr(sensor_publisher, "pubnub", pubnub)
+    monkeypatch.setattr(sensor_publisher, "outbox", Outbox(str(tmp_path / "outbox.sqlite3")))
+    monkeypatch.setattr(sensor_publisher, "DEVICE_CHANNEL", "pottydog.device.pi-hall")
+
+    messages = [
+        sensor_publisher.motion_message("detected", timestamp=1, device_id="pi-front"),
+        sensor_publisher.motion_message("inactive", timestamp=1, device_id="pi-back"),
+        sensor_publisher.motion_message("potty", timestamp=2, device_id="pi-front")
+    ]
+    sensor_publisher.publish_messages(messages)
+    assert pubnub.published == [("pottydog.device.pi-hall", {"type": "batch", "events": messages})]
+
+    pubnub.fail_next = 1
+    sensor_publisher.publish_messages(messages)
+    assert len(pubnub.published) == 1
+    assert sensor_publisher.outbox.pending() == 3
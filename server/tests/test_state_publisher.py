@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock
+from hardware.sensor_publisher import StatePublisher, BackgroundPublisher
+import threading
+import time
+
+
+# Test that only state changes and due heartbeats are published
+def test_state_publisher():
+    now = [0.0]
+    publish = MagicMock()
+    publisher = StatePublisher(publish=publish, heartbeat_interval=30, clock=lambda: now[0])
+
+    for second in range(65):
+        now[0] = second
+        publisher.update("detected" if second < 40 else "inactive")
+
+    assert [call.args for call in publish.call_args_list] == [("detected",), ("detected",), ("inactive",)]
+    assert publish.call_args_list[1].kwargs == {"heartbeat": True}
+    assert publisher.stats() == {"sent": 2, "heartbeats": 1, "suppressed": 62, "retries": 0, "reduction": 0.954}
+
+
+# Test that tick() keeps heartbeats going between updates
+def test_state_publisher_tick():
+    now = [0.0]
+    publish = MagicMock()
+    publisher = StatePublisher(publish=publish, heartbeat_interval=30, clock=lambda: now[0])
+
+    assert not publisher.tick() # Nothing to repeat yet
+    publisher.update("detected")
+    now[0] = 29
+    assert not publisher.tick()
+    now[0] = 30
+    assert publisher.tick()
+    publish.assert_called_with("detected", heartbeat=True)
+    now[0] = 44
+    assert not publisher.tick(early=15)
+    now[0] = 45
+    assert publisher.tick(early=15) # Brought forward
+
+
+# Test that a state change the publisher refused is sent again on the next tick
+def test_state_publisher_refused():
+    now = [0.0]
+    publish = MagicMock(side_effect=[False, True, False, True])
+    publisher = StatePublisher(publish=publish, heartbeat_interval=30, clock=lambda: now[0])
+
+    assert not publisher.update("detected")
+    assert publisher.state is None
+    now[0] = 1
+    assert publisher.tick()
+    assert publisher.state == "detected" and publisher.last_sent == 1
+
+    now[0] = 31
+    assert not publisher.tick() # Heartbeat refused, still due
+    assert publisher.tick()
+    assert [call.args for call in publish.call_args_list] == [("detected",)] * 4
+    assert publisher.stats()["sent"] == 1 and publisher.stats()["heartbeats"] == 1 and publisher.stats()["retries"] == 1
+
+
+# Test that publish() returns at once while the network call is slow, keeping the
+# sample time, and that what queued up meanwhile is sent as one batch
+def test_background_publisher():
+    release = threading.Event()
+    batches = []
+    publisher = BackgroundPublisher(
+        send=lambda messages: (release.wait(), batches.append(messages)),
+        flush=MagicMock(),
+        max_depth=2
+    )
+
+    before = time.time()
+    publisher.publish("detected")
+    while publisher.stats()["depth"]: # Worker is stuck sending it
+        pass
+    for state in ("potty", "inactive", "detected"):
+        publisher.publish(state)
+    assert time.time() - before < 0.5
+
+    release.set()
+    publisher.stop()
+    # The first event was already being sent, two fit in the queue and one was dropped
+    assert [[message["motion"] for message in batch] for batch in batches] == [["detected"], ["potty", "inactive"]]
+    assert all(message["timestamp"] >= before for batch in batches for message in batch)
+    stats = publisher.stats()
+    assert stats["sent"] == 3 and stats["batches"] == 2 and stats["dropped"] == 1 and stats["depth"] == 0
+
+
+# Test that errors from send and flush are counted and the worker keeps going
+def test_background_publisher_errors():
+    sent = []
+    def send(messages):
+        if messages[0]["motion"] == "potty":
+            raise Exception("Outbox unavailable")
+        sent.extend(messages)
+
+    flush = MagicMock(side_effect=Exception("Outbox unavailable"))
+    publisher = BackgroundPublisher(send=send, flush=flush, idle_interval=0.01)
+    publisher.publish("potty")
+    while not flush.called: # Idle, so it has tried the outbox too
+        time.sleep(0.01)
+    publisher.publish("inactive")
+    publisher.stop()
+
+    assert [message["motion"] for message in sent] == ["inactive"]
+    stats = publisher.stats()
+    assert stats["sent"] == 1 and stats["dropped"] == 1 and stats["errors"] >= 2
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+from stats import increment_daily_count, add_daily_counts, get_daily_count, rebuild_daily_stats
+from drivers import connect_sqlite
+from datetime import date, datetime
+import pytest
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'test.sqlite3'))
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, email) VALUES (1, 'theopic@email.com')")
+    conn.commit()
+    with patch('stats.get_dialect', return_value='sqlite'):
+        yield conn
+    conn.close()
+
+
+# Test that increments add up per day across potty types
+def test_increment_daily_count(conn):
+    cursor = conn.cursor(dictionary=True)
+    increment_daily_count(cursor, 1, date(2025, 3, 1), 'pee')
+    increment_daily_count(cursor, 1, date(2025, 3, 1), 'pee')
+    increment_daily_count(cursor, 1, date(2025, 3, 1), 'poop')
+    add_daily_counts(cursor, 1, {(date(2025, 3, 2), 'both'): 5})
+    conn.commit()
+
+    assert get_daily_count(cursor, 1, date(2025, 3, 1)) == 3
+    assert get_daily_count(cursor, 1, date(2025, 3, 2)) == 5
+    assert get_daily_count(cursor, 1, date(2025, 3, 3)) == 0
+
+
+# Test that a rebuild recounts the rollup from potty_logs
+def test_rebuild_daily_stats(conn):
+    cursor = conn.cursor(dictionary=True)
+    cursor.executemany(
+        "INSERT INTO potty_logs (user_id, logged_at, potty_type) VALUES (%s, %s, %s)",
+        [
+            (1, datetime(2025, 3, 1, 8, 0), 'pee'),
+            (1, datetime(2025, 3, 1, 23, 59), 'poop'),
+            (1, datetime(2025, 3, 2, 0, 0), 'pee')
+        ]
+    )
+    increment_daily_count(cursor, 1, date(2025, 3, 1), 'other') # Stale count
+    conn.commit()
+
+    rebuild_daily_stats(conn, 1)
+
+    assert get_daily_count(cursor, 1, date(2025, 3, 1)) == 2
+    assert get_daily_count(cursor, 1, date(2025, 3, 2)) == 1
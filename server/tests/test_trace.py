@@ -0,0 +1,57 @@
+from hardware.trace import TraceRecorder, read_trace, HEADER, RECORD
+from hardware.replay import load_trace
+from hardware.gpio import SimulatedGPIO
+from hardware.pir import PIRSensor
+
+
+# Test that only level changes are written and read back with wall clock times
+def test_trace_round_trip(tmp_path):
+    path = str(tmp_path / "door.pirt")
+    recorder = TraceRecorder(path, pin=17, clock=lambda: 50.0, wall_clock=lambda: 1000.0)
+    for now, level in ((50.0, 0), (51.0, 0), (52.5, 1), (52.6, 1), (55.25, 0)):
+        recorder.record(level, now)
+    recorder.close(now=60.0)
+
+    header, samples = read_trace(path)
+    assert header["pin"] == 17 and header["start"] == 1000.0
+    assert samples == [(1000.0, False), (1002.5, True), (1005.25, False), (1010.0, False)]
+    assert recorder.records == 4
+    assert (tmp_path / "door.pirt").stat().st_size == HEADER.size + 4 * RECORD.size
+
+
+# Test a gap too long for one record, and a last record cut short
+def test_trace_long_gap(tmp_path):
+    path = str(tmp_path / "door.pirt")
+    recorder = TraceRecorder(path, clock=lambda: 0.0, wall_clock=lambda: 0.0)
+    recorder.record(1, 0.0)
+    recorder.record(0, 3 * 3600.0)
+    recorder.close(now=3 * 3600.0)
+    with open(path, "ab") as file:
+        file.write(b"\x01\x02")
+
+    samples = load_trace(path)
+    assert samples[0] == (0.0, True)
+    assert all(level for _, level in samples[1:-2]) # Filler records keep the level
+    assert abs(samples[-2][0] - 3 * 3600.0) < 1e-6 and not samples[-2][1]
+
+
+# Test that a falling edge dropped by the bounce time is still recorded by the
+# per-tick read, as main.py does in edge mode
+def test_trace_bounce_dropped_fall(tmp_path):
+    now = [0.0]
+    gpio = SimulatedGPIO(clock=lambda: now[0])
+    pir = PIRSensor(17, edge_detect=True, bouncetime=50, gpio=gpio)
+    path = str(tmp_path / "door.pirt")
+    recorder = TraceRecorder(path, pin=17, clock=lambda: now[0], wall_clock=lambda: 0.0)
+    recorder.attach(pir)
+
+    for tick, level in ((1.0, 1), (1.02, 0)):
+        now[0] = tick
+        gpio.set_input(17, level)
+    assert pir.edges == 1 # The fall was inside the bounce time
+    now[0] = 2.0
+    recorder.record(pir.read())
+    recorder.close(now=600.0)
+
+    _, samples = read_trace(path)
+    assert samples == [(0.0, False), (1.0, True), (2.0, False), (600.0, False)]
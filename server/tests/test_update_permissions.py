@@ -1,5 +1,9 @@
 from unittest.mock import patch, MagicMock
 from flask_bcrypt import Bcrypt
+from drivers import connect_sqlite
+from pb import notify_permission_changes
+from publish_queue import PublishQueue
+from benchmarks.fake_pubnub import FakePubNub
 from app import app
 import pytest
 
@@ -164,4 +168,61 @@ def test_server_error(mock_get_db_connection, client):
     response = client.get('/admin-dashboard')
 
     assert response.status_code == 500
-    assert b"Something went wrong" in response.data
\ No newline at end of file
+    assert b"Something went wrong" in response.data
+
+# Test that changed users are updated together and notified once, after commit
+@patch('routes.notify_permission_changes')
+@patch('routes.get_db_connection')
+def test_update_permissions_bulk(mock_get_db_connection, mock_notify, client, tmp_path):
+    path = str(tmp_path / 'test.sqlite3')
+    conn = connect_sqlite(path)
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO users (id, username, email, is_admin) VALUES (1, 'admin', 'admin@email.com', TRUE)")
+    cursor.executemany(
+        "INSERT INTO users (id, username, email, can_read, can_write) VALUES (%s, %s, %s, TRUE, FALSE)",
+        [(i, f'user{i}', f'u{i}@email.com') for i in range(2, 7)]
+    )
+    conn.commit()
+    mock_get_db_connection.side_effect = lambda: connect_sqlite(path)
+
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['is_admin'] = True
+
+    # Users 2-5 are on the page. 2 unchanged, 3 loses read, 4 and 5 gain write. 6 is on another page
+    data = {
+        'user_ids': ['2', '3', '4', '5'],
+        'read_2': 'on',
+        'read_4': 'on', 'write_4': 'on',
+        'read_5': 'on', 'write_5': 'on'
+    }
+    response = client.post('/admin-dashboard/permissions', data=data)
+
+    assert response.status_code == 200
+    assert b"Successfully changed permissions of selected users!" in response.data
+
+    cursor.execute("SELECT id, can_read, can_write FROM users WHERE id > 1 ORDER BY id")
+    assert cursor.fetchall() == [(2, 1, 0), (3, 0, 0), (4, 1, 1), (5, 1, 1), (6, 1, 0)]
+    conn.close()
+
+    changes = mock_notify.call_args[0][1]
+    assert sorted(changes) == [(3, False, False), (4, True, True), (5, True, True)]
+
+
+# Test that each changed user is notified on their own channel through the publish queue
+def test_notify_permission_changes_per_user():
+    pubnub = FakePubNub()
+    queue = PublishQueue(pubnub)
+    changes = [(i, True, False) for i in range(2, 250)]
+
+    notify_permission_changes(queue, changes)
+    assert queue.flush(timeout=5)
+
+    assert [channel for channel, _ in pubnub.published] == [f'pottydog.user.{i}' for i in range(2, 250)]
+    assert pubnub.published[0][1] == {
+        'type': 'update_token',
+        'message': 'Your permissions have been changed',
+        'can_read': True,
+        'can_write': False
+    }
+    queue.shutdown()
@@ -0,0 +1,62 @@
+from flask import render_template
+from users import parse_user_query, fetch_user_page
+from drivers import connect_sqlite
+from app import app
+import pytest
+
+
+# sqlite DB with an admin and 12 users. Even ids have read access
+@pytest.fixture
+def cursor(tmp_path):
+    conn = connect_sqlite(str(tmp_path / 'test.sqlite3'))
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("INSERT INTO users (id, username, email, is_admin) VALUES (1, 'admin', 'admin@email.com', TRUE)")
+    cursor.executemany(
+        "INSERT INTO users (id, username, email, can_read) VALUES (%s, %s, %s, %s)",
+        [(i, f'user_{i}', f'u{i}@email.com', i % 2 == 0) for i in range(2, 14)]
+    )
+    cursor.execute("INSERT INTO users (id, username, email) VALUES (14, 'userX', 'x@email.com')")
+    conn.commit()
+    yield cursor
+    conn.close()
+
+
+# Test that pages are bounded and admins are never listed
+def test_fetch_user_page_paging(cursor):
+    users, has_next = fetch_user_page(cursor, parse_user_query({}), page_size=5)
+    assert [user['id'] for user in users] == [2, 3, 4, 5, 6]
+    assert has_next
+
+    users, has_next = fetch_user_page(cursor, parse_user_query({'page': '3'}), page_size=5)
+    assert [user['id'] for user in users] == [12, 13, 14]
+    assert not has_next
+
+
+# Test prefix search where _ is a literal, not a wildcard
+def test_fetch_user_page_search(cursor):
+    users, _ = fetch_user_page(cursor, parse_user_query({'q': 'user_1'}))
+    assert [user['id'] for user in users] == [10, 11, 12, 13]
+
+    users, _ = fetch_user_page(cursor, parse_user_query({'q': 'x@'}))
+    assert [user['id'] for user in users] == [14]
+
+
+# Test permission filters and that unknown filters are ignored
+def test_fetch_user_page_permission_filter(cursor):
+    users, _ = fetch_user_page(cursor, parse_user_query({'permission': 'no-read'}))
+    assert [user['id'] for user in users] == [3, 5, 7, 9, 11, 13]
+
+    assert parse_user_query({'permission': 'admin', 'page': 'x'}) == {'q': '', 'permission': '', 'page': 1}
+
+
+# Test that the permissions form only carries the users on the page
+def test_admin_dashboard_template_page_ids():
+    users = [{'id': 2, 'username': 'lalapic', 'can_read': 1, 'can_write': 0}]
+    query = {'q': 'la', 'permission': '', 'page': 2}
+
+    with app.test_request_context('/admin-dashboard'):
+        html = render_template('admin-dashboard.html', users=users, query=query, has_next=True, userData={})
+
+    assert 'name="user_ids" value="2"' in html
+    assert 'page=3' in html and 'page=1' in html
+    assert '/admin-dashboard/permissions?q=la' in html
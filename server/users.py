@@ -0,0 +1,62 @@
+# Imports
+import os
+
+ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 50))
+
+# Permission filters for the admin user list
+PERMISSION_FILTERS = {
+    'read': "can_read = TRUE",
+    'no-read': "can_read = FALSE",
+    'write': "can_write = TRUE",
+    'no-write': "can_write = FALSE"
+}
+
+
+# Search, filter and page number from the admin dashboard query args
+def parse_user_query(args):
+    try:
+        page = max(int(args.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    permission = args.get('permission', '')
+    if permission not in PERMISSION_FILTERS:
+        permission = ''
+
+    return {
+        'q': args.get('q', '').strip()[:100],
+        'permission': permission,
+        'page': page
+    }
+
+
+# Escape LIKE wildcards so the search is a plain prefix match. Used with ESCAPE '!'
+def like_prefix(text):
+    return text.replace('!', '!!').replace('%', '!%').replace('_', '!_') + '%'
+
+
+# One page of non-admin users matching the query, and whether there is a next page.
+# Prefix searches use the username and email indexes
+def fetch_user_page(cursor, query, page_size=ADMIN_PAGE_SIZE):
+    conditions = ["is_admin = FALSE"]
+    params = []
+
+    if query['q']:
+        conditions.append("(username LIKE %s ESCAPE '!' OR email LIKE %s ESCAPE '!')")
+        params.extend([like_prefix(query['q'])] * 2)
+
+    if query['permission']:
+        conditions.append(PERMISSION_FILTERS[query['permission']])
+
+    cursor.execute(
+        f"""
+        SELECT id, username, email, can_read, can_write FROM users
+        WHERE {' AND '.join(conditions)}
+        ORDER BY id
+        LIMIT %s OFFSET %s
+        """,
+        (*params, page_size + 1, (query['page'] - 1) * page_size)
+    )
+    users = cursor.fetchall()
+
+    return users[:page_size], len(users) > page_size
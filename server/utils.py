@@ -0,0 +1,41 @@
+# Imports
+from flask import render_template, session, redirect, url_for
+from datetime import datetime, date, time, timedelta
+
+
+# Half-open [start, end) datetime range covering one day.
+# Lets `logged_at >= start AND logged_at < end` use the (user_id, logged_at) index
+def day_range(day=None):
+    start = datetime.combine(day or date.today(), time.min)
+    return start, start + timedelta(days=1)
+
+
+# Parse optional YYYY-MM-DD 'start' and 'end' query args (both inclusive)
+# into a half-open datetime range. Either side can be None
+def parse_date_range(args):
+    start = args.get('start')
+    end = args.get('end')
+
+    start_at = datetime.strptime(start, "%Y-%m-%d") if start else None
+    end_at = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1) if end else None
+
+    if start_at and end_at and start_at >= end_at:
+        raise ValueError("'start' must not be after 'end'")
+    return start_at, end_at
+
+
+# Session and permission checks for pages that show potty activity.
+# Returns the response to send back if the user can't see it, otherwise None
+def check_read_access():
+    if not session.get('user_id'):
+        return redirect(url_for('auth.login'))
+    
+    if not session.get('can_read'):
+        return render_template(
+            'protected.html', 
+            status_code="401",
+            error="Unauthorised!",
+            message="You do not have read access! Please contact the admin to have permissions changed!"
+        ), 401
+    
+    return None